@@ -11,9 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,6 +55,8 @@ INTERNAL_IPS = ["127.0.0.1"]
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'scheduler.middleware.MetricsMiddleware',
+    'scheduler.middleware.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +91,20 @@ WSGI_APPLICATION = 'class_scheduling_system.wsgi.application'
 # Database configuration
 DATABASE_URL = config('DATABASE_URL', default=None)
 
+# Connection reuse. DB_CONN_MAX_AGE is how many seconds a worker keeps its
+# connection open between requests (0 = reconnect every request, -1 = forever);
+# DB_CONN_HEALTH_CHECKS pings a reused connection before a request so one the
+# server dropped is replaced instead of failing the request.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Optional psycopg 3 connection pool for PostgreSQL (pip install "psycopg[pool]").
+# A pool replaces persistent connections, so DB_CONN_MAX_AGE is ignored when on.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)
+
 if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.parse(DATABASE_URL)
@@ -104,6 +122,16 @@ else:
         }
     }
 
+DATABASES['default']['CONN_MAX_AGE'] = None if DB_CONN_MAX_AGE < 0 else DB_CONN_MAX_AGE
+DATABASES['default']['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,6 +164,67 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # WhiteNoise configuration for static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Cache (see scheduler/cache.py for the namespaces built on it).
+# CACHE_BACKEND: file (shared by the workers of one host, the default), redis
+# (shared by every host; needs the redis package) or locmem (per process, so
+# only for a single worker: invalidations reach no other process).
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'class-scheduling'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(tempfile.gettempdir(), 'class_scheduling_cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}")
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='scheduler'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)}
+
+# Published timetable JSON snapshots (see scheduler/publishing.py). Point this
+# at persistent storage in production; the public schedule is rendered live
+# until the next publish when the snapshots are missing.
+TIMETABLE_SNAPSHOT_ROOT = config(
+    'TIMETABLE_SNAPSHOT_ROOT', default=os.path.join(tempfile.gettempdir(), 'class_scheduling_timetables'),
+)
+
+# Default weekly caps per instructor for the timetable generator, used where
+# an instructor has none of their own (see scheduler/instructor_loads.py).
+# 0 means no cap.
+SCHEDULER_MAX_WEEKLY_HOURS = config('SCHEDULER_MAX_WEEKLY_HOURS', default=0, cast=int)
+SCHEDULER_MAX_LOAD_UNITS = config('SCHEDULER_MAX_LOAD_UNITS', default=0, cast=float)
+
+# Request profiling (see scheduler/middleware.py): fraction of requests sampled
+# (0 turns it off) and how many recent samples the admin endpoint keeps.
+REQUEST_PROFILE_SAMPLE_RATE = config('REQUEST_PROFILE_SAMPLE_RATE', default=0.1, cast=float)
+REQUEST_PROFILE_BUFFER_SIZE = config('REQUEST_PROFILE_BUFFER_SIZE', default=500, cast=int)
+
+# Prometheus metrics (see scheduler/metrics.py): every gunicorn worker writes
+# its samples here and /metrics merges them. Clear it on restart. Scrapes are
+# accepted from METRICS_ALLOWED_IPS or from logged-in admins.
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'class_scheduling_metrics'))
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()])
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'scheduler': {
+            'handlers': ['console'],
+            'level': config('SCHEDULER_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -10,6 +10,7 @@ from .models import (
     Instructor,
     Section,
     Schedule,
+    SchedulerRun,
 )
 
 # ===============================
@@ -118,7 +119,7 @@ class SubjectAdmin(admin.ModelAdmin):
 # ===============================
 @admin.register(Instructor)
 class InstructorAdmin(admin.ModelAdmin):
-    list_display = ('user', 'department')
+    list_display = ('user', 'department', 'max_weekly_hours', 'max_load_units')
     list_filter = ('department',)
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
 
@@ -128,7 +129,7 @@ class InstructorAdmin(admin.ModelAdmin):
 # ===============================
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
-    list_display = ('section_name', 'course', 'year_level')
+    list_display = ('section_name', 'course', 'year_level', 'enrolment')
     list_filter = ('course', 'year_level')
     search_fields = ('section_name', 'course__course_name')
 
@@ -141,3 +142,16 @@ class ScheduleAdmin(admin.ModelAdmin):
     list_display = ('section', 'subject', 'instructor', 'day', 'room')
     list_filter = ('day', 'section__course')
     search_fields = ('section__section_name', 'subject__subject_code', 'instructor__user__username')
+
+
+# ===============================
+# ✅ Scheduler Run
+# ===============================
+@admin.register(SchedulerRun)
+class SchedulerRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'curriculum', 'wall_ms', 'created', 'failed', 'profiler')
+    list_filter = ('curriculum', 'profiler')
+    readonly_fields = (
+        'curriculum', 'started_at', 'wall_ms', 'created', 'failed', 'profile', 'profiler', 'profiler_report',
+        'instructor_loads',
+    )
@@ -0,0 +1,204 @@
+"""
+Room and instructor utilisation analytics.
+
+Schedules and availability windows are loaded with one query each into
+NumPy arrays of shape (entities, days, bins), at BIN_MINUTES resolution:
+``busy`` is the fraction of each bin an entity spends in class and
+``available`` the fraction covered by its availability windows (an entity
+without any windows is always available, as in the auto scheduler). Every
+report below is a reduction over those arrays.
+
+NumPy is in requirements.txt; where it is missing, ``report()`` raises
+AnalyticsUnavailable instead of breaking the rest of the app.
+"""
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from .models import Department, Instructor, InstructorAvailability, Room, RoomAvailability, Schedule
+from .timegrid import DAY_CODES, MINUTES_PER_DAY, clock, minute_of_day
+
+try:
+    import numpy as np
+except ImportError:  # analytics are optional
+    np = None
+
+BIN_MINUTES = 30
+MINUTES_PER_WEEK = len(DAY_CODES) * MINUTES_PER_DAY
+BINS_PER_DAY = MINUTES_PER_DAY // BIN_MINUTES
+# Hours shown in heatmaps; reports still count classes outside them.
+DAY_START, DAY_END = 7 * 60, 21 * 60
+LIST_LIMIT = 20
+
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+
+def _running(size: int, intervals):
+    """
+    (size, minutes of week) number of ``intervals`` running at each minute;
+    ``intervals`` is a list of (owner index, start, end) minutes of week.
+    """
+    minutes = np.zeros((size, MINUTES_PER_WEEK + 1), dtype=np.int32)
+    if intervals:
+        rows = np.asarray(intervals, dtype=np.int64)
+        np.add.at(minutes, (rows[:, 0], rows[:, 1]), 1)
+        np.add.at(minutes, (rows[:, 0], rows[:, 2]), -1)
+    return np.cumsum(minutes[:, :-1], axis=1, dtype=np.int32)
+
+
+def _binned(per_minute):
+    """Average of every BIN_MINUTES block, as (size, days, bins)."""
+    return per_minute.reshape(len(per_minute), len(DAY_CODES), BINS_PER_DAY, BIN_MINUTES).mean(axis=3)
+
+
+class Grid:
+    """Busy and available fractions for one kind of resource."""
+
+    def __init__(self, ids: Sequence[int], busy_rows, avail_rows):
+        self.ids = list(ids)
+        index = {pk: i for i, pk in enumerate(self.ids)}
+        size = len(self.ids)
+        # Overlapping intervals of one entity count once.
+        self.busy = _binned(_running(size, [(index[o], s, e) for o, s, e in busy_rows if o in index]) > 0)
+        windows = [(index[o], s, e) for o, s, e in avail_rows if o in index]
+        self.available = _binned(_running(size, windows) > 0)
+        restricted = np.zeros(size, dtype=bool)
+        restricted[[w[0] for w in windows]] = True
+        self.available[~restricted] = 1.0
+
+    def utilisation(self, weights=None):
+        """(days, bins) busy / available over all entities, optionally weighted."""
+        busy, available = self.busy, self.available
+        if weights is not None:
+            busy = busy * weights[:, None, None]
+            available = available * weights[:, None, None]
+        return _ratio(busy.sum(axis=0), available.sum(axis=0))
+
+    def per_entity(self, days=slice(None), bins=slice(None)):
+        """(entities,) busy hours, available hours and their ratio within a window."""
+        hours = BIN_MINUTES / 60
+        busy = self.busy[:, days, bins].sum(axis=(1, 2)) * hours
+        available = self.available[:, days, bins].sum(axis=(1, 2)) * hours
+        return busy, available, _ratio(busy, available)
+
+
+def _ratio(a, b):
+    return np.divide(a, b, out=np.zeros_like(a, dtype=float), where=b > 0)
+
+
+def _availability_rows(model, owner: str):
+    return [
+        (owner_id, DAY_CODES.index(day) * MINUTES_PER_DAY + minute_of_day(start),
+         DAY_CODES.index(day) * MINUTES_PER_DAY + minute_of_day(end))
+        for owner_id, day, start, end in model.objects.values_list(owner, 'day', 'start_time', 'end_time')
+        if day in DAY_CODES
+    ]
+
+
+def _window(day: Optional[str], start: Optional[int], end: Optional[int]) -> Tuple[slice, slice]:
+    days = slice(None) if not day else slice(DAY_CODES.index(day), DAY_CODES.index(day) + 1)
+    first = 0 if start is None else start // BIN_MINUTES
+    last = BINS_PER_DAY if end is None else -(-end // BIN_MINUTES)
+    return days, slice(first, last)
+
+
+def _heatmap(values):
+    return np.round(values[:, DAY_START // BIN_MINUTES:DAY_END // BIN_MINUTES], 3).tolist()
+
+
+def report(day: Optional[str] = None, start: Optional[int] = None, end: Optional[int] = None) -> Dict:
+    """
+    Utilisation heatmaps, free capacity, per-department peak demand and
+    per-room / per-instructor rankings. ``day``, ``start`` and ``end``
+    (minutes of day) narrow the rankings to one window, e.g. Tuesday
+    afternoons.
+    """
+    if np is None:
+        raise AnalyticsUnavailable("Analytics need NumPy; install it to enable this report.")
+    started = time.perf_counter()
+
+    rooms = list(Room.objects.values_list('id', 'room_name', 'capacity', 'department_id'))
+    instructors = list(Instructor.objects.values_list('id', 'user__first_name', 'user__last_name'))
+    schedules = list(Schedule.objects.values_list(
+        'room_id', 'instructor_id', 'section__course__department_id', 'week_start', 'week_end',
+    ))
+    departments = list(Department.objects.values_list('id', 'name'))
+
+    room_grid = Grid(
+        [r[0] for r in rooms],
+        [(room_id, s, e) for room_id, _i, _d, s, e in schedules],
+        _availability_rows(RoomAvailability, 'room_id'),
+    )
+    instructor_grid = Grid(
+        [i[0] for i in instructors],
+        [(instructor_id, s, e) for _r, instructor_id, _d, s, e in schedules],
+        _availability_rows(InstructorAvailability, 'instructor_id'),
+    )
+
+    capacity = np.array([r[2] or 0 for r in rooms], dtype=float)
+    idle = np.clip(room_grid.available - room_grid.busy, 0, None)
+    days, bins = _window(day, start, end)
+
+    # Rooms: least used first, within the window.
+    busy, available, ratio = room_grid.per_entity(days, bins)
+    order = np.argsort(ratio[available > 0], kind='stable')
+    candidates = np.flatnonzero(available > 0)[order]
+    least_used = [
+        {
+            'id': rooms[i][0], 'room': rooms[i][1], 'department_id': rooms[i][3],
+            'busy_hours': round(float(busy[i]), 1), 'available_hours': round(float(available[i]), 1),
+            'utilisation': round(float(ratio[i]), 3),
+        }
+        for i in candidates[:LIST_LIMIT]
+    ]
+
+    # Instructors: most loaded first.
+    busy, available, ratio = instructor_grid.per_entity(days, bins)
+    load = [
+        {
+            'id': instructors[i][0], 'instructor': f"{instructors[i][1]} {instructors[i][2]}".strip(),
+            'teaching_hours': round(float(busy[i]), 1), 'available_hours': round(float(available[i]), 1),
+            'utilisation': round(float(ratio[i]), 3),
+        }
+        for i in np.argsort(-busy, kind='stable')[:LIST_LIMIT]
+    ]
+
+    # Departments: concurrent classes of their sections against rooms they own.
+    index = {pk: i for i, (pk, _name) in enumerate(departments)}
+    running = _running(len(departments), [(index[d], s, e) for _r, _i, d, s, e in schedules if d in index])
+    classes = _binned(running).reshape(len(departments), -1)
+    in_class = (running > 0).mean(axis=1)
+    peak_bins = classes.argmax(axis=1) if departments else []
+    owned = np.bincount(np.array([index[r[3]] for r in rooms if r[3] in index], dtype=int), minlength=len(departments))
+    department_demand = sorted((
+        {
+            'id': pk, 'department': name, 'rooms': int(owned[i]),
+            'peak_classes': round(float(classes[i, peak_bins[i]]), 2),
+            'peak_at': f"{DAY_CODES[peak_bins[i] // BINS_PER_DAY]} {clock((peak_bins[i] % BINS_PER_DAY) * BIN_MINUTES)}",
+            'busy_share': round(float(in_class[i]), 3),
+        }
+        for i, (pk, name) in enumerate(departments)
+    ), key=lambda d: d['peak_classes'], reverse=True)
+
+    return {
+        'bin_minutes': BIN_MINUTES,
+        'days': DAY_CODES,
+        'bins': [clock(m) for m in range(DAY_START, DAY_END, BIN_MINUTES)],
+        'window': {'day': day, 'start': None if start is None else clock(start), 'end': None if end is None else clock(end)},
+        'rooms': {
+            'count': len(rooms),
+            'utilisation': _heatmap(room_grid.utilisation()),
+            'seat_utilisation': _heatmap(room_grid.utilisation(capacity)),
+            'free_rooms': _heatmap(idle.sum(axis=0)),
+            'free_seats': _heatmap((idle * capacity[:, None, None]).sum(axis=0)),
+            'least_used': least_used,
+        },
+        'instructors': {
+            'count': len(instructors),
+            'utilisation': _heatmap(instructor_grid.utilisation()),
+            'load': load,
+        },
+        'departments': department_demand,
+        'computed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
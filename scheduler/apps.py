@@ -6,6 +6,9 @@ class SchedulerCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 def ready(self):
         # Auto create admin if not exists
@@ -1,17 +1,25 @@
 import datetime
 from typing import Dict, List, Optional, Tuple
 
-from django.db import transaction
+from django.utils import timezone
 
 from .models import (
     Schedule,
     Curriculum,
     CurriculumSubject,
     Instructor,
-    InstructorAvailability,
     Room,
-    RoomAvailability,
+    ScheduleConflict,
+    SchedulerRun,
+    trusted_schedule_batch,
 )
+from . import metrics
+from .availability import availability_index
+from .occupancy import OccupancyMap, INSTRUCTOR, SECTION
+from .profiling import EngineProfile, ProfilerCapture
+from .room_assignment import RoomPool
+from .instructor_loads import InstructorLoads
+from .timegrid import minute_of_day
 
 
 DAYS = [Schedule.Day.MON, Schedule.Day.TUE, Schedule.Day.WED, Schedule.Day.THU, Schedule.Day.FRI]
@@ -28,137 +36,204 @@ def _time_slots() -> List[Tuple[datetime.time, datetime.time]]:
     return slots
 
 
-def _is_available_in_range(avails, day: str, start: datetime.time, end: datetime.time) -> bool:
-    for a in avails:
-        if a.day == day and a.start_time <= start and a.end_time >= end:
-            return True
-    return False
-
-
-def _has_conflict_for_instructor(instructor: Instructor, day: str, start: datetime.time, end: datetime.time) -> bool:
-    return Schedule.objects.filter(instructor=instructor, day=day).filter(time_start__lt=end, time_end__gt=start).exists()
-
-
-def _has_conflict_for_room(room: Room, day: str, start: datetime.time, end: datetime.time) -> bool:
-    return Schedule.objects.filter(room=room, day=day).filter(time_start__lt=end, time_end__gt=start).exists()
-
-
-def _has_conflict_for_section(section, day: str, start: datetime.time, end: datetime.time) -> bool:
-    return Schedule.objects.filter(section=section, day=day).filter(time_start__lt=end, time_end__gt=start).exists()
-
-
-@transaction.atomic
-def generate_timetable(curriculum_id: Optional[int] = None) -> Dict:
+def generate_timetable(curriculum_id: Optional[int] = None, profiler: Optional[str] = None) -> Dict:
     """
     A simple greedy scheduler:
     - Iterates CurriculumSubjects in order.
     - For each subject, schedules required_hours_per_week as 1-hour blocks for every section in the curriculum's course.
-    - Picks the first feasible (day, slot, room, instructor) satisfying availability and conflicts.
-
-    Returns a summary dict with counts and failures.
+    - Picks the first feasible (day, slot) and, for it, the least-loaded instructor
+      within their weekly hour and load-unit caps who satisfies availability and
+      conflicts, in a slot whose free rooms can still seat every block placed in it.
+    - Then allocates rooms per slot as an assignment problem that minimises empty
+      seats and keeps sections in their department and on one floor (see room_assignment).
+    - Saves each block optimistically in its own short transaction; the database
+      rejects overlaps, so a block lost to a concurrent admin is just recorded as failed.
+
+    Returns a summary dict with counts and failures, ``instructor_loads``
+    (see instructor_loads.InstructorLoads.report), ``profile`` (phase
+    timings and counters, see profiling.EngineProfile) and the id of the
+    SchedulerRun it was stored as. ``profiler`` ('cprofile' or 'sampling')
+    also captures a profiler report into the run.
     """
-    curricula = Curriculum.objects.filter(id=curriculum_id) if curriculum_id else Curriculum.objects.filter(is_active=True)
+    capture = ProfilerCapture(profiler)
+    profile = EngineProfile()
+    started_at = timezone.now()
+    with capture:
+        results = _generate(curriculum_id, profile)
+    results["profile"] = profile.summary()
+
+    run = SchedulerRun.objects.create(
+        curriculum_id=curriculum_id,
+        started_at=started_at,
+        wall_ms=results["profile"]["wall_ms"],
+        created=results["created"],
+        failed=len(results["failed"]),
+        profile=results["profile"],
+        profiler=profiler or '',
+        profiler_report=capture.report,
+        instructor_loads=results["instructor_loads"],
+    )
+    results["run_id"] = run.pk
+
+    metrics.observe('scheduler_run_duration_seconds', {}, run.wall_ms / 1000)
+    metrics.inc('scheduler_run_blocks_total', {'outcome': 'placed'}, results["created"])
+    metrics.inc('scheduler_run_blocks_total', {'outcome': 'failed'}, len(results["failed"]))
+    return results
+
+
+def _generate(curriculum_id: Optional[int], profile: EngineProfile) -> Dict:
     results = {"created": 0, "failed": [], "processed_subjects": 0}
 
-    slots = _time_slots()
+    with profile.phase("load"):
+        curricula = Curriculum.objects.filter(id=curriculum_id) if curriculum_id else Curriculum.objects.filter(is_active=True)
+        curricula = list(curricula.select_related("course"))
+        profile.count("loaded.curricula", len(curricula))
+        slots = _time_slots()
+        # Free/busy for every room, instructor and section, read once from the
+        # occupancy table and kept current as blocks are placed.
+        occupancy = OccupancyMap.load(days=DAYS)
+        rooms = RoomPool(Room.objects.all(), occupancy)
+        profile.count("loaded.rooms", len(rooms.rooms))
+        # Every instructor, who is free when, who is qualified for what, and
+        # their current loads: the search below runs no per-candidate queries.
+        instructors = list(Instructor.objects.select_related("user"))
+        availability = availability_index(INSTRUCTOR)
+        open_instructors = {(day, start, end): availability.open_mask(day, start, end) for day in DAYS for start, end in slots}
+        by_id = {instr.id: instr for instr in instructors}
+        qualified_for = {}
+        for subject_id, instructor_id in Instructor.subjects.through.objects.values_list("subject_id", "instructor_id"):
+            qualified_for.setdefault(subject_id, []).append(by_id[instructor_id])
+        loads = InstructorLoads.load(instructors)
+        profile.count("loaded.instructors", len(instructors))
+    # Blocks with their day, slot and instructor fixed, waiting for a room.
+    placed = []
 
     for curriculum in curricula:
-        course = curriculum.course
-        sections = list(course.sections.all())
-        cs_list = CurriculumSubject.objects.filter(semester__year_level__curriculum=curriculum).select_related("subject").order_by("order", "id")
+        with profile.phase("load"):
+            course = curriculum.course
+            sections = list(course.sections.all())
+            cs_list = list(
+                CurriculumSubject.objects.filter(semester__year_level__curriculum=curriculum)
+                .select_related("subject").order_by("order", "id")
+            )
+            profile.count("loaded.sections", len(sections))
+            profile.count("loaded.subjects", len(cs_list))
+
         for cs in cs_list:
             subject = cs.subject
             results["processed_subjects"] += 1
 
             # candidate instructors: qualified or any if none explicitly qualified
-            qualified = list(Instructor.objects.filter(subjects=subject))
-            if not qualified:
-                qualified = list(Instructor.objects.all())
+            qualified = qualified_for.get(subject.id) or instructors
 
             for section in sections:
                 hours_needed = max(1, int(subject.required_hours_per_week))
                 hours_assigned = 0
 
-                for day in DAYS:
-                    if hours_assigned >= hours_needed:
-                        break
-                    for start, end in slots:
+                with profile.phase("search"):
+                    for day in DAYS:
                         if hours_assigned >= hours_needed:
                             break
-                        # section conflict
-                        if _has_conflict_for_section(section, day, start, end):
-                            continue
-
-                        # try instructors
-                        chosen_instructor = None
-                        for instr in qualified:
-                            if _has_conflict_for_instructor(instr, day, start, end):
-                                continue
-                            instr_avails = list(instr.availabilities.all())
-                            if instr_avails and not _is_available_in_range(instr_avails, day, start, end):
-                                continue
-                            chosen_instructor = instr
-                            break
-                        if not chosen_instructor:
-                            continue
-
-                        # try rooms: match type and capacity
-                        candidate_rooms = Room.objects.all()
-                        if subject.meeting_type == 'LABORATORY':
-                            candidate_rooms = candidate_rooms.filter(room_type='LABORATORY')
-                        else:
-                            candidate_rooms = candidate_rooms.filter(room_type='LECTURE')
-                        candidate_rooms = candidate_rooms.order_by('capacity')
-
-                        chosen_room = None
-                        for room in candidate_rooms:
-                            if _has_conflict_for_room(room, day, start, end):
-                                continue
-                            room_avails = list(room.availabilities.all())
-                            if room_avails and not _is_available_in_range(room_avails, day, start, end):
+                        for start, end in slots:
+                            if hours_assigned >= hours_needed:
+                                break
+                            profile.count("candidates.slots")
+                            # section conflict
+                            with profile.phase("conflict_checks"):
+                                profile.count("checks.section")
+                                section_free = occupancy.is_free(SECTION, section.id, day, start, end)
+                            if not section_free:
+                                profile.count("rejected.section")
                                 continue
-                            # quick capacity check
-                            section_size = section.students.count()
-                            if room.capacity and section_size > room.capacity:
+
+                            # try instructors, least loaded first
+                            minutes = minute_of_day(end) - minute_of_day(start)
+                            chosen_instructor = None
+                            for instr in loads.ranked(qualified, subject, section.id):
+                                profile.count("candidates.instructors")
+                                with profile.phase("conflict_checks"):
+                                    profile.count("checks.instructor_load")
+                                    if not loads.fits(instr.id, subject, section.id, minutes):
+                                        profile.count("rejected.instructor_load")
+                                        continue
+                                    profile.count("checks.instructor")
+                                    if not occupancy.is_free(INSTRUCTOR, instr.id, day, start, end):
+                                        profile.count("rejected.instructor")
+                                        continue
+                                    profile.count("checks.instructor_availability")
+                                    if not availability.admits(open_instructors[day, start, end], instr.id):
+                                        profile.count("rejected.instructor_availability")
+                                        continue
+                                chosen_instructor = instr
+                                break
+                            if not chosen_instructor:
                                 continue
-                            chosen_room = room
-                            break
-                        if not chosen_room:
-                            continue
-
-                        # create schedule
-                        sched = Schedule(
-                            section=section,
-                            subject=subject,
-                            instructor=chosen_instructor,
-                            room=chosen_room,
-                            day=day,
-                            time_start=start,
-                            time_end=end,
-                            meeting_type=subject.meeting_type,
-                        )
-                        try:
-                            sched.save()
+
+                            # the slot must still have a room for this block and every other one in it
+                            sched = Schedule(
+                                section=section,
+                                subject=subject,
+                                instructor=chosen_instructor,
+                                day=day,
+                                time_start=start,
+                                time_end=end,
+                                meeting_type=subject.meeting_type,
+                            )
+                            with profile.phase("conflict_checks"):
+                                profile.count("checks.room_fit")
+                                if not rooms.reserve(sched):
+                                    profile.count("rejected.room_fit")
+                                    continue
+                            placed.append(sched)
+                            loads.add(chosen_instructor.id, subject, section.id, minutes)
                             hours_assigned += 1
-                            results["created"] += 1
-                        except Exception as e:
-                            results["failed"].append({
-                                "section": str(section),
-                                "subject": subject.subject_code,
-                                "day": day,
-                                "start": str(start),
-                                "end": str(end),
-                                "reason": str(e),
-                            })
-                            continue
+                            occupancy.occupy(SECTION, section.id, day, start, end)
+                            occupancy.occupy(INSTRUCTOR, chosen_instructor.id, day, start, end)
 
                 if hours_assigned < hours_needed:
+                    profile.count("unplaced")
                     results["failed"].append({
                         "section": str(section),
                         "subject": subject.subject_code,
                         "reason": f"Only assigned {hours_assigned}/{hours_needed} hour(s)"
                     })
 
+    with profile.phase("room_assignment"):
+        profile.count("room_assignment.empty_seats_and_penalties", rooms.assign())
+
+    for sched in placed:
+        try:
+            # Section, instructor and room conflicts were checked above.
+            with profile.phase("save"), trusted_schedule_batch():
+                profile.count("saves")
+                sched.save()
+            results["created"] += 1
+        except ScheduleConflict:
+            # Taken concurrently since the checks above.
+            profile.count("save_conflicts")
+            results["failed"].append(_failure(sched, "Taken by a concurrent change"))
+            _unload(loads, sched)
+        except Exception as e:
+            profile.count("save_failures")
+            results["failed"].append(_failure(sched, str(e)))
+            _unload(loads, sched)
+
+    results["instructor_loads"] = loads.report()
     return results
 
 
+def _unload(loads: InstructorLoads, sched: Schedule) -> None:
+    # The report, and the SchedulerRun it is stored in, count saved blocks only.
+    minutes = minute_of_day(sched.time_end) - minute_of_day(sched.time_start)
+    loads.remove(sched.instructor_id, sched.subject, sched.section_id, minutes)
+
+
+def _failure(sched: Schedule, reason: str) -> Dict:
+    return {
+        "section": str(sched.section),
+        "subject": sched.subject.subject_code,
+        "day": sched.day,
+        "start": str(sched.time_start),
+        "end": str(sched.time_end),
+        "reason": reason,
+    }
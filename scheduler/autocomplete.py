@@ -0,0 +1,88 @@
+"""
+Type-ahead suggestions for the admin filter forms.
+
+Each source is a prefix (istartswith) lookup on a column that migration
+0010 indexes for it, capped at LIMIT rows and cached for CACHE_TIMEOUT
+seconds, so a keystroke is one short index range scan at most.
+"""
+from typing import Dict, List, Optional
+
+from django.db.models import Q
+
+from . import cache
+from .models import Department, Instructor, Room, SchoolYearLevel, Section, Subject
+
+LIMIT = 10
+CACHE_TIMEOUT = 60
+
+
+def _departments(prefix: str, department: Optional[int]) -> List[Dict]:
+    qs = Department.objects.filter(name__istartswith=prefix).order_by('name')
+    return [{'id': d.id, 'value': d.name} for d in qs[:LIMIT]]
+
+
+def _instructors(prefix: str, department: Optional[int]) -> List[Dict]:
+    words = prefix.split()
+    if len(words) > 1:
+        # "Arian Ma" -> first name "Arian...", last name "Ma..."
+        match = Q(user__first_name__istartswith=' '.join(words[:-1]), user__last_name__istartswith=words[-1])
+    else:
+        match = Q(user__first_name__istartswith=prefix) | Q(user__last_name__istartswith=prefix)
+    qs = Instructor.objects.filter(match).select_related('user').order_by('user__first_name', 'user__last_name')
+    if department:
+        qs = qs.filter(department_id=department)
+    return [{'id': i.id, 'value': f"{i.user.first_name} {i.user.last_name}"} for i in qs[:LIMIT]]
+
+
+def _sections(prefix: str, department: Optional[int]) -> List[Dict]:
+    qs = Section.objects.filter(section_name__istartswith=prefix)
+    if department:
+        qs = qs.filter(course__department_id=department)
+    names = qs.values_list('section_name', flat=True).distinct().order_by('section_name')
+    return [{'id': None, 'value': name} for name in names[:LIMIT]]
+
+
+def _rooms(prefix: str, department: Optional[int]) -> List[Dict]:
+    qs = Room.objects.filter(room_name__istartswith=prefix).order_by('room_name')
+    if department:
+        qs = qs.filter(department_id=department)
+    return [{'id': r.id, 'value': r.room_name} for r in qs.only('id', 'room_name')[:LIMIT]]
+
+
+def _subjects(prefix: str, department: Optional[int]) -> List[Dict]:
+    qs = Subject.objects.filter(
+        Q(subject_code__istartswith=prefix) | Q(subject_name__istartswith=prefix)
+    ).order_by('subject_code')
+    if department:
+        qs = qs.filter(curriculum__course__department_id=department)
+    return [
+        {'id': s.id, 'value': f"{s.subject_code} - {s.subject_name}"}
+        for s in qs.only('id', 'subject_code', 'subject_name')[:LIMIT]
+    ]
+
+
+def _school_years(prefix: str, department: Optional[int]) -> List[Dict]:
+    qs = SchoolYearLevel.objects.filter(school_year__istartswith=prefix)
+    if department:
+        qs = qs.filter(curriculum__course__department_id=department)
+    years = qs.values_list('school_year', flat=True).distinct().order_by('school_year')
+    return [{'id': None, 'value': year} for year in years[:LIMIT]]
+
+
+SOURCES = {
+    'departments': _departments,
+    'instructors': _instructors,
+    'sections': _sections,
+    'rooms': _rooms,
+    'subjects': _subjects,
+    'school_years': _school_years,
+}
+
+
+def suggest(kind: str, prefix: str, department: Optional[int] = None) -> List[Dict]:
+    """Up to LIMIT ``{'id', 'value'}`` suggestions of ``kind`` starting with ``prefix``."""
+    prefix = ' '.join(prefix.split())
+    return cache.get_or_set(
+        'autocomplete', (kind, department or 0, prefix.lower()),
+        lambda: SOURCES[kind](prefix, department), CACHE_TIMEOUT,
+    )
@@ -0,0 +1,108 @@
+"""
+Weekly availability bitmaps for instructors and rooms.
+
+Each entity's availability windows are folded into one integer over the
+week's timegrid cells (bit ``day * SLOTS_PER_DAY + slot``), so "is X free
+for this class" is a single mask-and-compare. The same bits are also kept
+transposed, one integer per cell with a bit per entity, so the entities
+free for a whole window come from ANDing that window's cells.
+
+A cell counts as available only if the windows cover all of it, while a
+class needs every cell it touches. Entities without any window are always
+available, as before.
+
+Indexes are loaded with one query and cached in the 'availability'
+namespace under the AVAILABILITY TimetableVersion stamp, which every
+availability write bumps (see signals.py). The stamp lives in the database,
+so each worker sees a change on its next lookup whatever the cache backend.
+"""
+import datetime
+from typing import Dict, Iterable, List
+
+from . import cache
+from .models import InstructorAvailability, RoomAvailability, TimetableVersion
+from .occupancy import INSTRUCTOR, ROOM
+from .timegrid import DAY_CODES, SLOT_MINUTES, SLOTS_PER_DAY, MINUTES_PER_DAY, minute_of_day, slot_range
+
+WEEK_CELLS = len(DAY_CODES) * SLOTS_PER_DAY
+
+# kind: (model, owner column)
+SOURCES = {
+    INSTRUCTOR: (InstructorAvailability, 'instructor_id'),
+    ROOM: (RoomAvailability, 'room_id'),
+}
+
+
+def _cells(first: int, last: int) -> int:
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def window_mask(day: str, start: datetime.time, end: datetime.time) -> int:
+    """Bits of every cell a class held on ``day`` from ``start`` to ``end`` touches."""
+    cells = slot_range(start, end)
+    offset = DAY_CODES.index(day) * SLOTS_PER_DAY
+    return _cells(offset + cells.start, offset + cells.stop)
+
+
+def _covered_mask(day: str, start: datetime.time, end: datetime.time) -> int:
+    """Bits of the cells an availability window covers completely."""
+    offset = DAY_CODES.index(day) * SLOTS_PER_DAY
+    end_minute = MINUTES_PER_DAY if end == datetime.time.max else minute_of_day(end)
+    return _cells(offset - (-minute_of_day(start) // SLOT_MINUTES), offset + end_minute // SLOT_MINUTES)
+
+
+class AvailabilityIndex:
+    def __init__(self, rows: Iterable):
+        """``rows`` are (owner id, day, start time, end time) availability windows."""
+        self.bitmaps: Dict[int, int] = {}
+        for owner_id, day, start, end in rows:
+            bits = _covered_mask(day, start, end) if day in DAY_CODES else 0
+            self.bitmaps[owner_id] = self.bitmaps.get(owner_id, 0) | bits
+        # Entities with windows, by bit position in the per-cell columns.
+        self.owners: List[int] = sorted(self.bitmaps)
+        self.positions: Dict[int, int] = {owner_id: i for i, owner_id in enumerate(self.owners)}
+        self.restricted = (1 << len(self.owners)) - 1
+        self.columns = [0] * WEEK_CELLS
+        for position, owner_id in enumerate(self.owners):
+            bitmap = self.bitmaps[owner_id]
+            while bitmap:
+                low = bitmap & -bitmap
+                self.columns[low.bit_length() - 1] |= 1 << position
+                bitmap ^= low
+
+    @classmethod
+    def load(cls, kind: str) -> 'AvailabilityIndex':
+        model, owner = SOURCES[kind]
+        return cls(model.objects.values_list(owner, 'day', 'start_time', 'end_time'))
+
+    def is_available(self, owner_id: int, day: str, start: datetime.time, end: datetime.time) -> bool:
+        bitmap = self.bitmaps.get(owner_id)
+        if bitmap is None:
+            return True
+        window = window_mask(day, start, end)
+        return bitmap & window == window
+
+    def open_mask(self, day: str, start: datetime.time, end: datetime.time) -> int:
+        """Bits, by position in ``owners``, of the entities with windows that cover the whole class."""
+        cells = slot_range(start, end)
+        offset = DAY_CODES.index(day) * SLOTS_PER_DAY
+        mask = self.restricted
+        for cell in range(offset + cells.start, offset + cells.stop):
+            mask &= self.columns[cell]
+        return mask
+
+    def admits(self, mask: int, owner_id: int) -> bool:
+        """Whether ``owner_id`` is free in the class ``mask`` came from (see open_mask)."""
+        position = self.positions.get(owner_id)
+        return position is None or mask >> position & 1 == 1
+
+    def available(self, ids: Iterable[int], day: str, start: datetime.time, end: datetime.time) -> List[int]:
+        """Those of ``ids`` free for the whole class, in order."""
+        mask = self.open_mask(day, start, end)
+        return [pk for pk in ids if self.admits(mask, pk)]
+
+
+def availability_index(kind: str) -> AvailabilityIndex:
+    """The cached index of ``kind`` (occupancy.INSTRUCTOR or occupancy.ROOM)."""
+    stamp = TimetableVersion.current(TimetableVersion.AVAILABILITY).version
+    return cache.get_or_set('availability', (kind, stamp), lambda: AvailabilityIndex.load(kind))
@@ -0,0 +1,150 @@
+"""
+Namespaced, versioned keys over Django's cache.
+
+Every subsystem reads and writes through one of NAMESPACES. A key embeds
+its namespace's current generation number, so ``invalidate(namespace)``
+retires every entry of that namespace at once by bumping the number (the
+old entries simply expire). Namespaces marked ``timetable`` are invalidated
+together whenever TimetableVersion is bumped (see signals.py).
+
+A key may also name a ``scope`` such as ``('room', 12)``; it then embeds that
+scope's own generation too, and ``invalidate_scope()`` retires only the
+entries of one room, instructor or section. Scoped namespaces are kept up to
+date by the dependency registry in invalidation.py rather than wiped on
+every timetable change. ``get_many()``/``set_many()`` read and write one
+entry per scope for a whole batch of rooms or instructors in two round trips.
+
+Hits and misses are counted per namespace in scheduler_cache_requests_total
+on /metrics.
+"""
+import hashlib
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+
+from . import metrics
+
+# namespace: (default timeout in seconds, invalidated on timetable changes)
+NAMESPACES = {
+    'dashboard': (300, False),
+    'public_schedule': (60 * 60 * 24, True),
+    'occupancy': (600, True),
+    'solver': (60 * 60, True),
+    'autocomplete': (60, True),
+    'instructor_dashboard': (300, False),
+    'room_schedule': (300, False),
+    'availability': (60 * 60 * 24, False),
+}
+
+_MISSING = object()
+
+# (kind, id), e.g. ('instructor', 7)
+Scope = Tuple[str, Hashable]
+
+
+def _generation_key(namespace: str, scope: Optional[Scope] = None) -> str:
+    if scope is None:
+        return f"{namespace}:generation"
+    return f"{namespace}:{scope[0]}:{scope[1]}:generation"
+
+
+def _load_generations(names) -> Dict[str, int]:
+    values = cache.get_many(names)
+    for name in names:
+        if name not in values:
+            # Start from the clock rather than 1, so a generation evicted from the
+            # cache can never come back as a number that old entries still use.
+            cache.add(name, time.time_ns(), timeout=None)
+            values[name] = cache.get(name)
+    return values
+
+
+def generation(namespace: str) -> int:
+    name = _generation_key(namespace)
+    return _load_generations([name])[name]
+
+
+def _keys(namespace: str, parts: Iterable[Hashable], scopes: Iterable[Optional[Scope]]) -> Dict[str, Optional[Scope]]:
+    """{cache key: scope} for ``parts`` under each scope, reading every generation in one round trip."""
+    if namespace not in NAMESPACES:
+        raise KeyError(f"Unknown cache namespace '{namespace}'")
+    scopes = list(scopes)
+    digest = hashlib.md5(repr(tuple(parts)).encode()).hexdigest()
+    names = [_generation_key(namespace)] + [_generation_key(namespace, scope) for scope in scopes if scope is not None]
+    generations = _load_generations(names)
+    prefix = f"{namespace}:g{generations[names[0]]}"
+    keys = {}
+    for scope in scopes:
+        if scope is None:
+            keys[f"{prefix}:{digest}"] = None
+        else:
+            keys[f"{prefix}:{scope[0]}:{scope[1]}:g{generations[_generation_key(namespace, scope)]}:{digest}"] = scope
+    return keys
+
+
+def make_key(namespace: str, parts: Iterable[Hashable], scope: Optional[Scope] = None) -> str:
+    return next(iter(_keys(namespace, parts, [scope])))
+
+
+def get(namespace: str, parts: Iterable[Hashable], default: Any = None, scope: Optional[Scope] = None) -> Any:
+    value = cache.get(make_key(namespace, parts, scope), _MISSING)
+    metrics.inc('scheduler_cache_requests_total', {'cache': namespace, 'result': 'miss' if value is _MISSING else 'hit'})
+    return default if value is _MISSING else value
+
+
+def set(namespace: str, parts: Iterable[Hashable], value: Any, timeout: Optional[int] = None, scope: Optional[Scope] = None) -> None:
+    cache.set(make_key(namespace, parts, scope), value, NAMESPACES[namespace][0] if timeout is None else timeout)
+
+
+def get_or_set(
+    namespace: str, parts: Iterable[Hashable], compute: Callable[[], Any],
+    timeout: Optional[int] = None, scope: Optional[Scope] = None,
+) -> Any:
+    """The cached value, or ``compute()`` stored and returned on a miss."""
+    parts = tuple(parts)
+    value = get(namespace, parts, _MISSING, scope)
+    if value is _MISSING:
+        value = compute()
+        set(namespace, parts, value, timeout, scope)
+    return value
+
+
+def get_many(namespace: str, parts: Iterable[Hashable], scopes: Iterable[Scope]) -> Dict[Scope, Any]:
+    """The cached values of ``parts`` under those of ``scopes`` that have one, in two round trips."""
+    scopes = list(scopes)
+    keys = _keys(namespace, parts, scopes)
+    found = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+    metrics.inc('scheduler_cache_requests_total', {'cache': namespace, 'result': 'hit'}, len(found))
+    metrics.inc('scheduler_cache_requests_total', {'cache': namespace, 'result': 'miss'}, len(scopes) - len(found))
+    return found
+
+
+def set_many(namespace: str, parts: Iterable[Hashable], values: Dict[Scope, Any], timeout: Optional[int] = None) -> None:
+    keys = _keys(namespace, parts, values)
+    cache.set_many(
+        {key: values[scope] for key, scope in keys.items()},
+        NAMESPACES[namespace][0] if timeout is None else timeout,
+    )
+
+
+def _bump(name: str) -> None:
+    try:
+        cache.incr(name)
+    except ValueError:
+        # Never used yet or evicted: any fresh number retires old keys.
+        cache.set(name, time.time_ns(), timeout=None)
+
+
+def invalidate(*namespaces: str) -> None:
+    for namespace in namespaces:
+        _bump(_generation_key(namespace))
+
+
+def invalidate_scope(namespace: str, scope: Scope) -> None:
+    """Retire the entries of ``namespace`` stored under ``scope`` only."""
+    _bump(_generation_key(namespace, scope))
+
+
+def invalidate_timetable() -> None:
+    invalidate(*(name for name, (_timeout, timetable) in NAMESPACES.items() if timetable))
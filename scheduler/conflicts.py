@@ -0,0 +1,107 @@
+import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .availability import availability_index
+from .models import Section, Instructor, Room
+from .occupancy import OccupancyMap, ROOM, INSTRUCTOR, SECTION
+
+
+Candidate = Tuple[str, datetime.time, datetime.time]
+
+SECTION_CONFLICT = "Section has a conflicting class"
+INSTRUCTOR_CONFLICT = "Instructor is not available (conflict)"
+ROOM_CONFLICT = "Room is occupied"
+INSTRUCTOR_UNAVAILABLE = "Instructor not available in this time window"
+ROOM_UNAVAILABLE = "Room not available in this time window"
+
+
+def grid_slots(start_hour: int, end_hour: int, step_minutes: int = 60) -> List[Tuple[datetime.time, datetime.time]]:
+    """Consecutive (start, end) slots from start_hour up to end_hour (exclusive)."""
+    slots = []
+    minute = start_hour * 60
+    while minute + step_minutes <= end_hour * 60:
+        start = datetime.time(minute // 60, minute % 60)
+        end_minute = minute + step_minutes
+        end = datetime.time(end_minute // 60, end_minute % 60) if end_minute < 24 * 60 else datetime.time.max
+        slots.append((start, end))
+        minute = end_minute
+    return slots
+
+
+class BusyIndex:
+    """
+    In-memory view of the occupancy and availability rows relevant to one
+    section / instructor / room triple, loaded once and reused for every
+    candidate slot.
+    """
+
+    def __init__(self, section: Optional[Section] = None, instructor: Optional[Instructor] = None,
+                 room: Optional[Room] = None, days: Optional[Iterable[str]] = None):
+        self.owners = [
+            (resource_type, obj.id, message)
+            for resource_type, obj, message in (
+                (SECTION, section, SECTION_CONFLICT),
+                (INSTRUCTOR, instructor, INSTRUCTOR_CONFLICT),
+                (ROOM, room, ROOM_CONFLICT),
+            )
+            if obj is not None
+        ]
+        self.instructor = instructor
+        self.room = room
+        self.instructor_availability = availability_index(INSTRUCTOR) if instructor else None
+        self.room_availability = availability_index(ROOM) if room else None
+        self.occupancy = OccupancyMap.load(
+            resources={resource_type: [resource_id] for resource_type, resource_id, _ in self.owners},
+            days=days,
+        )
+
+    def conflicts(self, day: str, start: datetime.time, end: datetime.time) -> List[str]:
+        found = [
+            message for resource_type, resource_id, message in self.owners
+            if not self.occupancy.is_free(resource_type, resource_id, day, start, end)
+        ]
+        if self.instructor and not self.instructor_availability.is_available(self.instructor.id, day, start, end):
+            found.append(INSTRUCTOR_UNAVAILABLE)
+        if self.room and not self.room_availability.is_available(self.room.id, day, start, end):
+            found.append(ROOM_UNAVAILABLE)
+        return found
+
+
+def check_slots(section: Optional[Section], instructor: Optional[Instructor], room: Optional[Room],
+                candidates: Sequence[Candidate]) -> List[List[str]]:
+    """
+    Validate many candidate slots at once.
+
+    Returns one list of conflict messages per candidate, in input order;
+    an empty list means the slot is free.
+    """
+    index = BusyIndex(section, instructor, room, days={day for day, _, _ in candidates})
+    return [index.conflicts(day, start, end) for day, start, end in candidates]
+
+
+def week_grid(section: Optional[Section], instructor: Optional[Instructor], room: Optional[Room],
+              days: Sequence[str], slots: Sequence[Tuple[datetime.time, datetime.time]]) -> Dict:
+    """
+    Feasibility matrix for every (day, slot) cell of a week.
+
+    ``matrix[d][s]`` is True when the slot is free for the whole triple;
+    ``conflicts`` lists the reasons for every blocked cell, keyed "DAY HH:MM".
+    """
+    index = BusyIndex(section, instructor, room, days=days)
+    matrix = []
+    conflicts = {}
+    for day in days:
+        row = []
+        for start, end in slots:
+            found = index.conflicts(day, start, end)
+            row.append(not found)
+            if found:
+                conflicts[f"{day} {start.strftime('%H:%M')}"] = found
+        matrix.append(row)
+
+    return {
+        "days": list(days),
+        "slots": [f"{s.strftime('%H:%M')}-{e.strftime('%H:%M')}" for s, e in slots],
+        "matrix": matrix,
+        "conflicts": conflicts,
+    }
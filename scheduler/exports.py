@@ -0,0 +1,161 @@
+"""
+Streaming CSV / XLSX timetable exports.
+
+Rows come from one joined values_list() query read with iterator(), and
+both writers are generators, so the first bytes leave as soon as the first
+chunk is fetched and memory stays flat however many schedules there are.
+
+The XLSX writer is a minimal SpreadsheetML package (one sheet, inline
+strings) built with zipfile on an unseekable stream; it needs no
+third-party library.
+"""
+import csv
+import zipfile
+from typing import Iterable, Iterator, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from .models import Schedule
+
+HEADER = (
+    'Department', 'Course', 'Section', 'Subject Code', 'Subject Name', 'Meeting Type',
+    'Day', 'Start', 'End', 'Room', 'Instructor',
+)
+FIELDS = (
+    'section__course__department__name', 'section__course__course_code', 'section__section_name',
+    'subject__subject_code', 'subject__subject_name', 'meeting_type',
+    'day', 'time_start', 'time_end', 'room__room_name',
+    'instructor__user__first_name', 'instructor__user__last_name',
+)
+CHUNK_SIZE = 2000
+DAY_LABELS = dict(Schedule.Day.choices)
+
+
+def export_rows(department: Optional[int] = None, curriculum: Optional[int] = None) -> Iterator[Sequence]:
+    """Timetable rows in HEADER order, campus-wide or for one department / curriculum."""
+    qs = Schedule.objects.all()
+    if department:
+        qs = qs.filter(section__course__department_id=department)
+    if curriculum:
+        qs = qs.filter(subject__curriculum_id=curriculum)
+    qs = qs.order_by('section__course__department__name', 'section__section_name', 'week_start', 'pk')
+
+    for (dept, course, section, code, name, meeting_type, day, start, end, room,
+         first_name, last_name) in qs.values_list(*FIELDS).iterator(chunk_size=CHUNK_SIZE):
+        yield (
+            dept or '', course, section, code, name, meeting_type.title(),
+            str(DAY_LABELS.get(day, day)), start.strftime('%H:%M'), end.strftime('%H:%M'), room,
+            f"{first_name} {last_name}".strip(),
+        )
+
+
+class Echo:
+    """File-like object whose write() just hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows: Iterable[Sequence]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= 500:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+class _Pipe:
+    """Unseekable sink for zipfile that lets a generator collect what was written."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Timetable" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(index: int, values: Sequence) -> str:
+    cells = ''.join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+        for value in values
+    )
+    return f'<row r="{index}">{cells}</row>'
+
+
+def xlsx_stream(rows: Iterable[Sequence]) -> Iterator[bytes]:
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        yield pipe.drain()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, HEADER).encode())
+            for index, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(index, row).encode())
+                if index % 500 == 0:
+                    data = pipe.drain()
+                    if data:
+                        yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield pipe.drain()
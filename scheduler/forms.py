@@ -278,6 +278,10 @@ class SubjectForm(forms.ModelForm):
             self.fields['section'].queryset = Section.objects.none()
             self.fields['room'].queryset = Room.objects.all().order_by('department__name', 'floor', 'room_name')
 
+        # Subject.day_mask is not a form field; pre-select the stored days when editing
+        if self.instance.pk and 'day' not in self.initial:
+            self.initial['day'] = self.instance.days
+
         # Reset semester-specific fields if semester changes
         if semester:
             self.fields['room'].initial = None
@@ -0,0 +1,116 @@
+"""
+iCalendar (.ics) feeds of Schedule rows as weekly recurring events.
+
+Feeds are addressed by a signed token, so calendar apps can subscribe
+without a session. Output is generated row by row from iterator(), and is
+byte-identical for a given TimetableVersion, which makes the version a
+valid strong ETag.
+
+Times are written as floating local times (no TZID): a class at 08:00
+shows at 08:00 in whatever zone the subscriber is in, matching the
+wall-clock times stored in Schedule. Events start in the week the
+timetable last changed and repeat weekly without an end date.
+"""
+import datetime
+from typing import Iterator, Optional, Tuple
+
+from django.core import signing
+from django.urls import reverse
+
+from .models import Instructor, Room, Schedule, Section, TimetableVersion
+from .timegrid import DAY_CODES
+
+TOKEN_SALT = 'scheduler.ical'
+FEEDS = {
+    'instructor': Instructor,
+    'section': Section,
+    'room': Room,
+}
+PRODID = '-//A.C.E. Class Scheduling System//Timetable//EN'
+BYDAY = {code: code[:2] for code in DAY_CODES}
+
+
+def feed_token(kind: str, obj_id: int) -> str:
+    # No timestamp: a subscription URL must stay the same for good.
+    return signing.Signer(salt=TOKEN_SALT).sign_object([kind, obj_id], compress=True)
+
+
+def read_feed_token(token: str) -> Optional[Tuple[str, int]]:
+    """(kind, id) for a valid token, else None."""
+    try:
+        kind, obj_id = signing.Signer(salt=TOKEN_SALT).unsign_object(token)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    return (kind, obj_id) if kind in FEEDS else None
+
+
+def feed_url(kind: str, obj_id: int) -> str:
+    return reverse('ical_feed', args=[feed_token(kind, obj_id)])
+
+
+def feed_name(obj) -> str:
+    if isinstance(obj, Instructor):
+        return obj.user.get_full_name() or obj.user.username
+    if isinstance(obj, Room):
+        return f"Room {obj.room_name}"
+    return str(obj)
+
+
+def _escape(text) -> str:
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1) and terminate it."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74  # continuation lines start with a space
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    parts.append(data.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def calendar_lines(kind: str, obj, stamp: TimetableVersion) -> Iterator[str]:
+    """The feed for one instructor, section or room, one event per chunk."""
+    dtstamp = stamp.changed_at.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    changed = stamp.changed_at.date()
+    week_monday = changed - datetime.timedelta(days=changed.weekday())
+
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_escape(feed_name(obj))}',
+    ))
+
+    schedules = Schedule.objects.filter(**{kind: obj}).select_related(
+        'subject', 'room', 'section__course', 'instructor__user',
+    ).order_by('week_start', 'pk')
+    for s in schedules.iterator(chunk_size=500):
+        date = week_monday + datetime.timedelta(days=DAY_CODES.index(s.day))
+        instructor = s.instructor.user.get_full_name() or s.instructor.user.username
+        description = f"Section: {s.section}\nInstructor: {instructor}\n{s.get_meeting_type_display()}"
+        yield ''.join(_fold(line) for line in (
+            'BEGIN:VEVENT',
+            f'UID:schedule-{s.pk}@class-scheduling-system',
+            f'DTSTAMP:{dtstamp}',
+            f'DTSTART:{date:%Y%m%d}T{s.time_start:%H%M%S}',
+            f'DTEND:{date:%Y%m%d}T{s.time_end:%H%M%S}',
+            f'RRULE:FREQ=WEEKLY;BYDAY={BYDAY[s.day]}',
+            f'SUMMARY:{_escape(s.subject.subject_code)} - {_escape(s.subject.subject_name)}',
+            f'LOCATION:{_escape(s.room.room_name)}',
+            f'DESCRIPTION:{_escape(description)}',
+            'END:VEVENT',
+        ))
+
+    yield _fold('END:VCALENDAR')
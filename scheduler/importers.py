@@ -0,0 +1,569 @@
+"""
+Bulk import of term setup data from CSV / XLSX.
+
+Each kind of record has its own sheet (XLSX) or file (CSV, named after the
+kind, e.g. ``rooms.csv``):
+
+    departments              name, code, description
+    courses                  course_code, course_name, department, description
+    rooms                    room_name, capacity, room_type, floor, department
+    prospectus               course_code, curriculum, year, semester, subject_code, subject_name,
+                             lecture_units, lab_units, units, prerequisite,
+                             required_hours_per_week, meeting_type, is_required
+    instructors              username, first_name, last_name, email, instructor_number,
+                             department, subjects (subject codes separated by ";")
+    instructor_availability  username, day, start_time, end_time
+    room_availability        room_name, day, start_time, end_time
+
+Every row is validated in memory first, with foreign keys resolved through
+lookup dicts preloaded in one query per table; nothing is written unless
+the whole file is clean. Writes then go through bulk_create / bulk_update
+in a single transaction. Existing records are matched on their natural key
+(department code or name, course code, room name, curriculum name within a
+course, subject code within a curriculum, username) and updated in place;
+those whose values are unchanged are not written or counted as updated.
+"""
+import csv
+import datetime
+import io
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    Course, Curriculum, CurriculumSubject, Department, Instructor, InstructorAvailability,
+    Room, RoomAvailability, Semester, Subject, TimetableVersion, User, YearLevel,
+)
+from .search import refresh_search_documents
+from .timegrid import day_codes, day_mask
+
+try:
+    import openpyxl
+except ImportError:  # XLSX uploads are optional
+    openpyxl = None
+
+# Kinds in the order they are written, so later kinds can refer to earlier ones.
+KINDS = (
+    'departments', 'courses', 'rooms', 'prospectus', 'instructors',
+    'instructor_availability', 'room_availability',
+)
+BATCH_SIZE = 1000
+SEMESTER_NAMES = {1: '1st Semester', 2: '2nd Semester', 3: 'Summer'}
+SUBJECT_FIELDS = [
+    'subject_name', 'prerequisite', 'lecture_units', 'lab_units', 'units',
+    'required_hours_per_week', 'meeting_type', 'year_level', 'semester',
+]
+
+
+class ImportFileError(Exception):
+    """Raised for files that cannot be read at all (as opposed to bad rows)."""
+
+
+def read_file(fileobj, filename: str) -> Dict[str, List[dict]]:
+    """{kind: [row dicts]} from an uploaded CSV or XLSX file."""
+    name, ext = os.path.splitext(os.path.basename(filename).lower())
+    if ext == '.csv':
+        if name not in KINDS:
+            raise ImportFileError(f"Name CSV files after what they contain: {', '.join(KINDS)}.")
+        data = fileobj.read()
+        text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+        return {name: _normalise(csv.DictReader(io.StringIO(text)))}
+    if ext == '.xlsx':
+        if openpyxl is None:
+            raise ImportFileError("XLSX import needs openpyxl; install it or upload CSV files.")
+        book = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        sheets = {}
+        for sheet in book.worksheets:
+            kind = sheet.title.strip().lower()
+            if kind not in KINDS:
+                continue
+            rows = sheet.iter_rows(values_only=True)
+            header = [str(cell or '').strip() for cell in next(rows, ())]
+            sheets[kind] = _normalise(dict(zip(header, row)) for row in rows)
+        if not sheets:
+            raise ImportFileError(f"No sheets named after a known kind: {', '.join(KINDS)}.")
+        return sheets
+    raise ImportFileError("Upload a .csv or .xlsx file.")
+
+
+def _normalise(rows: Iterable[dict]) -> List[dict]:
+    cleaned = []
+    for row in rows:
+        row = {
+            str(key).strip().lower(): value.strip() if isinstance(value, str) else '' if value is None else value
+            for key, value in row.items() if key is not None
+        }
+        if any(value != '' for value in row.values()):
+            cleaned.append(row)
+    return cleaned
+
+
+class Importer:
+    """
+    One import run. ``run()`` validates every row, then writes everything or
+    nothing; ``errors`` holds ``(kind, line, message)`` for each bad row, where
+    line is the spreadsheet line number (header = 1).
+    """
+
+    def __init__(self, sheets: Dict[str, List[dict]], dry_run: bool = False):
+        self.sheets = sheets
+        self.dry_run = dry_run
+        self.errors = []
+        self.created = defaultdict(int)
+        self.updated = defaultdict(int)
+        self.planned_subject_codes = set()
+        self.planned_instructors = set()
+
+    # --- helpers ---------------------------------------------------------
+
+    def error(self, kind, line, message):
+        self.errors.append((kind, line, message))
+
+    def rows(self, kind):
+        return enumerate(self.sheets.get(kind, []), start=2)
+
+    @staticmethod
+    def _int(value, default=None):
+        if value in ('', None):
+            return default
+        return int(float(value))
+
+    @staticmethod
+    def _decimal(value, default):
+        return default if value in ('', None) else round(float(value), 1)
+
+    @staticmethod
+    def _time(value):
+        if isinstance(value, datetime.time):
+            return value
+        for fmt in ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p'):
+            try:
+                return datetime.datetime.strptime(str(value).strip().upper(), fmt).time()
+            except ValueError:
+                continue
+        raise ValueError(f"'{value}' is not a time")
+
+    @staticmethod
+    def _assign(obj, **values) -> bool:
+        """Set ``values`` on ``obj``; True if any of them differs from what it had."""
+        changed = False
+        for name, value in values.items():
+            field = obj._meta.get_field(name)
+            if field.is_relation:
+                # Compare keys, so unchanged relations cost no query; a related
+                # row created by this import has no key yet and always counts.
+                pk = None if value is None else value.pk
+                changed |= pk is None and value is not None or getattr(obj, field.attname) != pk
+            else:
+                changed |= getattr(obj, name) != value
+            setattr(obj, name, value)
+        return changed
+
+    def _save(self, model, new, changed, fields):
+        if new:
+            model.objects.bulk_create(new, batch_size=BATCH_SIZE)
+            self.created[model.__name__] += len(new)
+        if changed:
+            model.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+            self.updated[model.__name__] += len(changed)
+
+    # --- lookups -----------------------------------------------------------
+
+    def load_lookups(self):
+        self.departments = {}
+        for d in Department.objects.all():
+            self.departments[d.name.lower()] = d
+            if d.code:
+                self.departments[d.code.lower()] = d
+        self.courses = {c.course_code.lower(): c for c in Course.objects.all()}
+        self.rooms = {r.room_name.lower(): r for r in Room.objects.all()}
+        self.curricula = {(c.course_id, c.name.lower()): c for c in Curriculum.objects.all()}
+        self.year_levels = {(y.curriculum_id, y.year): y for y in YearLevel.objects.all()}
+        self.semesters = {(s.year_level_id, s.semester_number): s for s in Semester.objects.all()}
+        self.subjects = {}
+        self.subjects_by_code = defaultdict(list)
+        for s in Subject.objects.only('id', 'subject_code', 'curriculum_id', *SUBJECT_FIELDS):
+            self.subjects[(s.curriculum_id, s.subject_code.lower())] = s
+            self.subjects_by_code[s.subject_code.lower()].append(s)
+        self.curriculum_subjects = set(
+            CurriculumSubject.objects.values_list('curriculum_id', 'year_level_id', 'semester_id', 'subject_id')
+        )
+        self.users = {u.username.lower(): u for u in User.objects.all()}
+        self.instructors = {i.user_id: i for i in Instructor.objects.all()}
+        self.instructor_windows = set(InstructorAvailability.objects.values_list('instructor_id', 'day', 'start_time', 'end_time'))
+        self.room_windows = set(RoomAvailability.objects.values_list('room_id', 'day', 'start_time', 'end_time'))
+
+    # --- run ---------------------------------------------------------------
+
+    def run(self) -> dict:
+        self.load_lookups()
+        plans = [getattr(self, f'plan_{kind}')() for kind in KINDS]
+        if self.errors or self.dry_run:
+            return self.report()
+        with transaction.atomic():
+            for plan in plans:
+                plan()
+            if self.created.get('InstructorAvailability') or self.created.get('RoomAvailability'):
+                # bulk_create sends no signals.
+                TimetableVersion.bump(TimetableVersion.AVAILABILITY)
+            TimetableVersion.bump()
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            'created': dict(self.created),
+            'updated': dict(self.updated),
+            'errors': self.errors,
+            'written': not self.errors and not self.dry_run,
+        }
+
+    # Each plan_<kind>() validates its rows against the lookups (plus whatever
+    # earlier kinds in the same file will create) and returns a writer.
+
+    def plan_departments(self):
+        new, changed = {}, {}
+        for line, row in self.rows('departments'):
+            name, code = row.get('name', ''), row.get('code', '') or None
+            if not name:
+                self.error('departments', line, "name is required")
+                continue
+            dept = self.departments.get(name.lower()) or (code and self.departments.get(code.lower()))
+            if dept is None:
+                dept = new.setdefault(name.lower(), Department(name=name))
+            if self._assign(dept, name=name, code=code, description=row.get('description') or dept.description) and dept.pk:
+                changed[dept.pk] = dept
+            self.departments[name.lower()] = dept
+            if code:
+                self.departments[code.lower()] = dept
+
+        def write():
+            self._save(Department, list(new.values()), list(changed.values()), ['name', 'code', 'description'])
+            self._reload(Department, new.values(), 'name', self.departments, lambda d: d.name.lower())
+        return write
+
+    def _department(self, kind, line, value):
+        if not value:
+            return None
+        dept = self.departments.get(str(value).lower())
+        if dept is None:
+            self.error(kind, line, f"unknown department '{value}'")
+        return dept
+
+    def plan_courses(self):
+        new, changed = [], {}
+        for line, row in self.rows('courses'):
+            code = row.get('course_code', '')
+            if not code or not row.get('course_name'):
+                self.error('courses', line, "course_code and course_name are required")
+                continue
+            dept = self._department('courses', line, row.get('department'))
+            course = self.courses.get(code.lower())
+            if course is None:
+                course = Course(course_code=code)
+                new.append(course)
+            values = {'course_name': row['course_name'], 'description': row.get('description') or course.description}
+            if dept:
+                values['department'] = dept
+            if self._assign(course, **values) and course.pk:
+                changed[course.pk] = course
+            self.courses[code.lower()] = course
+
+        def write():
+            self._save(Course, new, list(changed.values()), ['course_name', 'department', 'description'])
+            self._reload(Course, new, 'course_code', self.courses, lambda c: c.course_code.lower())
+        return write
+
+    def plan_rooms(self):
+        new, changed = [], {}
+        for line, row in self.rows('rooms'):
+            name = str(row.get('room_name', ''))
+            if not name:
+                self.error('rooms', line, "room_name is required")
+                continue
+            room_type = str(row.get('room_type') or Room.RoomType.LECTURE).upper()
+            if room_type not in Room.RoomType.values:
+                self.error('rooms', line, f"room_type must be one of {', '.join(Room.RoomType.values)}")
+                continue
+            try:
+                capacity = self._int(row.get('capacity'), 30)
+                floor = self._int(row.get('floor'), 1)
+            except ValueError:
+                self.error('rooms', line, "capacity and floor must be numbers")
+                continue
+            dept = self._department('rooms', line, row.get('department'))
+            room = self.rooms.get(name.lower())
+            if room is None:
+                room = Room(room_name=name)
+                new.append(room)
+            values = {'capacity': capacity, 'floor': floor, 'room_type': room_type}
+            if dept:
+                values['department'] = dept
+            if self._assign(room, **values) and room.pk:
+                changed[room.pk] = room
+            self.rooms[name.lower()] = room
+
+        def write():
+            self._save(Room, new, list(changed.values()), ['capacity', 'floor', 'room_type', 'department'])
+            self._reload(Room, new, 'room_name', self.rooms, lambda r: r.room_name.lower())
+        return write
+
+    def plan_prospectus(self):
+        entries = []
+        for line, row in self.rows('prospectus'):
+            course = self.courses.get(str(row.get('course_code', '')).lower())
+            if course is None:
+                self.error('prospectus', line, f"unknown course '{row.get('course_code', '')}'")
+                continue
+            if not row.get('curriculum') or not row.get('subject_code') or not row.get('subject_name'):
+                self.error('prospectus', line, "curriculum, subject_code and subject_name are required")
+                continue
+            try:
+                year = self._int(row.get('year'))
+                semester = self._int(row.get('semester'))
+                lecture = self._decimal(row.get('lecture_units'), 3.0)
+                lab = self._decimal(row.get('lab_units'), 0.0)
+                fields = {
+                    'subject_name': row['subject_name'],
+                    'prerequisite': row.get('prerequisite') or None,
+                    'lecture_units': lecture,
+                    'lab_units': lab,
+                    'units': self._decimal(row.get('units'), lecture + lab),
+                    'required_hours_per_week': self._int(row.get('required_hours_per_week'), 3),
+                    'meeting_type': str(row.get('meeting_type') or 'LECTURE').upper(),
+                }
+            except ValueError:
+                self.error('prospectus', line, "year, semester, units and hours must be numbers")
+                continue
+            if not year or semester not in SEMESTER_NAMES:
+                self.error('prospectus', line, "year is required and semester must be 1, 2 or 3")
+                continue
+            if fields['meeting_type'] not in ('LECTURE', 'LABORATORY'):
+                self.error('prospectus', line, "meeting_type must be LECTURE or LABORATORY")
+                continue
+            entries.append({
+                'course': course,
+                'curriculum': str(row['curriculum']),
+                'year': year,
+                'semester': semester,
+                'code': str(row['subject_code']),
+                'fields': fields,
+                'is_required': str(row.get('is_required', '')).lower() not in ('0', 'no', 'false', 'n'),
+            })
+            self.planned_subject_codes.add(str(row['subject_code']).lower())
+
+        def write():
+            # One bulk insert per level of the tree: curricula, year levels,
+            # semesters, subjects, then the curriculum-subject links.
+            new = []
+            for e in entries:
+                key = (e['course'].pk, e['curriculum'].lower())
+                if key not in self.curricula:
+                    self.curricula[key] = Curriculum(course=e['course'], name=e['curriculum'])
+                    new.append(self.curricula[key])
+                e['curriculum'] = self.curricula[key]
+            self._save(Curriculum, new, [], [])
+            self._reload(Curriculum, new, 'name', self.curricula, lambda c: (c.course_id, c.name.lower()))
+
+            new = []
+            for e in entries:
+                key = (e['curriculum'].pk, e['year'])
+                if key not in self.year_levels:
+                    self.year_levels[key] = YearLevel(curriculum=e['curriculum'], year=e['year'])
+                    new.append(self.year_levels[key])
+                e['year'] = self.year_levels[key]
+            self._save(YearLevel, new, [], [])
+            self._reload(YearLevel, new, 'curriculum_id', self.year_levels, lambda y: (y.curriculum_id, y.year))
+
+            new = []
+            for e in entries:
+                key = (e['year'].pk, e['semester'])
+                if key not in self.semesters:
+                    self.semesters[key] = Semester(
+                        year_level=e['year'], semester_number=e['semester'], name=SEMESTER_NAMES[e['semester']],
+                    )
+                    new.append(self.semesters[key])
+                e['semester'] = self.semesters[key]
+            self._save(Semester, new, [], [])
+            self._reload(Semester, new, 'year_level_id', self.semesters, lambda s: (s.year_level_id, s.semester_number))
+
+            new, changed = [], {}
+            for e in entries:
+                key = (e['curriculum'].pk, e['code'].lower())
+                subject = self.subjects.get(key)
+                if subject is None:
+                    subject = self.subjects[key] = Subject(curriculum=e['curriculum'], subject_code=e['code'])
+                    new.append(subject)
+                values = dict(e['fields'], year_level_id=e['year'].pk, semester_id=e['semester'].pk)
+                if subject.pk and any(getattr(subject, name) != value for name, value in values.items()):
+                    changed[subject.pk] = subject
+                for name, value in e['fields'].items():
+                    setattr(subject, name, value)
+                subject.year_level, subject.semester = e['year'], e['semester']
+                e['subject'] = subject
+            self._save(Subject, new, list(changed.values()), SUBJECT_FIELDS)
+            self._reload(Subject, new, 'subject_code', self.subjects, lambda s: (s.curriculum_id, s.subject_code.lower()))
+            for subject in new:
+                self.subjects_by_code[subject.subject_code.lower()].append(subject)
+
+            new = []
+            for order, e in enumerate(entries):
+                key = (e['curriculum'].pk, e['year'].pk, e['semester'].pk, e['subject'].pk)
+                if key not in self.curriculum_subjects:
+                    self.curriculum_subjects.add(key)
+                    new.append(CurriculumSubject(
+                        curriculum=e['curriculum'], year_level=e['year'], semester=e['semester'],
+                        subject=e['subject'], is_required=e['is_required'], order=order,
+                    ))
+            self._save(CurriculumSubject, new, [], [])
+        return write
+
+    def plan_instructors(self):
+        entries = []
+        for line, row in self.rows('instructors'):
+            username = str(row.get('username', ''))
+            if not username:
+                self.error('instructors', line, "username is required")
+                continue
+            dept = self._department('instructors', line, row.get('department'))
+            codes = [c.strip().lower() for c in str(row.get('subjects', '')).split(';') if c.strip()]
+            unknown = [c for c in codes if c not in self.subjects_by_code and c not in self.planned_subject_codes]
+            if unknown:
+                self.error('instructors', line, f"unknown subject code(s): {', '.join(unknown)}")
+                continue
+            entries.append((row, username.lower(), dept, codes))
+            self.planned_instructors.add(username.lower())
+
+        def write():
+            new_users, changed_users = [], {}
+            for row, username, _, _ in entries:
+                user = self.users.get(username)
+                if user is None:
+                    user = self.users[username] = User(
+                        username=row['username'], role=User.Role.INSTRUCTOR, password=make_password(None),
+                    )
+                    new_users.append(user)
+                if self._assign(
+                    user, first_name=row.get('first_name') or user.first_name,
+                    last_name=row.get('last_name') or user.last_name, email=row.get('email') or user.email,
+                    instructor_number=row.get('instructor_number') or user.instructor_number,
+                ) and user.pk:
+                    changed_users[user.pk] = user
+            self._save(User, new_users, list(changed_users.values()),
+                       ['first_name', 'last_name', 'email', 'instructor_number'])
+            if changed_users:
+                # Instructor names are copied into the search documents; bulk_update sends no signals.
+                refresh_search_documents(Subject.objects.filter(
+                    instructor__user__in=list(changed_users)).values_list('pk', flat=True))
+            self._reload(User, new_users, 'username', self.users, lambda u: u.username.lower())
+
+            new, changed = [], {}
+            for _, username, dept, _ in entries:
+                user = self.users[username]
+                instructor = self.instructors.get(user.pk)
+                if instructor is None:
+                    instructor = self.instructors[user.pk] = Instructor(user=user)
+                    new.append(instructor)
+                if dept and self._assign(instructor, department=dept) and instructor.pk:
+                    changed[instructor.pk] = instructor
+            self._save(Instructor, new, list(changed.values()), ['department'])
+            self._reload(Instructor, new, 'user_id', self.instructors, lambda i: i.user_id)
+
+            Through = Instructor.subjects.through
+            instructor_ids = [self.instructors[self.users[u].pk].pk for _, u, _, _ in entries]
+            existing = set(Through.objects.filter(instructor_id__in=instructor_ids).values_list('instructor_id', 'subject_id'))
+            links = []
+            for _, username, _, codes in entries:
+                instructor = self.instructors[self.users[username].pk]
+                for code in codes:
+                    for subject in self.subjects_by_code[code]:
+                        if (instructor.pk, subject.pk) not in existing:
+                            existing.add((instructor.pk, subject.pk))
+                            links.append(Through(instructor_id=instructor.pk, subject_id=subject.pk))
+            if links:
+                Through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+                self.created['qualifications'] += len(links)
+        return write
+
+    def _windows(self, kind):
+        entries = []
+        for line, row in self.rows(kind):
+            days = day_codes(day_mask([row.get('day', '')]))
+            day = days[0] if days else None
+            try:
+                start, end = self._time(row.get('start_time')), self._time(row.get('end_time'))
+            except ValueError as e:
+                self.error(kind, line, str(e))
+                continue
+            if day is None:
+                self.error(kind, line, f"unknown day '{row.get('day', '')}'")
+            elif start >= end:
+                self.error(kind, line, "start_time must be before end_time")
+            else:
+                entries.append((line, row, day, start, end))
+        return entries
+
+    def plan_instructor_availability(self):
+        entries = []
+        for line, row, day, start, end in self._windows('instructor_availability'):
+            username = str(row.get('username', '')).lower()
+            user = self.users.get(username)
+            if username not in self.planned_instructors and (user is None or user.pk not in self.instructors):
+                self.error('instructor_availability', line, f"unknown instructor '{row.get('username', '')}'")
+                continue
+            entries.append((username, day, start, end))
+
+        def write():
+            new = []
+            for username, day, start, end in entries:
+                instructor = self.instructors[self.users[username].pk]
+                key = (instructor.pk, day, start, end)
+                if key not in self.instructor_windows:
+                    self.instructor_windows.add(key)
+                    new.append(InstructorAvailability(instructor=instructor, day=day, start_time=start, end_time=end))
+            self._save(InstructorAvailability, new, [], [])
+        return write
+
+    def plan_room_availability(self):
+        entries = []
+        for line, row, day, start, end in self._windows('room_availability'):
+            name = str(row.get('room_name', '')).lower()
+            if name not in self.rooms:
+                self.error('room_availability', line, f"unknown room '{row.get('room_name', '')}'")
+                continue
+            entries.append((name, day, start, end))
+
+        def write():
+            new = []
+            for name, day, start, end in entries:
+                room = self.rooms[name]
+                key = (room.pk, day, start, end)
+                if key not in self.room_windows:
+                    self.room_windows.add(key)
+                    new.append(RoomAvailability(room=room, day=day, start_time=start, end_time=end))
+            self._save(RoomAvailability, new, [], [])
+        return write
+
+    # --- primary keys after bulk_create ---------------------------------
+
+    @staticmethod
+    def _reload(model, created, field, lookup, key):
+        """
+        Put created rows, with primary keys, into ``lookup``. Backends that
+        cannot return ids from bulk_create (MySQL) get one query per batch.
+        """
+        created = list(created)
+        missing = [obj for obj in created if obj.pk is None]
+        if not missing:
+            return
+        values = {getattr(obj, field) for obj in missing}
+        for obj in model.objects.filter(**{f'{field}__in': values}):
+            if key(obj) in lookup and lookup[key(obj)] is not None and lookup[key(obj)].pk is None:
+                lookup[key(obj)].pk = obj.pk
+
+
+def import_file(fileobj, filename: str, dry_run: bool = False) -> dict:
+    """Read and import one upload; see the module docstring for the layout."""
+    return Importer(read_file(fileobj, filename), dry_run=dry_run).run()
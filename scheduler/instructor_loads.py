@@ -0,0 +1,112 @@
+"""
+Instructor teaching loads for the timetable generator.
+
+InstructorLoads keeps every instructor's weekly teaching minutes and load
+units in memory: seeded from the saved schedules with one query, then
+updated as the generator places blocks, so caps and least-loaded ordering
+cost no queries per candidate. Load units (Subject.load_units) count once
+per subject and section an instructor teaches; hours count per block.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+
+from .models import Instructor, Schedule, Subject
+
+
+def _default_caps() -> Tuple[Optional[int], Optional[Decimal]]:
+    hours = getattr(settings, 'SCHEDULER_MAX_WEEKLY_HOURS', 0)
+    units = getattr(settings, 'SCHEDULER_MAX_LOAD_UNITS', 0)
+    return (hours * 60 if hours else None), (Decimal(str(units)) if units else None)
+
+
+class InstructorLoads:
+    def __init__(self, instructors: Iterable[Instructor]):
+        default_minutes, default_units = _default_caps()
+        self.instructors: Dict[int, Instructor] = {}
+        self.max_minutes: Dict[int, Optional[int]] = {}
+        self.max_units: Dict[int, Optional[Decimal]] = {}
+        for instructor in instructors:
+            self.instructors[instructor.id] = instructor
+            hours = instructor.max_weekly_hours
+            self.max_minutes[instructor.id] = hours * 60 if hours is not None else default_minutes
+            self.max_units[instructor.id] = (
+                instructor.max_load_units if instructor.max_load_units is not None else default_units
+            )
+        self.minutes: Counter = Counter()
+        self.units: Dict[int, Decimal] = defaultdict(Decimal)
+        self.teaching: Set[Tuple[int, int, int]] = set()  # (instructor, subject, section)
+        self.blocks: Counter = Counter()  # blocks per teaching key
+
+    @classmethod
+    def load(cls, instructors: Iterable[Instructor]) -> 'InstructorLoads':
+        """Loads of ``instructors`` from the saved schedules, in one query."""
+        loads = cls(instructors)
+        rows = (
+            Schedule.objects.filter(instructor__in=list(loads.instructors))
+            .values_list('instructor_id', 'subject_id', 'section_id', 'subject__load_units')
+            .annotate(minutes=Sum(F('week_end') - F('week_start')), blocks=Count('pk'))
+            .order_by()
+        )
+        for instructor_id, subject_id, section_id, load_units, minutes, blocks in rows:
+            loads.minutes[instructor_id] += minutes or 0
+            loads.teaching.add((instructor_id, subject_id, section_id))
+            loads.blocks[instructor_id, subject_id, section_id] += blocks
+            loads.units[instructor_id] += load_units or 0
+        return loads
+
+    def fits(self, instructor_id: int, subject: Subject, section_id: int, minutes: int) -> bool:
+        """True if one more block of ``minutes`` stays within the instructor's caps."""
+        max_minutes = self.max_minutes.get(instructor_id)
+        if max_minutes is not None and self.minutes[instructor_id] + minutes > max_minutes:
+            return False
+        max_units = self.max_units.get(instructor_id)
+        if max_units is not None and (instructor_id, subject.id, section_id) not in self.teaching:
+            return self.units[instructor_id] + subject.load_units <= max_units
+        return True
+
+    def add(self, instructor_id: int, subject: Subject, section_id: int, minutes: int) -> None:
+        self.minutes[instructor_id] += minutes
+        key = (instructor_id, subject.id, section_id)
+        self.blocks[key] += 1
+        if key not in self.teaching:
+            self.teaching.add(key)
+            self.units[instructor_id] += subject.load_units
+
+    def remove(self, instructor_id: int, subject: Subject, section_id: int, minutes: int) -> None:
+        """Undo add() for a block that was not saved after all."""
+        self.minutes[instructor_id] -= minutes
+        key = (instructor_id, subject.id, section_id)
+        self.blocks[key] -= 1
+        if self.blocks[key] <= 0:
+            del self.blocks[key]
+            self.teaching.discard(key)
+            self.units[instructor_id] -= subject.load_units
+
+    def ranked(self, candidates: Sequence[Instructor], subject: Subject, section_id: int) -> List[Instructor]:
+        """
+        ``candidates`` in the order to try them: whoever already teaches this
+        subject to the section first (no new load units), then least loaded.
+        """
+        return sorted(candidates, key=lambda i: (
+            (i.id, subject.id, section_id) not in self.teaching, self.minutes[i.id], self.units[i.id],
+        ))
+
+    def report(self) -> List[Dict]:
+        """Per-instructor hours and load units against their caps, heaviest first."""
+        rows = []
+        for instructor_id, instructor in self.instructors.items():
+            max_minutes, max_units = self.max_minutes[instructor_id], self.max_units[instructor_id]
+            rows.append({
+                'instructor_id': instructor_id,
+                'instructor': str(instructor),
+                'hours': round(self.minutes[instructor_id] / 60, 2),
+                'load_units': float(self.units[instructor_id]),
+                'max_hours': None if max_minutes is None else max_minutes / 60,
+                'max_load_units': None if max_units is None else float(max_units),
+            })
+        rows.sort(key=lambda r: (-r['hours'], -r['load_units'], r['instructor']))
+        return rows
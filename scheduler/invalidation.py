@@ -0,0 +1,172 @@
+"""
+Which cached artefacts a row change makes stale.
+
+DEPENDENCIES maps each scoped cache namespace (see cache.py) to the kind of
+scope its entries are stored under and, per model, how a changed row leads
+to the scopes to retire:
+
+* ``Field(attname)``: the row names the scope itself, e.g. a Schedule's
+  ``instructor_id``. Both the value before and after a save count, so a
+  class moved to another instructor refreshes both dashboards.
+* ``Through(model, lookup, field)``: the scopes of the ``model`` rows that
+  reach the changed row through ``lookup``, e.g. the instructors teaching
+  in a renamed room.
+* ``Counted()``: the whole namespace, when rows are created or deleted.
+* ``Always()``: the whole namespace, on any change.
+
+signals.py feeds every save and delete, and the rows_changing/rows_changed
+signals of the Schedule and Subject querysets, through ``scopes_for()``.
+The namespaces are retired when the transaction commits.
+
+public_schedule is not listed: its pages are filtered by free text, so any
+change can touch any page, and they are keyed on the TimetableVersion tag.
+Nor is availability, keyed on its own TimetableVersion scope.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from django.db import transaction
+
+from . import cache
+from .models import (
+    Schedule, Subject, Section, Room, Course, Department, Curriculum,
+    CurriculumSubject, Semester, YearLevel, Instructor, User,
+)
+
+ALL = 'all'
+
+Targets = Dict[str, Union[Set, str]]
+
+
+class Field:
+    def __init__(self, attname: str):
+        self.attname = attname
+        self.keys = (attname,)
+
+    def resolve(self, rows: List[Dict], event: str) -> Union[Set, str]:
+        return {row[self.attname] for row in rows} - {None}
+
+
+class Through:
+    def __init__(self, model, lookup: str, field: str, key: str = 'pk'):
+        self.model = model
+        self.lookup = lookup
+        self.field = field
+        self.key = key
+        self.keys = () if key == 'pk' else (key,)
+
+    def resolve(self, rows: List[Dict], event: str) -> Union[Set, str]:
+        keys = {row[self.key] for row in rows} - {None}
+        if not keys:
+            return set()
+        found = self.model.objects.filter(**{f'{self.lookup}__in': keys}).values_list(self.field, flat=True)
+        return set(found) - {None}
+
+
+class Counted:
+    keys = ()
+
+    def resolve(self, rows: List[Dict], event: str) -> Union[Set, str]:
+        return ALL if event in ('create', 'delete') else set()
+
+
+class Always:
+    keys = ()
+
+    def resolve(self, rows: List[Dict], event: str) -> Union[Set, str]:
+        return ALL
+
+
+# namespace: (scope kind, {model: [dependencies]})
+DEPENDENCIES = {
+    'instructor_dashboard': ('instructor', {
+        Schedule: [Field('instructor_id')],
+        Subject: [Through(Schedule, 'subject', 'instructor_id')],
+        Section: [Through(Schedule, 'section', 'instructor_id')],
+        Room: [Through(Schedule, 'room', 'instructor_id')],
+        Course: [Through(Schedule, 'section__course', 'instructor_id')],
+        Department: [Through(Schedule, 'section__course__department', 'instructor_id')],
+        Curriculum: [Through(Schedule, 'subject__curriculum', 'instructor_id')],
+        CurriculumSubject: [Through(Schedule, 'subject', 'instructor_id', key='subject_id')],
+        # Semester and year names label every dashboard's groups.
+        Semester: [Always()],
+        YearLevel: [Always()],
+    }),
+    'room_schedule': ('room', {
+        # views.room_timetables()
+        Schedule: [Field('room_id')],
+        Subject: [Through(Schedule, 'subject', 'room_id')],
+        Section: [Through(Schedule, 'section', 'room_id')],
+        Instructor: [Through(Schedule, 'instructor', 'room_id')],
+        User: [Through(Schedule, 'instructor__user', 'room_id')],
+    }),
+    'dashboard': ('dashboard', {
+        # _admin_dashboard_totals(): row counts, plus instructors by role.
+        User: [Always()],
+        Schedule: [Counted()],
+        Subject: [Counted()],
+        Room: [Counted()],
+        Section: [Counted()],
+        Curriculum: [Counted()],
+    }),
+}
+
+MODELS = {model for _kind, models in DEPENDENCIES.values() for model in models}
+
+
+def _dependencies(model):
+    for namespace, (_kind, models) in DEPENDENCIES.items():
+        for dependency in models.get(model, ()):
+            yield namespace, dependency
+
+
+def key_fields(model) -> List[str]:
+    """Columns a row of ``model`` must be read with to resolve its dependencies."""
+    fields = {'pk'}
+    for _namespace, dependency in _dependencies(model):
+        fields.update(dependency.keys)
+    return sorted(fields)
+
+
+def instance_row(instance) -> Dict:
+    return {name: instance.pk if name == 'pk' else getattr(instance, name) for name in key_fields(type(instance))}
+
+
+def stored_rows(model, pks: Iterable) -> List[Dict]:
+    """Key rows of ``model`` as they are in the database now."""
+    pks = list(pks)
+    if not pks:
+        return []
+    return list(model._base_manager.filter(pk__in=pks).values(*key_fields(model)))
+
+
+def scopes_for(model, rows: Optional[List[Dict]], event: str) -> Targets:
+    """
+    ``{namespace: scope ids or ALL}`` made stale by ``event`` ('create',
+    'save' or 'delete') on ``rows``; ``None`` rows mean unknown ones.
+    """
+    targets: Targets = {}
+    for namespace, dependency in _dependencies(model):
+        if targets.get(namespace) == ALL:
+            continue
+        found = ALL if rows is None else dependency.resolve(rows, event)
+        if found == ALL:
+            targets[namespace] = ALL
+        elif found:
+            targets.setdefault(namespace, set()).update(found)
+    return targets
+
+
+def _retire(targets: Targets):
+    for namespace, found in targets.items():
+        if found == ALL:
+            cache.invalidate(namespace)
+            continue
+        kind = DEPENDENCIES[namespace][0]
+        for scope_id in found:
+            cache.invalidate_scope(namespace, (kind, scope_id))
+
+
+def invalidate(targets: Targets):
+    """Retire ``targets`` once the current transaction commits."""
+    if targets:
+        transaction.on_commit(lambda: _retire(targets))
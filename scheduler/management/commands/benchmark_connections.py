@@ -0,0 +1,106 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+PAGES = ('admin_dashboard', 'public_schedule')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time admin_dashboard and public_schedule through the WSGI handler, as gunicorn "
+        "runs them, once reconnecting on every request (CONN_MAX_AGE=0) and once with "
+        "the configured connection settings, and report latency and connections opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per page and mode.")
+        parser.add_argument('--user', required=True, help="Username of an admin to request admin_dashboard as.")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user '{options['user']}'.")
+        session_cookie = self._session_cookie(user)
+
+        alias = options['database']
+        connection = connections[alias]
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        pooled = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+        modes = [('reconnect', 0), ('configured', configured)]
+        if pooled:
+            # Pool checkouts are what is being measured; there is no "no pool" mode to switch to.
+            modes = [('pool', 0)]
+
+        handler = WSGIHandler()
+        opened = []
+        connection_created.connect(lambda sender, connection, **kw: opened.append(connection.alias), weak=False)
+
+        self.stdout.write(f"{connection.vendor}, {options['requests']} requests per page")
+        for mode, max_age in modes:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            for page in PAGES:
+                opened.clear()
+                timings = []
+                statuses = set()
+                environ = self._environ(reverse(page), session_cookie)
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    response = handler(
+                        dict(environ, **{'wsgi.input': BytesIO()}),
+                        lambda status, headers: statuses.add(status.split()[0]),
+                    )
+                    b''.join(response)
+                    response.close()  # request_finished: close_old_connections(), as under gunicorn
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{mode:>10} {page:<16} mean {statistics.mean(timings):7.2f} ms  "
+                    f"p50 {timings[len(timings) // 2]:7.2f} ms  p95 {timings[int(len(timings) * 0.95)]:7.2f} ms  "
+                    f"connections opened {opened.count(alias)}  status {','.join(sorted(statuses))}"
+                )
+        connection.settings_dict['CONN_MAX_AGE'] = configured
+        connection.close()
+
+    @staticmethod
+    def _session_cookie(user):
+        store = import_string(f"{settings.SESSION_ENGINE}.SessionStore")()
+        store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        return f"{settings.SESSION_COOKIE_NAME}={store.session_key}"
+
+    @staticmethod
+    def _environ(path, cookie):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS and settings.ALLOWED_HOSTS[0] != '*' else 'localhost'
+        return {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': host,
+            'HTTP_COOKIE': cookie,
+            'REMOTE_ADDR': '127.0.0.1',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
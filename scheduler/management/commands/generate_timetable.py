@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.auto_scheduler import generate_timetable
+from scheduler.models import SchedulerRun
+from scheduler.profiling import PROFILERS
+from scheduler.publishing import publish_timetables
+
+
+class Command(BaseCommand):
+    help = "Run the timetable generator and print its phase timings, counters and instructor loads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curriculum', type=int, help="Only this curriculum id (default: all active).")
+        parser.add_argument('--profile', choices=PROFILERS, help="Capture a profiler report with the run.")
+        parser.add_argument('--no-publish', action='store_true', help="Skip republishing the timetable snapshots.")
+
+    def handle(self, *args, **options):
+        try:
+            result = generate_timetable(curriculum_id=options['curriculum'], profiler=options['profile'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not options['no_publish']:
+            publish_timetables()
+
+        self.stdout.write(json.dumps(result['profile'], indent=2))
+        for load in result['instructor_loads']:
+            caps = ' / '.join(
+                f"max {load[key]:g} {label}" for key, label in (('max_hours', 'h'), ('max_load_units', 'units'))
+                if load[key] is not None
+            )
+            self.stdout.write(
+                f"{load['instructor']:<30} {load['hours']:6.1f} h {load['load_units']:6.1f} units"
+                + (f"  ({caps})" if caps else '')
+            )
+        if options['profile']:
+            self.stdout.write(SchedulerRun.objects.get(pk=result['run_id']).profiler_report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Run #{result['run_id']}: {result['created']} created, {len(result['failed'])} failed."
+        ))
+
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.importers import ImportFileError, import_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import departments, courses, rooms, prospectus rows, instructors and "
+        "availability windows from CSV files (named after their kind) or XLSX workbooks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="CSV or XLSX files, e.g. rooms.csv prospectus.csv")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+
+    def handle(self, *args, **options):
+        failed = False
+        for path in options['files']:
+            try:
+                with open(path, 'rb') as f:
+                    report = import_file(f, path, dry_run=options['dry_run'])
+            except (OSError, ImportFileError) as e:
+                raise CommandError(f"{path}: {e}")
+
+            for kind, line, message in report['errors']:
+                self.stderr.write(f"{path}: {kind} line {line}: {message}")
+            if report['errors']:
+                failed = True
+                self.stderr.write(self.style.ERROR(f"{path}: {len(report['errors'])} bad row(s); nothing imported."))
+                continue
+            counts = ", ".join(
+                f"{model}: {report['created'].get(model, 0)} new / {report['updated'].get(model, 0)} updated"
+                for model in sorted(set(report['created']) | set(report['updated']))
+            ) or "nothing to do"
+            verb = "Validated" if options['dry_run'] else "Imported"
+            self.stdout.write(self.style.SUCCESS(f"{verb} {path}: {counts}"))
+        if failed:
+            raise CommandError("Some files were not imported.")
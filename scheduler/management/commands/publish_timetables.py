@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from scheduler.publishing import publish_timetables
+
+
+class Command(BaseCommand):
+    help = "Write static JSON timetable snapshots for the public schedule."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Republish even if nothing changed.")
+
+    def handle(self, *args, **options):
+        index = publish_timetables(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Published timetable v{index['version']}: "
+            + ", ".join(f"{len(index[kind])} {kind}" for kind in ('departments', 'sections', 'rooms', 'instructors'))
+        ))
@@ -0,0 +1,298 @@
+"""
+Prometheus text-format metrics, aggregated across gunicorn workers.
+
+Each process keeps its counters and histograms in memory and a daemon
+thread writes them, at most once per FLUSH_INTERVAL, to
+``METRICS_DIR/<pid>-<start time>.json``; the start time keeps a reused pid
+from overwriting an exited worker's file. The /metrics view merges every
+file in the directory, so whichever worker serves the scrape reports the
+totals of all of them. Before merging, files of exited workers are folded
+into AGGREGATE_FILE and removed, so counters never go backwards and the
+directory does not grow with worker churn.
+
+Gauges (``GAUGES``) are computed at scrape time instead of being stored.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; exited workers' files are then kept as they are
+    fcntl = None
+
+FLUSH_INTERVAL = 1.0
+AGGREGATE_FILE = 'exited.json'
+LOCK_FILE = '.lock'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+RUN_BUCKETS = (0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+
+# name: (type, help, buckets)
+METRICS = {
+    'scheduler_http_request_duration_seconds': (
+        'histogram', 'Request latency by URL name.', LATENCY_BUCKETS,
+    ),
+    'scheduler_http_requests_total': (
+        'counter', 'Requests by URL name and status class.', None,
+    ),
+    'scheduler_db_queries_per_request': (
+        'histogram', 'SQL queries run per request, by URL name.', QUERY_BUCKETS,
+    ),
+    'scheduler_run_duration_seconds': (
+        'histogram', 'Wall time of timetable generator runs.', RUN_BUCKETS,
+    ),
+    'scheduler_run_blocks_total': (
+        'counter', 'Schedule blocks handled by generator runs, by outcome (placed or failed).', None,
+    ),
+    'scheduler_cache_requests_total': (
+        'counter', 'Cache lookups by namespace and result (hit or miss); see scheduler.cache.', None,
+    ),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def metrics_dir() -> str:
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'class_scheduling_metrics')
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: Dict[str, Dict[Labels, object]] = {}
+        self.dirty = False
+        self.pid = None
+        self.filename = None
+
+    def _series(self, name: str, labels: Dict[str, str]):
+        return self.values.setdefault(name, {}), tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1):
+        with self.lock:
+            self._ready()
+            series, key = self._series(name, labels)
+            series[key] = series.get(key, 0) + amount
+            self.dirty = True
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        buckets = METRICS[name][2]
+        with self.lock:
+            self._ready()
+            series, key = self._series(name, labels)
+            counts, total, count = series.get(key) or ([0] * len(buckets), 0.0, 0)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[key] = (counts, total + value, count + 1)
+            self.dirty = True
+
+    def _ready(self):
+        # Called with the lock held before every update. A new pid means the
+        # first update in this process, or a fork of one that already had
+        # values; those belong to the parent's file, so start empty.
+        pid = os.getpid()
+        if self.pid != pid:
+            self.values = {}
+            self.pid = pid
+            self.filename = f"{pid}-{time.time_ns()}.json"
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty or self.pid != os.getpid():
+                return
+            data = _serialise(self.values)
+            self.dirty = False
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, self.filename), data)
+
+
+_store = _Store()
+inc = _store.inc
+observe = _store.observe
+flush = _store.flush
+
+
+# ---------------------------------------------------------------------------
+# Scrape-time gauges
+
+def _snapshot_lag():
+    # Timetable versions not yet published as static snapshots: the only
+    # deferred work this app has (there is no job queue).
+    from .models import TimetableVersion
+    from .publishing import load_index
+    index = load_index()
+    published = index['version'] if index else 0
+    return [((), max(0, TimetableVersion.current().version - published))]
+
+
+GAUGES = {
+    'scheduler_snapshot_publish_lag_versions': (
+        'Timetable changes not yet published to the static snapshots.', _snapshot_lag,
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+
+def _serialise(values: Dict[str, Dict[Labels, object]]) -> Dict:
+    return {name: [[list(key), value] for key, value in series.items()] for name, series in values.items()}
+
+
+def _write(path: str, data: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # being replaced, or unreadable
+
+
+def _add(merged: Dict[str, Dict[Labels, object]], data: Dict) -> None:
+    for name, samples in data.items():
+        if name not in METRICS:
+            continue
+        series = merged.setdefault(name, {})
+        for key, value in samples:
+            key = tuple(tuple(pair) for pair in key)
+            if METRICS[name][0] == 'histogram':
+                counts, total, count = series.get(key) or ([0] * len(METRICS[name][2]), 0.0, 0)
+                series[key] = ([a + b for a, b in zip(counts, value[0])], total + value[1], count + value[2])
+            else:
+                series[key] = series.get(key, 0) + value
+
+
+def _worker_files(directory: str):
+    try:
+        return [n for n in os.listdir(directory) if n.endswith('.json') and n != AGGREGATE_FILE]
+    except FileNotFoundError:
+        return []
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return False  # another user's process: the pid was reused after ours exited
+    return True
+
+
+def _exited(filename: str) -> bool:
+    pid = filename[:-len('.json')].split('-', 1)[0]
+    return pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid))
+
+
+def _fold_exited(directory: str) -> None:
+    """
+    Add the files of exited workers into AGGREGATE_FILE, then remove them.
+    The aggregate lists the files it has absorbed, so one left behind by a
+    crash between the two steps is removed next time, not counted twice.
+    Called with the lock held.
+    """
+    present = _worker_files(directory)
+    exited = [name for name in present if _exited(name)]
+    if not exited:
+        return
+    path = os.path.join(directory, AGGREGATE_FILE)
+    aggregate = _read(path) if os.path.exists(path) else {}
+    if aggregate is None:
+        return  # unreadable: keep every file rather than lose counts
+    folded = set(aggregate.pop('folded', [])) & set(present)
+    merged: Dict[str, Dict[Labels, object]] = {}
+    _add(merged, aggregate)
+    for name in exited:
+        if name not in folded:
+            data = _read(os.path.join(directory, name))
+            if data is None:
+                continue
+            _add(merged, data)
+            folded.add(name)
+    data = _serialise(merged)
+    data['folded'] = sorted(folded)
+    _write(path, data)
+    for name in folded:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def _merge() -> Dict[str, Dict[Labels, object]]:
+    merged: Dict[str, Dict[Labels, object]] = {}
+    directory = metrics_dir()
+    if not os.path.isdir(directory):
+        return merged
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        # Scrapes take turns, so none sees a file both folded and still present.
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            _fold_exited(directory)
+        aggregate = os.path.join(directory, AGGREGATE_FILE)
+        for path in [os.path.join(directory, name) for name in _worker_files(directory)] + [aggregate]:
+            data = _read(path) if os.path.exists(path) else None
+            if data is not None:
+                _add(merged, data)
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render() -> str:
+    """All metrics of all worker processes, in Prometheus text format 0.0.4."""
+    flush()
+    merged = _merge()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(merged.get(name, {}).items()):
+            if kind == 'histogram':
+                counts, total, count = value
+                for bound, n in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{_labels(key + (('le', _number(bound)),))} {n}")
+                lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(key)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+            else:
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+    for name, (help_text, compute) in GAUGES.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in compute():
+            lines.append(f"{name}{_labels(key)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,144 @@
+"""
+Per-request SQL and timing instrumentation.
+
+MetricsMiddleware feeds every request's latency and query count into the
+Prometheus histograms of scheduler.metrics.
+
+A sampled fraction of requests (REQUEST_PROFILE_SAMPLE_RATE) is timed and
+has its queries counted through a connection execute_wrapper, which works
+with DEBUG off. Each sample is logged as one JSON line on the
+``scheduler.requests`` logger and kept in an in-process ring buffer of the
+last REQUEST_PROFILE_BUFFER_SIZE samples, read by the admin
+``request_profile_api`` endpoint. Unsampled requests only pay for one
+random() call.
+"""
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger('scheduler.requests')
+
+# Shared by all threads of this process; deque appends are atomic.
+recent_requests = deque(maxlen=getattr(settings, 'REQUEST_PROFILE_BUFFER_SIZE', 500))
+
+
+class QueryRecorder:
+    """execute_wrapper that counts queries, their time and exact repeats."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.seen = set()
+        self.duplicates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            key = (sql, repr(params))
+            if key in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(key)
+
+
+class QueryCounter:
+    """execute_wrapper that only counts queries; cheap enough for every request."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        # Unresolved paths share one label so 404 probes cannot add series.
+        view = (match.url_name or match._func_path) if match else 'unmatched'
+        metrics.observe('scheduler_http_request_duration_seconds', {'view': view}, elapsed)
+        metrics.observe('scheduler_db_queries_per_request', {'view': view}, counter.count)
+        metrics.inc('scheduler_http_requests_total', {'view': view, 'status': f"{response.status_code // 100}xx"})
+        return response
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, 'REQUEST_PROFILE_SAMPLE_RATE', 0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall = time.perf_counter() - start
+
+        match = request.resolver_match
+        record = {
+            'at': timezone.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.path,
+            'view': (match.view_name or match._func_path) if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall * 1000, 1),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.seconds * 1000, 1),
+            'duplicate_queries': recorder.duplicates,
+            # Streaming bodies are not buffered, so their size is unknown here.
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+        recent_requests.append(record)
+        logger.info(json.dumps(record, separators=(',', ':')))
+        return response
+
+
+def profile_summary(records):
+    """Per-view totals over ``records``, heaviest total SQL time first."""
+    views = {}
+    for r in records:
+        v = views.setdefault(r['view'], {
+            'view': r['view'], 'requests': 0, 'wall_ms': 0.0, 'sql_ms': 0.0,
+            'queries': 0, 'max_queries': 0, 'duplicate_queries': 0,
+        })
+        v['requests'] += 1
+        v['wall_ms'] += r['wall_ms']
+        v['sql_ms'] += r['sql_ms']
+        v['queries'] += r['queries']
+        v['max_queries'] = max(v['max_queries'], r['queries'])
+        v['duplicate_queries'] += r['duplicate_queries']
+    for v in views.values():
+        v['avg_wall_ms'] = round(v['wall_ms'] / v['requests'], 1)
+        v['avg_queries'] = round(v['queries'] / v['requests'], 1)
+        v['wall_ms'], v['sql_ms'] = round(v['wall_ms'], 1), round(v['sql_ms'], 1)
+    return sorted(views.values(), key=lambda v: v['sql_ms'], reverse=True)
@@ -0,0 +1,129 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:38
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLOT_MINUTES = 5
+REPORT_LIMIT = 50
+
+OVERLAP_CONSTRAINTS = (
+    ('room_id', 'schedule_room_no_overlap'),
+    ('instructor_id', 'schedule_instructor_no_overlap'),
+    ('section_id', 'schedule_section_no_overlap'),
+)
+
+
+def _cells(sched):
+    first = (sched.time_start.hour * 60 + sched.time_start.minute) // SLOT_MINUTES
+    last = -(-(sched.time_end.hour * 60 + sched.time_end.minute) // SLOT_MINUTES)
+    return first, last
+
+
+def check_overlaps(apps, schema_editor):
+    """
+    Refuse to migrate while existing schedules share a room, instructor or
+    section cell: neither the occupancy rows nor the exclusion constraints
+    can hold them, and picking a survivor here would silently drop classes.
+    """
+    Schedule = apps.get_model('scheduler', 'Schedule')
+    timeline = defaultdict(list)
+    for sched in Schedule.objects.using(schema_editor.connection.alias).order_by('pk').iterator():
+        first, last = _cells(sched)
+        for column, _name in OVERLAP_CONSTRAINTS:
+            timeline[(column[:-3], getattr(sched, column), sched.day)].append((first, last, sched))
+
+    clashes = []
+    for (resource, resource_id, day), entries in timeline.items():
+        entries.sort(key=lambda entry: (entry[0], entry[2].pk))
+        latest = None  # (end cell, schedule) reaching furthest so far
+        for first, last, sched in entries:
+            if latest is not None and first < latest[0]:
+                other = latest[1]
+                clashes.append(
+                    f"  {resource} {resource_id} on {day}: schedule {other.pk} "
+                    f"({other.time_start:%H:%M}-{other.time_end:%H:%M}) and schedule {sched.pk} "
+                    f"({sched.time_start:%H:%M}-{sched.time_end:%H:%M})"
+                )
+            if latest is None or last > latest[0]:
+                latest = (last, sched)
+    if clashes:
+        shown = clashes[:REPORT_LIMIT]
+        if len(clashes) > REPORT_LIMIT:
+            shown.append(f"  ... and {len(clashes) - REPORT_LIMIT} more")
+        raise RuntimeError(
+            f"{len(clashes)} pair(s) of existing schedules overlap. Move or delete one of each "
+            "pair, then run the migration again:\n" + "\n".join(shown)
+        )
+
+
+def backfill_slots(apps, schema_editor):
+    Schedule = apps.get_model('scheduler', 'Schedule')
+    ScheduleSlot = apps.get_model('scheduler', 'ScheduleSlot')
+
+    batch = []
+    for sched in Schedule.objects.using(schema_editor.connection.alias).iterator():
+        first, last = _cells(sched)
+        for resource_type, resource_id in (
+            ('ROOM', sched.room_id), ('INSTRUCTOR', sched.instructor_id), ('SECTION', sched.section_id),
+        ):
+            for index in range(first, last):
+                batch.append(ScheduleSlot(
+                    schedule_id=sched.id, resource_type=resource_type, resource_id=resource_id,
+                    day=sched.day, slot_index=index,
+                ))
+        if len(batch) >= 5000:
+            ScheduleSlot.objects.using(schema_editor.connection.alias).bulk_create(batch)
+            batch = []
+    # check_overlaps() has run, so every row fits.
+    ScheduleSlot.objects.using(schema_editor.connection.alias).bulk_create(batch)
+
+
+def add_exclusion_constraints(apps, schema_editor):
+    # PostgreSQL can enforce non-overlap on the time ranges directly; other
+    # backends rely on the unique key of scheduler_schedule_slot.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column, name in OVERLAP_CONSTRAINTS:
+        schema_editor.execute(
+            f'ALTER TABLE scheduler_schedule ADD CONSTRAINT {name} EXCLUDE USING gist ('
+            f"{column} WITH =, day WITH =, "
+            f"tsrange(DATE '2000-01-01' + time_start, DATE '2000-01-01' + time_end) WITH &&)"
+        )
+
+
+def drop_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, name in OVERLAP_CONSTRAINTS:
+        schema_editor.execute(f'ALTER TABLE scheduler_schedule DROP CONSTRAINT IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_alter_section_unique_together_section_semester_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ScheduleSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(choices=[('ROOM', 'Room'), ('INSTRUCTOR', 'Instructor'), ('SECTION', 'Section')], max_length=10)),
+                ('resource_id', models.PositiveBigIntegerField()),
+                ('day', models.CharField(choices=[('MON', 'Monday'), ('TUE', 'Tuesday'), ('WED', 'Wednesday'), ('THU', 'Thursday'), ('FRI', 'Friday'), ('SAT', 'Saturday'), ('SUN', 'Sunday')], max_length=3)),
+                ('slot_index', models.PositiveSmallIntegerField()),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='scheduler.schedule')),
+            ],
+            options={
+                'db_table': 'scheduler_schedule_slot',
+                'constraints': [models.UniqueConstraint(fields=('resource_type', 'resource_id', 'day', 'slot_index'), name='unique_schedule_slot')],
+            },
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraints, drop_exclusion_constraints),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+DAY_NAMES = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def _mask(value):
+    mask = 0
+    for part in (value or '').split(','):
+        part = part.strip().lower()
+        for i, name in enumerate(DAY_NAMES):
+            if part in (name, name[:3]):
+                mask |= 1 << i
+    return mask
+
+
+def _names(mask):
+    return ', '.join(name.capitalize() for i, name in enumerate(DAY_NAMES) if mask & (1 << i))
+
+
+def days_to_mask(apps, schema_editor):
+    Subject = apps.get_model('scheduler', 'Subject')
+    subjects = list(Subject.objects.using(schema_editor.connection.alias).exclude(day__isnull=True).exclude(day=''))
+    for subject in subjects:
+        subject.day_mask = _mask(subject.day)
+    Subject.objects.using(schema_editor.connection.alias).bulk_update(subjects, ['day_mask'], batch_size=1000)
+
+
+def mask_to_days(apps, schema_editor):
+    Subject = apps.get_model('scheduler', 'Subject')
+    subjects = list(Subject.objects.using(schema_editor.connection.alias).exclude(day_mask=0))
+    for subject in subjects:
+        subject.day = _names(subject.day_mask)
+    Subject.objects.using(schema_editor.connection.alias).bulk_update(subjects, ['day'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0005_schedule_slot_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='day_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(days_to_mask, mask_to_days),
+        migrations.RemoveField(
+            model_name='subject',
+            name='day',
+        ),
+    ]
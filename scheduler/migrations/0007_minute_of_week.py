@@ -0,0 +1,79 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:42
+
+from django.db import migrations, models
+
+DAY_CODES = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+
+
+def backfill_minutes(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Schedule = apps.get_model('scheduler', 'Schedule')
+    Subject = apps.get_model('scheduler', 'Subject')
+
+    schedules = list(Schedule.objects.using(db).all())
+    for sched in schedules:
+        offset = DAY_CODES.index(sched.day) * 1440 if sched.day in DAY_CODES else 0
+        sched.week_start = offset + sched.time_start.hour * 60 + sched.time_start.minute
+        sched.week_end = offset + sched.time_end.hour * 60 + sched.time_end.minute
+    Schedule.objects.using(db).bulk_update(schedules, ['week_start', 'week_end'], batch_size=1000)
+
+    subjects = list(Subject.objects.using(db).exclude(start_time__isnull=True, end_time__isnull=True))
+    for subject in subjects:
+        subject.start_minute = subject.start_time.hour * 60 + subject.start_time.minute if subject.start_time else None
+        subject.end_minute = subject.end_time.hour * 60 + subject.end_time.minute if subject.end_time else None
+    Subject.objects.using(db).bulk_update(subjects, ['start_minute', 'end_minute'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0006_subject_day_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='week_end',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='week_start',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='end_minute',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_minutes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['week_start', 'week_end'], name='scheduler_s_week_st_62af4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['room', 'week_start', 'week_end'], name='scheduler_s_room_id_87c62f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['instructor', 'week_start', 'week_end'], name='scheduler_s_instruc_e916ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['section', 'week_start', 'week_end'], name='scheduler_s_section_3985c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['room', 'start_minute', 'end_minute'], name='scheduler_s_room_id_7f2212_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['instructor', 'start_minute', 'end_minute'], name='scheduler_s_instruc_7845dd_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_documents(apps, schema_editor):
+    Subject = apps.get_model('scheduler', 'Subject')
+    SubjectSearch = apps.get_model('scheduler', 'SubjectSearch')
+    alias = schema_editor.connection.alias
+
+    batch = []
+    subjects = Subject.objects.using(alias).select_related(
+        'instructor__user', 'room', 'section', 'school_year_level',
+    )
+    for subject in subjects.iterator(chunk_size=2000):
+        user = subject.instructor.user if subject.instructor else None
+        parts = (
+            subject.subject_code,
+            subject.subject_name,
+            user.first_name if user else None,
+            user.last_name if user else None,
+            subject.room.room_name if subject.room else None,
+            subject.section.section_name if subject.section else None,
+            subject.school_year_level.school_year if subject.school_year_level else None,
+        )
+        document = ' '.join(' '.join(str(part).split()) for part in parts if part).lower()
+        batch.append(SubjectSearch(subject_id=subject.pk, document=document))
+        if len(batch) >= 2000:
+            SubjectSearch.objects.using(alias).bulk_create(batch)
+            batch = []
+    SubjectSearch.objects.using(alias).bulk_create(batch)
+
+
+def add_trigram_index(apps, schema_editor):
+    # Substring (LIKE '%term%') searches only get an index on PostgreSQL.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX subject_search_document_trgm ON scheduler_subject_search '
+        'USING gin (document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS subject_search_document_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0008_timetable_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectSearch',
+            fields=[
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='scheduler.subject')),
+                ('document', models.TextField(default='')),
+            ],
+            options={
+                'db_table': 'scheduler_subject_search',
+            },
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+        migrations.RunPython(add_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# (table, column, already indexed) for every column autocomplete.py matches
+# with istartswith.
+PREFIX_COLUMNS = (
+    ('scheduler_department', 'name', False),
+    ('scheduler_user', 'first_name', False),
+    ('scheduler_user', 'last_name', False),
+    ('scheduler_section', 'section_name', False),
+    ('scheduler_room', 'room_name', True),
+    ('scheduler_subject', 'subject_code', False),
+    ('scheduler_subject', 'subject_name', False),
+    ('scheduler_schoolyearlevel', 'school_year', False),
+)
+
+
+def index_name(table, column):
+    return f'{table}_{column}_prefix'
+
+
+def add_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column, indexed in PREFIX_COLUMNS:
+        name = index_name(table, column)
+        if vendor == 'postgresql':
+            # istartswith compiles to UPPER(col::text) LIKE 'X%'; only a pattern-ops
+            # index on that exact expression serves it.
+            schema_editor.execute(f'CREATE INDEX {name} ON {table} (UPPER({column}::text) text_pattern_ops)')
+        elif not indexed:
+            # MySQL's case-insensitive collations use a plain index for LIKE 'x%'.
+            schema_editor.execute(f'CREATE INDEX {name} ON {table} ({column})')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column, indexed in PREFIX_COLUMNS:
+        name = index_name(table, column)
+        if vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+        elif not indexed:
+            schema_editor.execute(f'DROP INDEX {name} ON {table}' if vendor == 'mysql' else f'DROP INDEX {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0009_subject_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_prefix_indexes, drop_prefix_indexes),
+    ]
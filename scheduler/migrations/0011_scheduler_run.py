@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0010_autocomplete_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('wall_ms', models.FloatField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('profile', models.JSONField(default=dict)),
+                ('profiler', models.CharField(blank=True, max_length=20)),
+                ('profiler_report', models.TextField(blank=True)),
+                ('curriculum', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduler_runs', to='scheduler.curriculum')),
+            ],
+            options={
+                'db_table': 'scheduler_scheduler_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0011_scheduler_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='enrolment',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0012_section_enrolment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instructor',
+            name='max_load_units',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True),
+        ),
+        migrations.AddField(
+            model_name='instructor',
+            name='max_weekly_hours',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schedulerrun',
+            name='instructor_loads',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -1,9 +1,18 @@
-from django.db import models
+from django.db import models, transaction, connections, router, IntegrityError
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from contextlib import contextmanager
+import contextvars
 import datetime
 
+from .timegrid import (
+    SLOT_MINUTES, DAY_CODES, is_on_grid, slot_range, minute_of_day, week_range,
+    day_mask, day_names, masks_overlapping,
+)
+
 
 # ✅ CUSTOM USER MODEL
 class User(AbstractUser):
@@ -84,6 +93,8 @@ class Section(models.Model):
     section_name = models.CharField(max_length=20)
     year_level = models.PositiveIntegerField(default=1)
     semester = models.PositiveSmallIntegerField(choices=SEMESTER_CHOICES, default=1)
+    # Students enrolled; 0 when not known yet. Rooms are fitted to this.
+    enrolment = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ('course', 'section_name', 'semester')
@@ -165,6 +176,60 @@ class Semester(models.Model):
 
 
 
+# QuerySet.update() and bulk_create() send no per-row signals. The scheduler
+# querysets send these instead, with the primary keys of the rows, before
+# (rows_changing) and after (rows_changed) they write; ``created`` is True
+# for inserts, and ``pks`` is None when the keys are not known.
+rows_changing = Signal()
+rows_changed = Signal()
+
+
+class SubjectQuerySet(models.QuerySet):
+    def meeting_on(self, days):
+        """Subjects meeting on any of ``days`` (names, codes or a mask), via the day_mask index."""
+        mask = days if isinstance(days, int) else day_mask(days)
+        return self.filter(day_mask__in=masks_overlapping(mask))
+
+    # Time fields and the minute columns Subject.sync_minutes() derives from them.
+    MINUTE_FIELDS = {'start_time': 'start_minute', 'end_time': 'end_minute'}
+
+    def update(self, **kwargs):
+        # Plain values give the minute columns in the same UPDATE; expressions
+        # (F(), Case...) are only known once written, so those rows are re-read.
+        recompute = False
+        for name, column in self.MINUTE_FIELDS.items():
+            if name not in kwargs:
+                continue
+            if hasattr(kwargs[name], 'resolve_expression'):
+                recompute = True
+            else:
+                value = self.model._meta.get_field(name).to_python(kwargs[name])
+                kwargs[column] = minute_of_day(value) if value else None
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows_changing.send(sender=self.model, pks=pks, created=False)
+            rows = super().update(**kwargs)
+            if recompute:
+                moved = list(models.QuerySet(self.model, using=self.db).filter(pk__in=pks))
+                for subject in moved:
+                    subject.sync_minutes()
+                models.QuerySet(self.model, using=self.db).bulk_update(moved, ['start_minute', 'end_minute'])
+            rows_changed.send(sender=self.model, pks=pks, created=False)
+        TimetableVersion.bump()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_minutes()
+        created = super().bulk_create(objs, *args, **kwargs)
+        # MySQL does not return the new keys; ``None`` means "unknown rows".
+        pks = [obj.pk for obj in created]
+        rows_changed.send(sender=self.model, pks=None if None in pks else pks, created=True)
+        TimetableVersion.bump()
+        return created
+
+
 class Subject(models.Model):
     subject_code = models.CharField(max_length=10)
     subject_name = models.CharField(max_length=100)
@@ -209,7 +274,13 @@ class Subject(models.Model):
     end_time = models.TimeField(null=True, blank=True)
     duration = models.IntegerField(null=True, blank=True)
 
-    day = models.CharField(max_length=100, blank=True, null=True)   # "Monday, Wednesday"
+    # Minutes since midnight, kept in sync with start_time/end_time by
+    # sync_minutes() on save() and on SubjectQuerySet update()/bulk_create()
+    start_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    end_minute = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
+    # Bit 0 = Monday ... bit 6 = Sunday; see timegrid.day_mask()
+    day_mask = models.PositiveSmallIntegerField(default=0, db_index=True)
 
     room = models.ForeignKey(
         'Room',
@@ -231,12 +302,40 @@ class Subject(models.Model):
     )
 
 
+    objects = SubjectQuerySet.as_manager()
+
     class Meta:
         db_table = 'scheduler_subject'
+        indexes = [
+            models.Index(fields=['room', 'start_minute', 'end_minute']),
+            models.Index(fields=['instructor', 'start_minute', 'end_minute']),
+        ]
 
     def __str__(self):
         return f"{self.subject_code} - {self.subject_name}"
 
+    def save(self, *args, **kwargs):
+        self.sync_minutes()
+        super().save(*args, **kwargs)
+
+    def sync_minutes(self):
+        self.start_minute = minute_of_day(self.start_time) if self.start_time else None
+        self.end_minute = minute_of_day(self.end_time) if self.end_time else None
+
+    # Compatibility accessor for the old comma-separated column: templates,
+    # SubjectForm.clean_day() and the views still read/write "Monday, Wednesday".
+    @property
+    def day(self):
+        return ', '.join(self.days)
+
+    @day.setter
+    def day(self, value):
+        self.day_mask = day_mask(value)
+
+    @property
+    def days(self):
+        return day_names(self.day_mask)
+
 
 
 
@@ -246,6 +345,10 @@ class Instructor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='instructor_profile')
     subjects = models.ManyToManyField(Subject, related_name='qualified_instructors', blank=True)
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    # Weekly caps for the timetable generator; empty means the
+    # SCHEDULER_MAX_WEEKLY_HOURS / SCHEDULER_MAX_LOAD_UNITS settings.
+    max_weekly_hours = models.PositiveSmallIntegerField(null=True, blank=True)
+    max_load_units = models.DecimalField(max_digits=4, decimal_places=1, null=True, blank=True)
 
     class Meta:
         db_table = 'scheduler_instructor'
@@ -288,6 +391,118 @@ class Room(models.Model):
 
 
 # ✅ SCHEDULE MODEL
+_trusted_schedule_batch = contextvars.ContextVar('trusted_schedule_batch', default=False)
+
+
+@contextmanager
+def trusted_schedule_batch():
+    """
+    Skip Schedule.clean()'s conflict query for saves made inside the block.
+
+    Only for callers that have already validated the rows in bulk (e.g. the
+    auto scheduler, which checks every candidate before saving it).
+    Time and duration checks still run.
+    """
+    token = _trusted_schedule_batch.set(True)
+    try:
+        yield
+    finally:
+        _trusted_schedule_batch.reset(token)
+
+
+class ScheduleQuerySet(models.QuerySet):
+    CONFLICT_FIELDS = ('room', 'instructor', 'section')
+
+    def conflicts_for(self, day, time_start, time_end, room=None, instructor=None, section=None, exclude_pk=None):
+        """
+        Rows overlapping [time_start, time_end) on ``day`` that share the room,
+        instructor or section, in a single query.
+
+        Each row is annotated with ``room_clash``, ``instructor_clash`` and
+        ``section_clash`` booleans (only for the resources passed in).
+        """
+        owners = models.Q(pk__in=[])
+        tags = {}
+        for name, value in zip(self.CONFLICT_FIELDS, (room, instructor, section)):
+            if value is None:
+                continue
+            owners |= models.Q(**{name: value})
+            tags[f'{name}_clash'] = models.ExpressionWrapper(
+                models.Q(**{name: value}), output_field=models.BooleanField()
+            )
+
+        # One integer range test on the minute-of-week columns covers day and time.
+        week_start, week_end = week_range(day, time_start, time_end)
+        qs = self.filter(owners, week_start__lt=week_end, week_end__gt=week_start)
+        if exclude_pk is not None:
+            qs = qs.exclude(pk=exclude_pk)
+        return qs.annotate(**tags)
+
+    # Fields whose change moves a schedule on the occupancy grid.
+    SLOT_FIELDS = {
+        'day', 'time_start', 'time_end',
+        'room', 'room_id', 'instructor', 'instructor_id', 'section', 'section_id',
+    }
+
+    def update(self, **kwargs):
+        # Keep scheduler_schedule_slot in step with bulk updates of the grid fields.
+        if not self.SLOT_FIELDS.intersection(kwargs):
+            with transaction.atomic(using=self.db):
+                pks = list(self.values_list('pk', flat=True))
+                rows = super().update(**kwargs)
+                rows_changed.send(sender=Schedule, pks=pks, created=False)
+            TimetableVersion.bump()
+            return rows
+        try:
+            with transaction.atomic(using=self.db):
+                pks = list(self.values_list('pk', flat=True))
+                rows_changing.send(sender=Schedule, pks=pks, created=False)
+                rows = super().update(**kwargs)
+                moved = list(Schedule.objects.using(self.db).filter(pk__in=pks))
+                for schedule in moved:
+                    schedule.sync_week_minutes()
+                Schedule.objects.using(self.db).bulk_update(moved, ['week_start', 'week_end'])
+                rebuild_schedule_slots(moved, using=self.db)
+                rows_changed.send(sender=Schedule, pks=pks, created=False)
+        except IntegrityError as e:
+            if not ScheduleConflict.matches(e):
+                raise
+            raise ScheduleConflict(_('The update would make schedules overlap.')) from e
+        TimetableVersion.bump()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Occupancy rows need the new primary keys; backends that cannot return
+        # them from a bulk insert (MySQL) fall back to ordinary saves.
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_week_minutes()
+        if not connections[self.db].features.can_return_rows_from_bulk_insert:
+            with transaction.atomic(using=self.db):
+                for obj in objs:
+                    obj.save(using=self.db)
+            return objs
+        try:
+            with transaction.atomic(using=self.db):
+                created = super().bulk_create(objs, *args, **kwargs)
+                rebuild_schedule_slots([obj for obj in created if obj.pk is not None], using=self.db)
+                rows_changed.send(sender=Schedule, pks=[obj.pk for obj in created if obj.pk is not None], created=True)
+        except IntegrityError as e:
+            if not ScheduleConflict.matches(e):
+                raise
+            raise ScheduleConflict(_('The new schedules overlap existing ones.')) from e
+        TimetableVersion.bump()
+        return created
+
+
+def rebuild_schedule_slots(schedules, using=None):
+    """Replace the occupancy rows of the given schedules with fresh ones, on their database."""
+    schedules = list(schedules)
+    slots = ScheduleSlot.objects.db_manager(using)
+    slots.filter(schedule__in=[s.pk for s in schedules]).delete()
+    slots.bulk_create([row for s in schedules for row in s.slot_rows()])
+
+
 class Schedule(models.Model):
     class Day(models.TextChoices):
         MON = 'MON', _('Monday')
@@ -311,6 +526,13 @@ class Schedule(models.Model):
         default='LECTURE'
     )
 
+    # Minutes since Monday 00:00, kept in sync with day/time_start/time_end so
+    # overlap tests are a single integer range comparison across days.
+    week_start = models.PositiveIntegerField(default=0, editable=False)
+    week_end = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ScheduleQuerySet.as_manager()
+
     class Meta:
         ordering = ['day', 'time_start']
         db_table = 'scheduler_schedule'
@@ -319,6 +541,10 @@ class Schedule(models.Model):
             models.Index(fields=['room', 'day', 'time_start', 'time_end']),
             models.Index(fields=['instructor', 'day', 'time_start', 'time_end']),
             models.Index(fields=['section', 'day', 'time_start', 'time_end']),
+            models.Index(fields=['week_start', 'week_end']),
+            models.Index(fields=['room', 'week_start', 'week_end']),
+            models.Index(fields=['instructor', 'week_start', 'week_end']),
+            models.Index(fields=['section', 'week_start', 'week_end']),
         ]
 
     def __str__(self):
@@ -327,35 +553,143 @@ class Schedule(models.Model):
     def clean(self):
         if self.time_start >= self.time_end:
             raise ValidationError(_('End time must be after start time.'))
+        if not (is_on_grid(self.time_start) and is_on_grid(self.time_end)):
+            raise ValidationError(_('Class times must fall on a %(minutes)d-minute boundary.') % {'minutes': SLOT_MINUTES})
 
-        duration = datetime.datetime.combine(datetime.date.today(), self.time_end) - datetime.datetime.combine(datetime.date.today(), self.time_start)
-        if duration.total_seconds() < 1800:
+        duration = minute_of_day(self.time_end) - minute_of_day(self.time_start)
+        if duration < 30:
             raise ValidationError(_('Class duration must be at least 30 minutes.'))
-        if duration.total_seconds() > 14400:
+        if duration > 240:
             raise ValidationError(_('Class duration cannot exceed 4 hours.'))
 
-        # Room conflict
-        if Schedule.objects.filter(room=self.room, day=self.day).exclude(pk=self.pk).filter(
-            models.Q(time_start__lt=self.time_end, time_end__gt=self.time_start)
-        ).exists():
-            raise ValidationError(_('This room is already occupied during the selected time.'))
+        # An invalid day is already reported by clean_fields().
+        if _trusted_schedule_batch.get() or self.day not in DAY_CODES:
+            return
 
-        # Instructor conflict
-        if Schedule.objects.filter(instructor=self.instructor, day=self.day).exclude(pk=self.pk).filter(
-            models.Q(time_start__lt=self.time_end, time_end__gt=self.time_start)
-        ).exists():
-            raise ValidationError(_('This instructor is already teaching during the selected time.'))
+        self._raise_for_clashes()
 
-        # Section conflict
-        if Schedule.objects.filter(section=self.section, day=self.day).exclude(pk=self.pk).filter(
-            models.Q(time_start__lt=self.time_end, time_end__gt=self.time_start)
-        ).exists():
-            raise ValidationError(_('This section already has a class during the selected time.'))
+    def _raise_for_clashes(self, error_class=ValidationError):
+        clashes = set()
+        for row in Schedule.objects.conflicts_for(
+            self.day, self.time_start, self.time_end,
+            room=self.room_id, instructor=self.instructor_id, section=self.section_id,
+            exclude_pk=self.pk,
+        ).values('room_clash', 'instructor_clash', 'section_clash'):
+            clashes.update(name for name, clash in row.items() if clash)
+
+        if 'room_clash' in clashes:
+            raise error_class(_('This room is already occupied during the selected time.'))
+        if 'instructor_clash' in clashes:
+            raise error_class(_('This instructor is already teaching during the selected time.'))
+        if 'section_clash' in clashes:
+            raise error_class(_('This section already has a class during the selected time.'))
 
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # Related objects already loaded on the instance are known to exist, so
+        # skip re-fetching them in full_clean(); the FK constraints still apply.
+        loaded = [
+            f.name for f in self._meta.concrete_fields
+            if f.is_relation and f.is_cached(self) and getattr(self, f.attname) is not None
+        ]
+        self.sync_week_minutes()
+        self.full_clean(exclude=loaded)
+
+        # The occupancy rows (and the exclusion constraints on PostgreSQL) make
+        # the database the final judge of overlaps, so concurrent saves that
+        # both passed clean() cannot both commit.
+        using = kwargs.get('using') or router.db_for_write(Schedule, instance=self)
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+                self.sync_slots(using=using)
+        except IntegrityError as e:
+            if not ScheduleConflict.matches(e):
+                raise
+            self._raise_for_clashes(ScheduleConflict)
+            raise ScheduleConflict(_('This time slot was taken by another schedule.')) from e
+
+    def sync_week_minutes(self):
+        if self.day in DAY_CODES and self.time_start and self.time_end:
+            self.week_start, self.week_end = week_range(self.day, self.time_start, self.time_end)
+
+    def slot_rows(self):
+        cells = slot_range(self.time_start, self.time_end)
+        return [
+            ScheduleSlot(schedule=self, resource_type=resource_type, resource_id=resource_id,
+                         day=self.day, slot_index=index)
+            for resource_type, resource_id in (
+                (ScheduleSlot.Resource.ROOM, self.room_id),
+                (ScheduleSlot.Resource.INSTRUCTOR, self.instructor_id),
+                (ScheduleSlot.Resource.SECTION, self.section_id),
+            )
+            for index in cells
+        ]
+
+    def sync_slots(self, using=None):
+        rebuild_schedule_slots([self], using=using)
+
+
+class ScheduleConflict(ValidationError):
+    """Raised when the database rejects a Schedule that overlaps another one."""
+
+    CONSTRAINT_MARKERS = ('unique_schedule_slot', 'scheduler_schedule_slot', '_no_overlap')
+
+    @classmethod
+    def matches(cls, error: IntegrityError) -> bool:
+        message = str(error)
+        return any(marker in message for marker in cls.CONSTRAINT_MARKERS)
+
+
+# ✅ SLOT OCCUPANCY MODEL
+class ScheduleSlot(models.Model):
+    """
+    One SLOT_MINUTES grid cell held by a Schedule for a room, instructor or
+    section. The unique key is what stops two schedules from sharing a cell.
+    """
+    class Resource(models.TextChoices):
+        ROOM = 'ROOM', _('Room')
+        INSTRUCTOR = 'INSTRUCTOR', _('Instructor')
+        SECTION = 'SECTION', _('Section')
+
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name='slots')
+    resource_type = models.CharField(max_length=10, choices=Resource.choices)
+    resource_id = models.PositiveBigIntegerField()
+    day = models.CharField(max_length=3, choices=Schedule.Day.choices)
+    slot_index = models.PositiveSmallIntegerField()
+
+    class Meta:
+        db_table = 'scheduler_schedule_slot'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['resource_type', 'resource_id', 'day', 'slot_index'],
+                name='unique_schedule_slot',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.resource_type} {self.resource_id} - {self.day} #{self.slot_index}"
+
+
+# ✅ SEARCH DOCUMENT MODEL
+class SubjectSearch(models.Model):
+    """
+    Denormalised, lower-cased text of everything a subject can be searched by
+    (code, name, instructor, room, section, school year), so one indexed
+    column replaces a chain of joined icontains filters. Maintained by
+    search.refresh_search_documents(); trigram-indexed on PostgreSQL.
+    """
+    subject = models.OneToOneField(
+        Subject, on_delete=models.CASCADE,
+        primary_key=True, related_name='search'
+    )
+    document = models.TextField(default='')
+
+    class Meta:
+        db_table = 'scheduler_subject_search'
+
+    def __str__(self):
+        return self.document
 
 
 # ✅ ANNOUNCEMENT MODEL
@@ -468,3 +802,71 @@ class CurriculumRevision(models.Model):
 
     def __str__(self):
         return f"{self.curriculum.name} - {self.name}"
+
+
+# Sent (after commit) each time TimetableVersion.bump() runs, with the scope.
+timetable_bumped = Signal()
+
+
+# ✅ TIMETABLE VERSION MODEL
+class TimetableVersion(models.Model):
+    """
+    Change stamp for published timetable data, bumped (see signals.py) whenever
+    a schedule, subject or anything displayed with them changes. Drives
+    ETag / Last-Modified headers and response cache keys.
+
+    The AVAILABILITY scope is bumped on every instructor or room availability
+    write and keys the cached availability indexes (see availability.py).
+    """
+    TIMETABLE = 'timetable'
+    AVAILABILITY = 'availability'
+
+    scope = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'scheduler_timetable_version'
+
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+    @classmethod
+    def bump(cls, scope=TIMETABLE):
+        now = timezone.now()
+        if not cls.objects.filter(scope=scope).update(version=models.F('version') + 1, changed_at=now):
+            cls.objects.get_or_create(scope=scope, defaults={'version': 1, 'changed_at': now})
+        transaction.on_commit(lambda: timetable_bumped.send(sender=cls, scope=scope))
+
+    @classmethod
+    def current(cls, scope=TIMETABLE):
+        stamp = cls.objects.filter(scope=scope).first()
+        if stamp is None:
+            stamp, _created = cls.objects.get_or_create(scope=scope)
+        return stamp
+
+
+# ✅ SCHEDULER RUN MODEL
+class SchedulerRun(models.Model):
+    """One run of the timetable generator, with its phase timings and counters."""
+    curriculum = models.ForeignKey(
+        Curriculum, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='scheduler_runs'
+    )
+    started_at = models.DateTimeField(default=timezone.now)
+    wall_ms = models.FloatField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # EngineProfile.summary(): phases_ms and counters
+    profile = models.JSONField(default=dict)
+    profiler = models.CharField(max_length=20, blank=True)
+    profiler_report = models.TextField(blank=True)
+    # InstructorLoads.report(): hours and load units per instructor after the run
+    instructor_loads = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'scheduler_scheduler_run'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Run {self.started_at:%Y-%m-%d %H:%M} ({self.created} created, {self.failed} failed)"
@@ -0,0 +1,69 @@
+"""
+Free/busy lookups backed by the ScheduleSlot occupancy table.
+
+Conflict checks become index lookups on (resource_type, resource_id, day,
+slot_index) instead of time-range scans over Schedule.
+"""
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db.models import Q
+
+from .models import ScheduleSlot
+from .timegrid import slot_range
+
+ROOM = ScheduleSlot.Resource.ROOM
+INSTRUCTOR = ScheduleSlot.Resource.INSTRUCTOR
+SECTION = ScheduleSlot.Resource.SECTION
+
+
+def is_busy(resource_type: str, resource_id: int, days: Iterable[str],
+            start: datetime.time, end: datetime.time) -> bool:
+    """True if the resource holds any cell of [start, end) on any of ``days``."""
+    return ScheduleSlot.objects.filter(
+        resource_type=resource_type, resource_id=resource_id,
+        day__in=list(days), slot_index__in=list(slot_range(start, end)),
+    ).exists()
+
+
+class OccupancyMap:
+    """
+    In-memory copy of the occupancy table (or a slice of it), for callers that
+    test many candidate slots: the auto scheduler and batch validation.
+    """
+
+    def __init__(self):
+        self.cells: Dict[Tuple[str, int, str], Set[int]] = defaultdict(set)
+
+    @classmethod
+    def load(cls, resources: Optional[Dict[str, Iterable[int]]] = None,
+             days: Optional[Iterable[str]] = None) -> 'OccupancyMap':
+        """
+        Load occupied cells in one query. ``resources`` maps a resource type to
+        the ids of interest; omit it to load every resource.
+        """
+        occupancy = cls()
+        qs = ScheduleSlot.objects.all()
+        if resources is not None:
+            owners = Q(pk__in=[])
+            for resource_type, ids in resources.items():
+                owners |= Q(resource_type=resource_type, resource_id__in=list(ids))
+            qs = qs.filter(owners)
+        if days is not None:
+            qs = qs.filter(day__in=list(days))
+
+        for resource_type, resource_id, day, index in qs.values_list(
+            'resource_type', 'resource_id', 'day', 'slot_index'
+        ).iterator():
+            occupancy.cells[(resource_type, resource_id, day)].add(index)
+        return occupancy
+
+    def is_free(self, resource_type: str, resource_id: int, day: str,
+                start: datetime.time, end: datetime.time) -> bool:
+        held = self.cells.get((resource_type, resource_id, day))
+        return not held or held.isdisjoint(slot_range(start, end))
+
+    def occupy(self, resource_type: str, resource_id: int, day: str,
+               start: datetime.time, end: datetime.time) -> None:
+        self.cells[(resource_type, resource_id, day)].update(slot_range(start, end))
@@ -0,0 +1,93 @@
+"""
+Phase timers, counters and optional profiler capture for the scheduling engine.
+
+Phases are timed exclusively: entering a nested phase pauses the one around
+it, so the phase totals add up to the wall time of the run rather than
+counting the same seconds twice.
+"""
+import cProfile
+import io
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILERS = ('cprofile', 'sampling')
+PROFILE_STATS_LIMIT = 40
+
+
+class EngineProfile:
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counters = Counter()
+        self._stack = []
+        self._started = time.perf_counter()
+        self._mark = self._started
+
+    def _charge(self):
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.phases[name] = self.phases.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        self._charge()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def summary(self) -> Dict:
+        wall = time.perf_counter() - self._started
+        return {
+            'wall_ms': round(wall * 1000, 1),
+            'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+class ProfilerCapture:
+    """
+    Wraps a run in cProfile, or in pyinstrument's sampling profiler when
+    ``kind='sampling'`` (optional dependency). ``report`` holds the text
+    output after the block exits.
+    """
+
+    def __init__(self, kind: Optional[str]):
+        if kind and kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{kind}'; choose from {', '.join(PROFILERS)}.")
+        self.kind = kind
+        self.report = ''
+        self._profiler = None
+
+    def __enter__(self):
+        if self.kind == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.kind == 'sampling':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ValueError("The sampling profiler needs pyinstrument; install it or use cprofile.")
+            self._profiler = Profiler()
+            self._profiler.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.kind == 'cprofile':
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_STATS_LIMIT)
+            self.report = out.getvalue()
+        elif self.kind == 'sampling':
+            self._profiler.stop()
+            self.report = self._profiler.output_text()
+        return False
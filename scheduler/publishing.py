@@ -0,0 +1,175 @@
+"""
+Static JSON snapshots of the published timetable.
+
+publish_timetables() writes one file per department, section, room and
+instructor under settings.TIMETABLE_SNAPSHOT_ROOT, each with a gzip sibling.
+Every publish goes into its own v<version>/ directory and index.json is
+swapped in last, so readers never see a half-written snapshot and versioned
+files can be cached forever.
+"""
+import gzip
+import json
+import os
+import shutil
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Department, Subject, TimetableVersion
+
+INDEX_FILE = 'index.json'
+KINDS = ('departments', 'sections', 'rooms', 'instructors')
+
+
+def timetable_entry(subject: Subject) -> Dict:
+    """One subject as it appears in snapshots and on the public schedule page."""
+    section = subject.section
+    instructor = subject.instructor
+    return {
+        'id': subject.id,
+        'subject_code': subject.subject_code,
+        'subject_name': subject.subject_name,
+        'prerequisite': subject.prerequisite,
+        'lecture_units': subject.lecture_units,
+        'lab_units': subject.lab_units,
+        'units': subject.units,
+        'school_year': subject.school_year_level.school_year if subject.school_year_level else None,
+        'day': subject.day,
+        'days': subject.days,
+        'start': subject.start_time.strftime('%H:%M') if subject.start_time else None,
+        'end': subject.end_time.strftime('%H:%M') if subject.end_time else None,
+        'time': (
+            f"{subject.start_time.strftime('%I:%M %p')} - {subject.end_time.strftime('%I:%M %p')}"
+            if subject.start_time and subject.end_time else None
+        ),
+        'room_id': subject.room_id,
+        'room': subject.room.room_name if subject.room else None,
+        'section_id': subject.section_id,
+        'section': str(section) if section else None,
+        'section_name': section.section_name if section else None,
+        'instructor_id': subject.instructor_id,
+        'instructor': instructor.user.get_full_name() if instructor else None,
+    }
+
+
+def _write(path: str, payload) -> None:
+    data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for target, body in ((path, data), (path + '.gz', gzip.compress(data, compresslevel=9))):
+        tmp = target + '.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(body)
+        os.replace(tmp, target)
+
+
+def _prune(root: str, keep: List[str]) -> None:
+    for name in os.listdir(root):
+        if name.startswith('v') and name[1:].isdigit() and name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def publish_timetables(force: bool = False) -> Dict:
+    """
+    Write a snapshot of the current timetable and return its index.
+
+    Does nothing when the latest snapshot already matches TimetableVersion,
+    unless ``force`` is set.
+    """
+    root = settings.TIMETABLE_SNAPSHOT_ROOT
+    stamp = TimetableVersion.current()
+    previous = load_index()
+    if previous and previous['version'] == stamp.version and not force:
+        return previous
+
+    subjects = Subject.objects.select_related(
+        'instructor__user', 'school_year_level', 'room', 'section__course', 'curriculum__course',
+    ).order_by('section_id', 'day_mask', 'start_minute', 'subject_code', 'id')
+
+    grouped = {kind: defaultdict(list) for kind in KINDS}
+    labels = {kind: {} for kind in KINDS}
+    for subject in subjects.iterator(chunk_size=2000):
+        entry = timetable_entry(subject)
+        course = subject.curriculum.course if subject.curriculum else None
+        for kind, key, label in (
+            ('departments', course.department_id if course else None, None),
+            ('sections', subject.section_id, entry['section']),
+            ('rooms', subject.room_id, entry['room']),
+            ('instructors', subject.instructor_id, entry['instructor']),
+        ):
+            if key is not None:
+                grouped[kind][key].append(entry)
+                labels[kind][key] = label
+
+    version_dir = f"v{stamp.version}"
+    target = os.path.join(root, version_dir)
+    shutil.rmtree(target, ignore_errors=True)
+
+    index = {
+        'version': stamp.version,
+        'published_at': timezone.now().isoformat(),
+        'departments': [],
+    }
+    # Every department gets a file, so the public page can list empty ones too.
+    for department in Department.objects.order_by('name'):
+        path = f"{version_dir}/departments/{department.id}.json"
+        entries = grouped['departments'].get(department.id, [])
+        _write(os.path.join(root, path), {'version': stamp.version, 'id': department.id, 'entries': entries})
+        index['departments'].append({
+            'id': department.id, 'name': department.name, 'code': department.code,
+            'file': path, 'count': len(entries),
+        })
+    for kind in KINDS[1:]:
+        index[kind] = []
+        for key, entries in grouped[kind].items():
+            path = f"{version_dir}/{kind}/{key}.json"
+            _write(os.path.join(root, path), {'version': stamp.version, 'id': key, 'entries': entries})
+            index[kind].append({'id': key, 'name': labels[kind][key], 'file': path, 'count': len(entries)})
+
+    _write(os.path.join(root, INDEX_FILE), index)
+    # Keep the previous snapshot for clients still holding the old index.
+    _prune(root, keep=[version_dir] + ([f"v{previous['version']}"] if previous else []))
+    return index
+
+
+_index_cache = (None, None)
+
+
+def load_index() -> Optional[Dict]:
+    """The live snapshot index, or None if nothing has been published yet."""
+    global _index_cache
+    path = os.path.join(settings.TIMETABLE_SNAPSHOT_ROOT, INDEX_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _index_cache[0] != (path, mtime):
+        with open(path, 'rb') as fh:
+            _index_cache = ((path, mtime), json.load(fh))
+    return _index_cache[1]
+
+
+def fresh_index(stamp: Optional[TimetableVersion] = None) -> Optional[Dict]:
+    """
+    The snapshot index if it is at least as new as the timetable, else None:
+    edits made since the last publish are only in the live tables.
+    """
+    index = load_index()
+    if index is None:
+        return None
+    stamp = stamp or TimetableVersion.current()
+    return index if index['version'] >= stamp.version else None
+
+
+def load_snapshot(path: str) -> Dict:
+    """A versioned snapshot file; these never change once written, so they are cached."""
+    return _read_snapshot(os.path.join(settings.TIMETABLE_SNAPSHOT_ROOT, path))
+
+
+@lru_cache(maxsize=256)
+def _read_snapshot(path: str) -> Dict:
+    with open(path, 'rb') as fh:
+        return json.load(fh)
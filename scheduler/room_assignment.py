@@ -0,0 +1,204 @@
+"""
+Room allocation for the timetable generator.
+
+The generator fixes each block's day, slot and instructor first. Rooms are
+then allocated per (day, slot) as an assignment problem over that slot's
+blocks and the rooms free in it, minimising room_cost(): seats left empty
+(a fixed penalty for a room of unknown capacity), plus a penalty for a room outside the section's department and for a room
+on another floor than the section's previous class that day. Small sections
+therefore stop taking the large rooms that large sections need.
+
+While blocks are being placed, RoomPool.reserve() keeps a bipartite
+matching of every slot's blocks to rooms that fit them (augmenting paths),
+so a block is only accepted into a slot whose free rooms can still seat all
+of its blocks. The cheapest assignment is solved once every block is known.
+
+A slot therefore never holds more blocks than it has free rooms: with n
+blocks and m candidate rooms (n <= m <= rooms on campus), accepting a block
+costs O(n + edges) and the slot's assignment O(n^2 * m).
+"""
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .availability import availability_index
+from .models import Room, Schedule
+from .occupancy import OccupancyMap, ROOM
+from .timegrid import DAY_CODES
+
+# Costs are in seats: a room of another department costs as much as
+# DEPARTMENT_PENALTY empty seats. A room of unknown capacity costs
+# UNKNOWN_CAPACITY_PENALTY, so it only wins over rooms that would leave
+# more seats than that empty.
+DEPARTMENT_PENALTY = 25
+FLOOR_PENALTY = 10
+UNKNOWN_CAPACITY_PENALTY = 100
+INFEASIBLE = float('inf')
+
+Slot = Tuple[str, datetime.time, datetime.time]
+
+
+def room_type_for(meeting_type: str) -> str:
+    return Room.RoomType.LABORATORY if meeting_type == 'LABORATORY' else Room.RoomType.LECTURE
+
+
+def fits(schedule: Schedule, room: Room) -> bool:
+    """Right room type, and enough seats (a capacity or enrolment of 0 is unknown)."""
+    if room.room_type != room_type_for(schedule.subject.meeting_type):
+        return False
+    return not room.capacity or schedule.section.enrolment <= room.capacity
+
+
+def room_cost(schedule: Schedule, room: Room, previous_floor: Optional[int] = None) -> float:
+    cost = room.capacity - schedule.section.enrolment if room.capacity else UNKNOWN_CAPACITY_PENALTY
+    if room.department_id is not None and room.department_id != schedule.section.course.department_id:
+        cost += DEPARTMENT_PENALTY
+    if previous_floor is not None and room.floor != previous_floor:
+        cost += FLOOR_PENALTY
+    return cost
+
+
+class _Matching:
+    """Blocks of one slot, each matched to a distinct room that fits it."""
+
+    def __init__(self):
+        self.blocks: List[Schedule] = []
+        self.candidates: List[List[Room]] = []
+        self.owner: Dict[int, int] = {}  # room id -> block index
+
+    def _augment(self, block: int) -> bool:
+        """
+        Match ``block``, moving other blocks to other rooms along an augmenting
+        path if needed. Depth-first with an explicit stack, so a path through
+        every block of a busy slot cannot hit the recursion limit.
+        """
+        seen = set()
+        stack = [[block, 0]]  # [block index, next candidate to try]
+        path: List[int] = []  # path[k]: room stack[k] takes from stack[k + 1]
+        while stack:
+            frame = stack[-1]
+            current, position = frame
+            if position == len(self.candidates[current]):
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            frame[1] += 1
+            room = self.candidates[current][position]
+            if room.id in seen:
+                continue
+            seen.add(room.id)
+            other = self.owner.get(room.id)
+            if other is None:
+                for (moved, _position), room_id in zip(stack, path + [room.id]):
+                    self.owner[room_id] = moved
+                return True
+            path.append(room.id)
+            stack.append([other, 0])
+        return False
+
+    def add(self, block: Schedule, candidates: List[Room]) -> bool:
+        self.blocks.append(block)
+        self.candidates.append(candidates)
+        if self._augment(len(self.blocks) - 1):
+            return True
+        self.blocks.pop()
+        self.candidates.pop()
+        return False
+
+
+def assignment(cost: Sequence[Sequence[float]]) -> List[int]:
+    """
+    Column for each row minimising the total cost (Hungarian algorithm with
+    potentials, O(rows^2 * columns)); needs rows <= columns.
+    """
+    n, m = len(cost), len(cost[0]) if cost else 0
+    u, v = [0.0] * (n + 1), [0.0] * (m + 1)
+    row_of = [0] * (m + 1)  # column -> row, 1-based; 0 = free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        row_of[0] = i
+        j0 = 0
+        min_to = [INFEASIBLE] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = row_of[j0], INFEASIBLE, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                reduced = row[j - 1] - u[i0] - v[j]
+                if reduced < min_to[j]:
+                    min_to[j], way[j] = reduced, j0
+                if min_to[j] < delta:
+                    delta, j1 = min_to[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[row_of[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_to[j] -= delta
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+    columns = [0] * n
+    for j in range(1, m + 1):
+        if row_of[j]:
+            columns[row_of[j] - 1] = j - 1
+    return columns
+
+
+class RoomPool:
+    """Rooms of the whole campus, shared out slot by slot."""
+
+    def __init__(self, rooms: Sequence[Room], occupancy: OccupancyMap):
+        self.rooms = list(rooms)
+        self.occupancy = occupancy
+        self.availability = availability_index(ROOM)
+        self._free: Dict[Slot, List[Room]] = {}
+        self._slots: Dict[Slot, _Matching] = {}
+
+    def free_rooms(self, day: str, start: datetime.time, end: datetime.time) -> List[Room]:
+        """Rooms not taken by saved schedules and open (or unrestricted) for the slot."""
+        slot = (day, start, end)
+        if slot not in self._free:
+            open_rooms = self.availability.open_mask(day, start, end)
+            self._free[slot] = [
+                room for room in self.rooms
+                if self.availability.admits(open_rooms, room.id) and self.occupancy.is_free(ROOM, room.id, day, start, end)
+            ]
+        return self._free[slot]
+
+    def reserve(self, schedule: Schedule) -> bool:
+        """Accept ``schedule`` into its slot if the slot's rooms can still seat every block in it."""
+        slot = (schedule.day, schedule.time_start, schedule.time_end)
+        candidates = [room for room in self.free_rooms(*slot) if fits(schedule, room)]
+        return self._slots.setdefault(slot, _Matching()).add(schedule, candidates)
+
+    def assign(self) -> int:
+        """
+        Set ``room`` on every reserved schedule, cheapest assignment per slot,
+        slots in week order; returns the total cost.
+        """
+        total = 0
+        floors: Dict[Tuple[int, str], int] = {}  # (section id, day) -> floor of its latest class
+        for slot in sorted(self._slots, key=lambda s: (DAY_CODES.index(s[0]), s[1])):
+            matching = self._slots[slot]
+            rooms = list({room.id: room for candidates in matching.candidates for room in candidates}.values())
+            cost = []
+            for block, candidates in zip(matching.blocks, matching.candidates):
+                allowed = {room.id for room in candidates}
+                previous_floor = floors.get((block.section_id, block.day))
+                cost.append([
+                    room_cost(block, room, previous_floor) if room.id in allowed else INFEASIBLE
+                    for room in rooms
+                ])
+            for block, column, row in zip(matching.blocks, assignment(cost), cost):
+                block.room = rooms[column]
+                floors[(block.section_id, block.day)] = block.room.floor
+                total += row[column]
+        return total
@@ -0,0 +1,92 @@
+"""
+Subject search over the denormalised SubjectSearch documents.
+
+Every term must appear somewhere in the document. On PostgreSQL the
+substring tests are served by a pg_trgm GIN index and results are ranked
+by trigram word similarity; other backends scan the single narrow search
+table (no joins) and rank on exact / prefix matches of code and name.
+"""
+from typing import Iterable, Optional
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+
+from .models import Subject, SubjectSearch
+
+DOCUMENT_RELATED = ('instructor__user', 'room', 'section', 'school_year_level')
+
+
+def search_document(subject: Subject) -> str:
+    """The searchable text of one subject (needs DOCUMENT_RELATED loaded)."""
+    user = subject.instructor.user if subject.instructor else None
+    parts = (
+        subject.subject_code,
+        subject.subject_name,
+        user.first_name if user else None,
+        user.last_name if user else None,
+        subject.room.room_name if subject.room else None,
+        subject.section.section_name if subject.section else None,
+        subject.school_year_level.school_year if subject.school_year_level else None,
+    )
+    return ' '.join(' '.join(str(part).split()) for part in parts if part).lower()
+
+
+def refresh_search_documents(subjects: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the search documents of the given subject ids (all subjects when
+    omitted) with one upsert per batch. Returns the number of documents written.
+    """
+    qs = Subject.objects.select_related(*DOCUMENT_RELATED)
+    if subjects is not None:
+        qs = qs.filter(pk__in=list(subjects))
+
+    written = 0
+    batch = []
+    for subject in qs.iterator(chunk_size=2000):
+        batch.append(SubjectSearch(subject_id=subject.pk, document=search_document(subject)))
+        if len(batch) >= 2000:
+            written += _upsert(batch)
+            batch = []
+    return written + _upsert(batch)
+
+
+def _upsert(batch) -> int:
+    if batch:
+        SubjectSearch.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['subject'], update_fields=['document'],
+        )
+    return len(batch)
+
+
+def search_terms(query: str):
+    return ' '.join(query.split()).lower().split()
+
+
+def search_subjects(query: str, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    Subjects matching every term of ``query`` in any searchable field,
+    annotated with ``search_rank`` and ordered best first.
+    """
+    qs = Subject.objects.all() if queryset is None else queryset
+    terms = search_terms(query)
+    if not terms:
+        return qs.none()
+    for term in terms:
+        qs = qs.filter(search__document__contains=term)
+
+    if connections[qs.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return qs.annotate(search_rank=TrigramWordSimilarity(' '.join(terms), 'search__document')).order_by(
+            '-search_rank', 'subject_code', 'pk'
+        )
+
+    first = terms[0]
+    rank = Case(
+        When(Q(subject_code__iexact=first), then=Value(4)),
+        When(Q(subject_code__istartswith=first), then=Value(3)),
+        When(Q(subject_name__istartswith=first), then=Value(2)),
+        When(Q(search__document__startswith=first), then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return qs.annotate(search_rank=rank).order_by('-search_rank', 'subject_code', 'pk')
@@ -0,0 +1,183 @@
+"""
+Bump TimetableVersion whenever data shown on published timetables changes,
+so cached pages and ETags expire on the next request, bump the availability
+stamp on availability writes, retire the scoped cache entries the change
+affects (see invalidation.py), and keep subject search documents in step
+with the names they embed.
+"""
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+
+from . import cache, invalidation
+from .models import (
+    Schedule, Subject, Section, Room, Instructor, Department, Course,
+    SchoolYearLevel, User, TimetableVersion, timetable_bumped,
+    InstructorAvailability, RoomAvailability,
+    rows_changing, rows_changed,
+)
+from .search import refresh_search_documents
+
+TIMETABLE_MODELS = (Schedule, Subject, Section, Room, Instructor, Department, Course, SchoolYearLevel, User)
+
+# Saves touching only these fields never change what a timetable shows.
+IGNORED_FIELDS = {'last_login'}
+
+# Of these models, timetables show only the listed fields, so other saves
+# (passwords, flags, roles) leave them as they are.
+DISPLAY_FIELDS = {
+    User: ('first_name', 'last_name', 'username'),
+}
+
+
+def display_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Remember the shown values, to tell after the save whether any changed.
+    if raw or update_fields is not None or instance._state.adding or instance.pk is None:
+        return
+    instance._display_before = sender._base_manager.filter(pk=instance.pk).values_list(*DISPLAY_FIELDS[sender]).first()
+
+
+def _display_changed(sender, instance, created=False, update_fields=None):
+    if update_fields and set(update_fields) <= IGNORED_FIELDS:
+        return False
+    fields = DISPLAY_FIELDS.get(sender)
+    if fields is None:
+        return True
+    if created:
+        return False  # on no timetable yet
+    if update_fields is not None:
+        return bool(set(update_fields) & set(fields))
+    return getattr(instance, '_display_before', None) != tuple(getattr(instance, name) for name in fields)
+
+
+def timetable_saved(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw:
+        return  # loaddata
+    if _display_changed(sender, instance, created, update_fields):
+        TimetableVersion.bump()
+
+
+def timetable_deleted(sender, **kwargs):
+    TimetableVersion.bump()
+
+
+for model in DISPLAY_FIELDS:
+    pre_save.connect(display_saving, sender=model, dispatch_uid=f'display_saving_{model.__name__}')
+
+for model in TIMETABLE_MODELS:
+    post_save.connect(timetable_saved, sender=model, dispatch_uid=f'timetable_changed_save_{model.__name__}')
+    post_delete.connect(timetable_deleted, sender=model, dispatch_uid=f'timetable_changed_delete_{model.__name__}')
+
+
+def timetable_bumped_invalidate_caches(sender, scope, **kwargs):
+    if scope == TimetableVersion.TIMETABLE:
+        cache.invalidate_timetable()
+
+
+timetable_bumped.connect(timetable_bumped_invalidate_caches, dispatch_uid='timetable_bumped_invalidate_caches')
+
+
+def availability_changed(sender, raw=False, **kwargs):
+    if not raw:
+        TimetableVersion.bump(TimetableVersion.AVAILABILITY)
+
+
+for model in (InstructorAvailability, RoomAvailability):
+    post_save.connect(availability_changed, sender=model, dispatch_uid=f'availability_changed_save_{model.__name__}')
+    post_delete.connect(availability_changed, sender=model, dispatch_uid=f'availability_changed_delete_{model.__name__}')
+
+
+def _ignored(raw, update_fields):
+    return raw or bool(update_fields and set(update_fields) <= IGNORED_FIELDS)
+
+
+def dependency_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Remember the keys the row had, so moving it also refreshes its old scopes.
+    if _ignored(raw, update_fields) or instance._state.adding or instance.pk is None:
+        return
+    if invalidation.key_fields(sender) != ['pk']:
+        instance._invalidation_rows = invalidation.stored_rows(sender, [instance.pk])
+
+
+def dependency_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if _ignored(raw, update_fields):
+        return
+    rows = [invalidation.instance_row(instance)] + instance.__dict__.pop('_invalidation_rows', [])
+    invalidation.invalidate(invalidation.scopes_for(sender, rows, 'create' if created else 'save'))
+
+
+def dependency_deleting(sender, instance, **kwargs):
+    # Rows reached through this one may be cascaded or detached by now.
+    instance._invalidation_targets = invalidation.scopes_for(sender, [invalidation.instance_row(instance)], 'delete')
+
+
+def dependency_deleted(sender, instance, **kwargs):
+    invalidation.invalidate(getattr(instance, '_invalidation_targets', {}))
+
+
+def dependency_rows_changing(sender, pks, created=False, **kwargs):
+    invalidation.invalidate(invalidation.scopes_for(sender, invalidation.stored_rows(sender, pks), 'save'))
+
+
+def dependency_rows_changed(sender, pks, created=False, **kwargs):
+    rows = None if pks is None else invalidation.stored_rows(sender, pks)
+    invalidation.invalidate(invalidation.scopes_for(sender, rows, 'create' if created else 'save'))
+
+
+for model in invalidation.MODELS:
+    pre_save.connect(dependency_saving, sender=model, dispatch_uid=f'dependency_saving_{model.__name__}')
+    post_save.connect(dependency_saved, sender=model, dispatch_uid=f'dependency_saved_{model.__name__}')
+    pre_delete.connect(dependency_deleting, sender=model, dispatch_uid=f'dependency_deleting_{model.__name__}')
+    post_delete.connect(dependency_deleted, sender=model, dispatch_uid=f'dependency_deleted_{model.__name__}')
+    rows_changing.connect(dependency_rows_changing, sender=model, dispatch_uid=f'dependency_rows_changing_{model.__name__}')
+    rows_changed.connect(dependency_rows_changed, sender=model, dispatch_uid=f'dependency_rows_changed_{model.__name__}')
+
+
+# Related models whose names are copied into SubjectSearch documents, with the
+# Subject lookup that reaches them.
+SEARCH_SOURCES = {
+    Instructor: 'instructor',
+    User: 'instructor__user',
+    Room: 'room',
+    Section: 'section',
+    SchoolYearLevel: 'school_year_level',
+}
+
+
+def _search_subject_ids(sender, instance):
+    return list(Subject.objects.filter(**{SEARCH_SOURCES[sender]: instance}).values_list('pk', flat=True))
+
+
+def subject_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_search_documents([instance.pk])
+
+
+def subject_rows_changed(sender, pks, **kwargs):
+    # Queryset update() / bulk_create(); ``None`` (keys unknown) rebuilds them all.
+    refresh_search_documents(pks)
+
+
+def search_source_saved(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw or not _display_changed(sender, instance, created, update_fields):
+        return
+    subject_ids = _search_subject_ids(sender, instance)
+    if subject_ids:
+        refresh_search_documents(subject_ids)
+
+
+def search_source_deleting(sender, instance, **kwargs):
+    # Subjects are detached with SET_NULL, which sends no signals; remember them now.
+    instance._search_subject_ids = _search_subject_ids(sender, instance)
+
+
+def search_source_deleted(sender, instance, **kwargs):
+    subject_ids = getattr(instance, '_search_subject_ids', None)
+    if subject_ids:
+        refresh_search_documents(subject_ids)
+
+
+post_save.connect(subject_saved, sender=Subject, dispatch_uid='search_subject_saved')
+rows_changed.connect(subject_rows_changed, sender=Subject, dispatch_uid='search_subject_rows_changed')
+for model in SEARCH_SOURCES:
+    post_save.connect(search_source_saved, sender=model, dispatch_uid=f'search_source_saved_{model.__name__}')
+    pre_delete.connect(search_source_deleting, sender=model, dispatch_uid=f'search_source_deleting_{model.__name__}')
+    post_delete.connect(search_source_deleted, sender=model, dispatch_uid=f'search_source_deleted_{model.__name__}')
@@ -1,3 +1,1342 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.apps import apps
+from django.core import signing
+from django.core.cache import cache as django_cache
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import analytics, cache, metrics
+from .auto_scheduler import generate_timetable
+from .availability import AvailabilityIndex, availability_index
+from .conflicts import INSTRUCTOR_UNAVAILABLE, ROOM_UNAVAILABLE, check_slots
+from .exports import HEADER
+from .forms import SubjectForm
+from .ical import TOKEN_SALT, _fold, feed_token, feed_url
+from .importers import Importer, import_file
+from .instructor_loads import InstructorLoads
+from .middleware import QueryRecorder, RequestProfilingMiddleware, recent_requests
+from .occupancy import INSTRUCTOR, ROOM, SECTION, OccupancyMap, is_busy
+from .room_assignment import UNKNOWN_CAPACITY_PENALTY, RoomPool, _Matching, assignment, room_cost
+from .models import (
+    Course, Curriculum, CurriculumSubject, Department, Instructor, InstructorAvailability, Room, RoomAvailability, Schedule, ScheduleConflict, ScheduleSlot, Section, Subject,
+    SchedulerRun, Semester, TimetableVersion, User, YearLevel, trusted_schedule_batch,
+)
+from .publishing import publish_timetables
+from .search import search_subjects
+from .timegrid import day_mask, day_names
+
+T = datetime.time
+
+
+@override_settings(
+    REQUEST_PROFILE_SAMPLE_RATE=0,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'KEY_PREFIX': 'scheduler'}},
+)
+class SchedulerTestCase(TestCase):
+    """Shared fixtures: one department, course, curriculum, section and admin."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Computing', code='CS')
+        cls.course = Course.objects.create(department=cls.department, course_code='BSCS', course_name='Computer Science')
+        cls.curriculum = Curriculum.objects.create(name='2024', course=cls.course)
+        cls.section = Section.objects.create(course=cls.course, section_name='A')
+        cls.admin = User.objects.create_user('admin', password='x', role=User.Role.ADMIN, is_approved=True)
+
+    @classmethod
+    def make_instructor(cls, name, **fields):
+        user = User.objects.create_user(
+            name, password='x', role=User.Role.INSTRUCTOR, first_name=name.title(),
+            instructor_number=name.upper(), is_approved=True,
+        )
+        return Instructor.objects.create(user=user, department=cls.department, **fields)
+
+    def setUp(self):
+        django_cache.clear()
+        # Published snapshots and metric files go to a scratch directory, not the checkout.
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(
+            TIMETABLE_SNAPSHOT_ROOT=os.path.join(self.root, 'published_timetables'),
+            METRICS_DIR=os.path.join(self.root, 'metrics'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class PublicScheduleSnapshotTests(SchedulerTestCase):
+
+    def test_edit_after_publish_is_shown(self):
+        subject = Subject.objects.create(subject_code='CS101', subject_name='Old Name', curriculum=self.curriculum)
+        publish_timetables()
+        url = reverse('public_schedule') + f'?department={self.department.id}'
+        published = self.client.get(url)
+        self.assertContains(published, 'Old Name')
+        self.assertTrue(published['ETag'].strip('"').startswith('s'))
+
+        subject.subject_name = 'New Name'
+        subject.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=published['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'New Name')
+        self.assertNotContains(response, 'Old Name')
+        self.assertTrue(response['ETag'].strip('"').startswith('v'))
+
+        # Republishing brings the snapshot back into use.
+        publish_timetables()
+        response = self.client.get(url)
+        self.assertContains(response, 'New Name')
+        self.assertTrue(response['ETag'].strip('"').startswith('s'))
+
+
+    def test_instructor_filter_matches_the_same_rows_live_and_published(self):
+        ada = self.make_instructor('ada')
+        User.objects.filter(pk=ada.user_id).update(last_name='Lovelace')
+        Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=self.curriculum, instructor=ada)
+        base = reverse('public_schedule') + f'?department={self.department.id}&instructor='
+        queries = {'ada': True, 'lovelace': True, 'Ada Lovelace': True, 'grace': False}
+
+        live = {name: 'Intro' in self.client.get(base + name).content.decode() for name in queries}
+        publish_timetables()
+        published = {}
+        for name in queries:
+            response = self.client.get(base + name)
+            self.assertTrue(response['ETag'].strip('"').startswith('s'))
+            published[name] = 'Intro' in response.content.decode()
+        self.assertEqual(live, queries)
+        self.assertEqual(published, queries)
+
+
+class ValidateSlotsTests(SchedulerTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=cls.curriculum)
+        cls.instructor = cls.make_instructor('ada')
+        cls.room = Room.objects.create(room_name='R1', capacity=40, department=cls.department)
+        Schedule.objects.create(
+            section=cls.section, subject=cls.subject, instructor=cls.instructor, room=cls.room,
+            day='MON', time_start=T(8), time_end=T(9),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('validate_slots')
+
+    def post(self, body):
+        return self.client.post(self.url, json.dumps(body), content_type='application/json')
+
+    def test_reports_conflicts_per_slot(self):
+        response = self.post({'room': self.room.id, 'slots': [
+            {'day': 'MON', 'time_start': '08:30', 'time_end': '09:30'},
+            {'day': 'MON', 'time_start': '09:00', 'time_end': '10:00'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertFalse(data['ok'])
+        self.assertEqual([r['ok'] for r in data['results']], [False, True])
+
+    def test_week_grid(self):
+        response = self.client.get(self.url, {'instructor': self.instructor.id, 'day': 'MON', 'start_hour': 8, 'end_hour': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['matrix'], [[False, True]])
+
+    def test_rejects_malformed_bodies(self):
+        for body in ([], 'x', 3, {'room': self.room.id, 'slots': {}}, {'room': self.room.id, 'slots': [1]},
+                     {'room': self.room.id, 'slots': [{'day': 'MON'}]}, {'room': self.room.id, 'slots': [{'day': 'XYZ', 'time_start': '08:00', 'time_end': '09:00'}]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_login(self.instructor.user)
+        self.assertEqual(self.post({'room': self.room.id, 'slots': []}).status_code, 403)
+
+
+class ScheduleTestCase(SchedulerTestCase):
+    """One MON 08:00-09:00 class for section A, ada and R1, and a free section, instructor and room."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=cls.curriculum)
+        cls.instructor = cls.make_instructor('ada')
+        cls.other_instructor = cls.make_instructor('grace')
+        cls.room = Room.objects.create(room_name='R1', capacity=40, department=cls.department)
+        cls.other_room = Room.objects.create(room_name='R2', capacity=40, department=cls.department)
+        cls.other_section = Section.objects.create(course=cls.course, section_name='B')
+        cls.first = Schedule.objects.create(
+            section=cls.section, subject=cls.subject, instructor=cls.instructor, room=cls.room,
+            day='MON', time_start=T(8), time_end=T(9),
+        )
+
+    def block(self, **fields):
+        values = dict(
+            section=self.other_section, subject=self.subject, instructor=self.other_instructor,
+            room=self.other_room, day='MON', time_start=T(8, 30), time_end=T(9, 30),
+        )
+        values.update(fields)
+        return Schedule(**values)
+
+
+class ScheduleOverlapTests(ScheduleTestCase):
+    """The occupancy rows make the database reject overlaps that skip clean()."""
+
+    def test_bulk_create_rejects_room_overlap(self):
+        with self.assertRaises(ScheduleConflict):
+            Schedule.objects.bulk_create([self.block(room=self.room)])
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_update_rejects_move_onto_instructor(self):
+        second = Schedule.objects.bulk_create([self.block(time_start=T(10), time_end=T(11))])[0]
+        with self.assertRaises(ScheduleConflict):
+            Schedule.objects.filter(pk=second.pk).update(instructor=self.instructor, time_start=T(8), time_end=T(9))
+        second.refresh_from_db()
+        self.assertEqual(second.instructor_id, self.other_instructor.id)
+
+    def test_save_that_passed_clean_is_rejected(self):
+        # As for a concurrent save whose clean() ran before the other one committed.
+        with mock.patch.object(Schedule, '_raise_for_clashes'), self.assertRaises(ScheduleConflict):
+            self.block(section=self.section).save()
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_writes_stay_on_the_queryset_database(self):
+        with mock.patch('scheduler.models.transaction.atomic', wraps=transaction.atomic) as atomic:
+            Schedule.objects.using('default').filter(pk=self.first.pk).update(time_start=T(10), time_end=T(11))
+            self.block().save(using='default')
+        self.assertTrue(atomic.call_args_list)
+        self.assertTrue(all(call.kwargs.get('using') == 'default' for call in atomic.call_args_list))
+        self.assertEqual(
+            sorted(ScheduleSlot.objects.filter(schedule=self.first, resource_type=ScheduleSlot.Resource.ROOM).values_list('slot_index', flat=True)),
+            list(range(120, 132)),
+        )
+
+    def test_free_resources_are_accepted(self):
+        Schedule.objects.bulk_create([self.block()])
+        self.assertEqual(ScheduleSlot.objects.filter(resource_type=ScheduleSlot.Resource.ROOM, resource_id=self.other_room.id).count(), 12)
+
+
+class OccupancyTests(ScheduleTestCase):
+    def cells(self, schedule, resource_type=ROOM):
+        return sorted(ScheduleSlot.objects.filter(schedule=schedule, resource_type=resource_type).values_list('day', 'slot_index'))
+
+    def test_is_busy(self):
+        self.assertTrue(is_busy(ROOM, self.room.id, ['MON'], T(8, 55), T(10)))
+        self.assertTrue(is_busy(INSTRUCTOR, self.instructor.id, ['TUE', 'MON'], T(7), T(8, 5)))
+        self.assertTrue(is_busy(SECTION, self.section.id, ['MON'], T(8), T(9)))
+        self.assertFalse(is_busy(ROOM, self.room.id, ['MON'], T(9), T(10)))
+        self.assertFalse(is_busy(ROOM, self.room.id, ['TUE'], T(8), T(9)))
+        self.assertFalse(is_busy(ROOM, self.other_room.id, ['MON'], T(8), T(9)))
+
+    def test_map_loads_a_slice_in_one_query(self):
+        Schedule.objects.bulk_create([self.block(day='TUE')])
+        with self.assertNumQueries(1):
+            occupancy = OccupancyMap.load({ROOM: [self.room.id, self.other_room.id], INSTRUCTOR: [self.instructor.id]}, days=['MON'])
+        self.assertFalse(occupancy.is_free(ROOM, self.room.id, 'MON', T(8, 30), T(9, 30)))
+        self.assertFalse(occupancy.is_free(INSTRUCTOR, self.instructor.id, 'MON', T(8), T(8, 5)))
+        self.assertTrue(occupancy.is_free(ROOM, self.room.id, 'MON', T(9), T(10)))
+        self.assertTrue(occupancy.is_free(ROOM, self.other_room.id, 'TUE', T(8, 30), T(9)))  # day not loaded
+        self.assertTrue(occupancy.is_free(SECTION, self.section.id, 'MON', T(8), T(9)))  # resource not loaded
+
+        occupancy.occupy(ROOM, self.other_room.id, 'MON', T(13), T(14))
+        self.assertFalse(occupancy.is_free(ROOM, self.other_room.id, 'MON', T(13, 55), T(15)))
+        self.assertFalse(OccupancyMap.load().is_free(ROOM, self.other_room.id, 'TUE', T(8, 30), T(9)))
+
+    def test_update_rebuilds_moved_slots_only(self):
+        Schedule.objects.filter(pk=self.first.pk).update(day='WED', time_start=T(10), time_end=T(10, 30), room=self.other_room)
+        self.assertEqual(self.cells(self.first), [('WED', i) for i in range(120, 126)])
+        self.assertTrue(is_busy(ROOM, self.other_room.id, ['WED'], T(10), T(10, 30)))
+        self.assertFalse(is_busy(ROOM, self.room.id, ['MON'], T(8), T(9)))
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.week_start, self.first.week_end), (2 * 1440 + 600, 2 * 1440 + 630))
+
+        with CaptureQueriesContext(connection) as queries:
+            Schedule.objects.filter(pk=self.first.pk).update(meeting_type='LABORATORY')
+        self.assertFalse([q for q in queries.captured_queries if 'scheduler_schedule_slot' in q['sql']])
+        self.assertEqual(self.cells(self.first), [('WED', i) for i in range(120, 126)])
+
+    def test_bulk_create_writes_slots(self):
+        created = Schedule.objects.bulk_create([self.block(day='TUE'), self.block(day='THU', time_start=T(13), time_end=T(14))])
+        self.assertEqual(self.cells(created[0], INSTRUCTOR), [('TUE', i) for i in range(102, 114)])
+        self.assertEqual(self.cells(created[1], SECTION), [('THU', i) for i in range(156, 168)])
+
+    def test_bulk_create_without_returned_keys_saves_each_row(self):
+        # MySQL cannot return the new keys from a bulk insert.
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            created = Schedule.objects.bulk_create([self.block(day='TUE'), self.block(day='FRI')])
+            self.assertTrue(all(schedule.pk for schedule in created))
+            self.assertEqual(self.cells(created[1]), [('FRI', i) for i in range(102, 114)])
+            # Each row goes through clean(), in one transaction.
+            with self.assertRaisesMessage(ValidationError, 'room is already occupied'):
+                Schedule.objects.bulk_create([self.block(day='SAT'), self.block(room=self.room)])
+        self.assertFalse(Schedule.objects.filter(day='SAT').exists())
+
+
+class ScheduleCleanTests(ScheduleTestCase):
+    def conflict_queries(self, queries):
+        return [q['sql'] for q in queries if q['sql'].startswith('SELECT') and '"week_start" <' in q['sql']]
+
+    def test_conflicts_are_flagged_per_resource(self):
+        rows = Schedule.objects.conflicts_for(
+            'MON', T(8, 30), T(9, 30), room=self.room.id, instructor=self.other_instructor.id, section=self.section.id,
+        ).values('pk', 'room_clash', 'instructor_clash', 'section_clash')
+        self.assertEqual(list(rows), [{'pk': self.first.pk, 'room_clash': True, 'instructor_clash': False, 'section_clash': True}])
+        self.assertFalse(Schedule.objects.conflicts_for('MON', T(9), T(10), room=self.room.id).exists())
+        self.assertFalse(Schedule.objects.conflicts_for('TUE', T(8), T(9), room=self.room.id).exists())
+        self.assertFalse(Schedule.objects.conflicts_for('MON', T(8), T(9), room=self.room.id, exclude_pk=self.first.pk).exists())
+
+    def test_clean_reports_room_then_instructor_then_section(self):
+        cases = [
+            (dict(room=self.room, instructor=self.instructor, section=self.section), 'room is already occupied'),
+            (dict(instructor=self.instructor, section=self.section), 'instructor is already teaching'),
+            (dict(section=self.section), 'section already has a class'),
+        ]
+        for fields, message in cases:
+            with self.subTest(message=message), self.assertRaisesMessage(ValidationError, message):
+                self.block(**fields).clean()
+        self.block(time_start=T(9), time_end=T(10), room=self.room, instructor=self.instructor, section=self.section).clean()
+
+    def test_save_runs_one_conflict_query(self):
+        with CaptureQueriesContext(connection) as validated:
+            self.block().save()
+        self.assertEqual(len(self.conflict_queries(validated.captured_queries)), 1)
+
+        with trusted_schedule_batch(), CaptureQueriesContext(connection) as trusted:
+            self.block(day='TUE').save()
+        self.assertEqual(self.conflict_queries(trusted.captured_queries), [])
+        self.assertEqual(len(trusted), len(validated) - 1)
+
+        with self.assertNumQueries(len(validated)):
+            self.block(day='WED').save()
+
+    def test_trusted_batch_keeps_time_checks(self):
+        with trusted_schedule_batch(), self.assertRaisesMessage(ValidationError, 'at least 30 minutes'):
+            self.block(time_end=T(8, 45)).save()
+
+
+class IcalFeedTests(ScheduleTestCase):
+    def fetch(self, url, **headers):
+        response = self.client.get(url, **headers)
+        if response.status_code == 200:
+            response.body = b''.join(response.streaming_content).decode()
+        return response
+
+    def test_feed_lists_the_weekly_classes(self):
+        response = self.fetch(feed_url('room', self.room.id))
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        lines = response.body.split('\r\n')
+        self.assertEqual((lines[0], lines[-2], lines[-1]), ('BEGIN:VCALENDAR', 'END:VCALENDAR', ''))
+        self.assertIn('X-WR-CALNAME:Room R1', lines)
+        self.assertIn(f'UID:schedule-{self.first.pk}@class-scheduling-system', lines)
+        self.assertIn('RRULE:FREQ=WEEKLY;BYDAY=MO', lines)
+        self.assertIn('SUMMARY:CS101 - Intro', lines)
+        self.assertTrue([line for line in lines if line.startswith('DTSTART:') and line.endswith('T080000')])
+        self.assertNotIn('\n', response.body.replace('\r\n', ''))
+
+    def test_bad_tokens_are_not_found(self):
+        token = feed_token('room', self.room.id)
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        for bad in (
+            tampered,
+            signing.Signer(salt='other').sign_object(['room', self.room.id], compress=True),
+            signing.Signer(salt=TOKEN_SALT).sign_object(['user', self.admin.id], compress=True),
+            feed_token('room', 0),
+            'not-a-token',
+        ):
+            with self.subTest(token=bad):
+                self.assertEqual(self.client.get(reverse('ical_feed', args=[bad])).status_code, 404)
+
+    def test_output_is_deterministic_with_a_strong_etag(self):
+        url = feed_url('instructor', self.instructor.id)
+        first, second = self.fetch(url), self.fetch(url)
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertFalse(first['ETag'].startswith('W/'))
+        self.assertEqual(self.fetch(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        Schedule.objects.filter(pk=self.first.pk).update(time_start=T(10), time_end=T(11))
+        changed = self.fetch(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertIn('T100000', changed.body)
+
+    def test_long_lines_fold_on_character_boundaries(self):
+        line = 'SUMMARY:' + 'é' * 60
+        folded = _fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', '')[:-2], line)
+
+
+class ExportTests(ScheduleTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other = Department.objects.create(name='Arts', code='AR')
+        course = Course.objects.create(department=other, course_code='BAE', course_name='English')
+        section = Section.objects.create(course=course, section_name='E1')
+        subject = Subject.objects.create(subject_code='EN1', subject_name='Reading & <Writing>')
+        Schedule.objects.create(
+            section=section, subject=subject, instructor=cls.other_instructor, room=cls.other_room,
+            day='TUE', time_start=T(13), time_end=T(14, 30), meeting_type='LABORATORY',
+        )
+        cls.rows = [
+            ['Arts', 'BAE', 'E1', 'EN1', 'Reading & <Writing>', 'Laboratory', 'Tuesday', '13:00', '14:30', 'R2', 'Grace'],
+            ['Computing', 'BSCS', 'A', 'CS101', 'Intro', 'Lecture', 'Monday', '08:00', '09:00', 'R1', 'Ada'],
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_schedules'), params)
+        self.assertTrue(response.streaming)
+        response.chunks = list(response.streaming_content)
+        return response
+
+    def test_csv(self):
+        response = self.export(format='csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="timetable-campus.csv"')
+        rows = list(csv.reader(io.StringIO(''.join(chunk.decode() for chunk in response.chunks))))
+        self.assertEqual(rows, [list(HEADER)] + self.rows)
+
+        response = self.export(format='csv', department=self.department.id)
+        rows = list(csv.reader(io.StringIO(''.join(chunk.decode() for chunk in response.chunks))))
+        self.assertEqual(rows, [list(HEADER), self.rows[1]])
+
+    def test_xlsx(self):
+        response = self.export(format='xlsx')
+        self.assertGreater(len(response.chunks), 1)  # the fixed parts leave before any row is read
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.chunks))) as package:
+            self.assertIsNone(package.testzip())
+            self.assertEqual(package.namelist(), [
+                '[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/_rels/workbook.xml.rels',
+                'xl/worksheets/sheet1.xml',
+            ])
+            sheet = ElementTree.fromstring(package.read('xl/worksheets/sheet1.xml'))
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        rows = sheet.findall('s:sheetData/s:row', ns)
+        self.assertEqual([row.get('r') for row in rows], ['1', '2', '3'])
+        self.assertEqual(
+            [[cell.findtext('s:is/s:t', namespaces=ns) for cell in row.findall('s:c', ns)] for row in rows],
+            [list(HEADER)] + self.rows,
+        )
+
+    def test_unknown_format_and_non_admins_are_refused(self):
+        self.assertEqual(self.client.get(reverse('export_schedules'), {'format': 'pdf'}).status_code, 400)
+        self.client.force_login(self.instructor.user)
+        self.assertRedirects(self.client.get(reverse('export_schedules')), reverse('home_redirect'), fetch_redirect_response=False)
+
+
+@mock.patch('scheduler.views.MANAGE_SCHEDULES_PAGE_SIZE', 2)
+class ManageSchedulesTests(SchedulerTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        subject = Subject.objects.create(subject_code='CS101', subject_name='Intro')
+        blocks = []
+        for i in range(6):
+            blocks.append(Schedule(
+                section=Section.objects.create(course=cls.course, section_name=f'S{i}'),
+                subject=subject, instructor=cls.make_instructor(f'teacher{i}'),
+                room=Room.objects.create(room_name=f'R{i}', department=cls.department),
+                # Five classes share Monday 08:00, so only the id orders them.
+                day='TUE' if i == 2 else 'MON', time_start=T(8), time_end=T(9),
+            ))
+        cls.schedules = Schedule.objects.bulk_create(blocks)
+        cls.order = [s.pk for s in sorted(cls.schedules, key=lambda s: (s.week_start, s.pk))]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def page(self, **params):
+        response = self.client.get(reverse('manage_schedules'), dict(params, format='json'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row['id'] for row in data['results']], data['next'], data['previous']
+
+    def test_cursors_walk_forward_and_back(self):
+        first, cursor, previous = self.page()
+        self.assertEqual((first, previous), (self.order[:2], None))
+        second, cursor, previous = self.page(after=cursor)
+        self.assertEqual(second, self.order[2:4])
+        third, end, back = self.page(after=cursor)
+        self.assertEqual((third, end), (self.order[4:], None))
+
+        self.assertEqual(self.page(before=back)[0], second)
+        page, forward, previous = self.page(before=previous)
+        self.assertEqual((page, previous), (first, None))
+        self.assertEqual(self.page(after=forward)[0], second)
+
+    def test_filters(self):
+        tuesday = self.schedules[2]
+        self.assertEqual(self.page(day='tue')[0], [tuesday.pk])
+        self.assertEqual(self.page(room=tuesday.room_id)[0], [tuesday.pk])
+        self.assertEqual(self.page(instructor=self.schedules[3].instructor_id)[0], [self.schedules[3].pk])
+        self.assertEqual(self.page(department=self.department.id, day='MON')[0], self.order[:2])
+        self.assertEqual(self.page(department=0)[0], [])
+        self.assertEqual(self.page(day='someday', room='x', after='bad')[0], self.order[:2])
+
+    def test_query_count_does_not_grow_with_depth(self):
+        _ids, second, _previous = self.page()
+        _ids, third, _previous = self.page(after=second)
+        counts = []
+        for params in ({}, {'after': second}, {'after': third}, {'before': third}):
+            with CaptureQueriesContext(connection) as queries:
+                self.page(**params)
+            counts.append(len(queries))
+            self.assertEqual(len([q for q in queries.captured_queries if 'scheduler_schedule' in q['sql']]), 1)
+        self.assertEqual(counts, [counts[0]] * 4)
+
+    def test_html_page(self):
+        response = self.client.get(reverse('manage_schedules'), {'day': 'MON'})
+        self.assertEqual([s.pk for s in response.context['schedules']], self.order[:2])
+        self.assertEqual(response.context['next_cursor'], f"{self.schedules[0].week_start}-{self.order[1]}")
+        self.assertIsNone(response.context['previous_cursor'])
+
+
+@override_settings(REQUEST_PROFILE_SAMPLE_RATE=1)
+class RequestProfilingTests(SchedulerTestCase):
+    def setUp(self):
+        super().setUp()
+        recent_requests.clear()
+        self.addCleanup(recent_requests.clear)
+        patcher = mock.patch('scheduler.middleware.logger')
+        self.logger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def profile(self, view):
+        return RequestProfilingMiddleware(view)(RequestFactory().get('/probe/'))
+
+    def test_recorder_counts_repeats(self):
+        recorder = QueryRecorder()
+        execute = mock.Mock(return_value='rows')
+        for sql, params in (('SELECT 1', (1,)), ('SELECT 1', (2,)), ('SELECT 1', (1,))):
+            self.assertEqual(recorder(execute, sql, params, False, {}), 'rows')
+        self.assertEqual((recorder.count, recorder.duplicates), (3, 1))
+
+    def test_sample_records_queries_and_duplicates(self):
+        def view(request):
+            list(Room.objects.filter(pk=1))
+            list(Room.objects.filter(pk=2))
+            list(Room.objects.filter(pk=1))
+            return HttpResponse('done')
+
+        self.profile(view)
+        record = recent_requests[-1]
+        self.assertEqual(json.loads(self.logger.info.call_args.args[0]), record)
+        self.assertEqual(
+            {key: record[key] for key in ('method', 'path', 'view', 'status', 'queries', 'duplicate_queries', 'response_bytes')},
+            {'method': 'GET', 'path': '/probe/', 'view': None, 'status': 200, 'queries': 3, 'duplicate_queries': 1, 'response_bytes': 4},
+        )
+
+    def test_sampling_rate(self):
+        view = mock.Mock(return_value=HttpResponse())
+        with mock.patch('scheduler.middleware.random.random', return_value=0.7):
+            with override_settings(REQUEST_PROFILE_SAMPLE_RATE=0.5):
+                self.profile(view)
+            self.assertEqual(len(recent_requests), 0)
+            with override_settings(REQUEST_PROFILE_SAMPLE_RATE=0.8):
+                self.profile(view)
+            self.assertEqual(len(recent_requests), 1)
+            with override_settings(REQUEST_PROFILE_SAMPLE_RATE=0):
+                self.profile(view)
+            self.assertEqual(len(recent_requests), 1)
+        self.assertEqual(view.call_count, 3)
+
+    def test_admin_endpoint(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('manage_schedules'), {'format': 'json'})
+        self.client.get(reverse('manage_schedules'), {'format': 'json', 'day': 'MON'})
+        self.client.get(reverse('get_courses', args=[self.department.id]))
+
+        data = self.client.get(reverse('request_profile_api'), {'view': 'manage_schedules'}).json()
+        self.assertEqual((data['sample_rate'], data['sampled']), (1, 2))
+        self.assertEqual([r['path'] for r in data['requests']], [reverse('manage_schedules')] * 2)
+        self.assertEqual(data['requests'][-1]['queries'], 3)  # session, user and the page
+        self.assertEqual(data['views'][0]['view'], 'manage_schedules')
+        self.assertEqual(data['views'][0]['requests'], 2)
+
+        data = self.client.get(reverse('request_profile_api'), {'limit': '1'}).json()
+        self.assertEqual(data['sampled'], 4)  # the previous call to the endpoint included
+        self.assertEqual([r['view'] for r in data['requests']], ['request_profile_api'])
+
+        self.client.force_login(self.make_instructor('ada').user)
+        self.assertEqual(self.client.get(reverse('request_profile_api')).status_code, 403)
+
+
+class CacheKeyTests(SchedulerTestCase):
+    def test_namespace_invalidation(self):
+        cache.set('dashboard', ('totals',), 1)
+        cache.set('solver', ('run',), 2)
+        cache.set('room_schedule', ('timetable',), 3, scope=('room', 1))
+        self.assertEqual(cache.get('dashboard', ('totals',)), 1)
+        cache.invalidate('dashboard')
+        self.assertIsNone(cache.get('dashboard', ('totals',)))
+        self.assertEqual(cache.get('solver', ('run',)), 2)
+
+        cache.invalidate_timetable()
+        self.assertIsNone(cache.get('solver', ('run',)))
+        self.assertEqual(cache.get('room_schedule', ('timetable',), scope=('room', 1)), 3)
+        with self.assertRaises(KeyError):
+            cache.set('nowhere', ('x',), 1)
+
+    def test_scope_invalidation(self):
+        for room_id in (1, 2):
+            cache.set('room_schedule', ('timetable',), room_id, scope=('room', room_id))
+        cache.invalidate_scope('room_schedule', ('room', 1))
+        self.assertIsNone(cache.get('room_schedule', ('timetable',), scope=('room', 1)))
+        self.assertEqual(cache.get('room_schedule', ('timetable',), scope=('room', 2)), 2)
+        cache.invalidate('room_schedule')
+        self.assertIsNone(cache.get('room_schedule', ('timetable',), scope=('room', 2)))
+
+    def test_evicted_generation_retires_old_entries(self):
+        cache.set('dashboard', ('totals',), 1)
+        django_cache.delete('dashboard:generation')
+        self.assertIsNone(cache.get('dashboard', ('totals',)))
+
+    def test_batch_reads_and_writes_take_two_round_trips(self):
+        scopes = [('room', room_id) for room_id in range(1, 5)]
+        cache.get_many('room_schedule', ('timetable',), scopes)  # every generation now exists
+        with mock.patch.object(django_cache, 'get_many', wraps=django_cache.get_many) as get_many, \
+                mock.patch.object(django_cache, 'set_many', wraps=django_cache.set_many) as set_many:
+            cache.set_many('room_schedule', ('timetable',), {scope: [scope[1]] for scope in scopes[:3]})
+            self.assertEqual((get_many.call_count, set_many.call_count), (1, 1))
+            found = cache.get_many('room_schedule', ('timetable',), scopes)
+            # The generations of the namespace and the four scopes, then the entries.
+            self.assertEqual(get_many.call_count, 3)
+        self.assertEqual(found, {scope: [scope[1]] for scope in scopes[:3]})
+
+
+class RoomTimetablesApiTests(ScheduleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def fetch(self, **params):
+        return self.client.get(reverse('room_timetables_api'), params)
+
+    def test_compact_rows(self):
+        data = self.fetch(rooms=f'{self.room.id},{self.other_room.id}').json()
+        self.assertEqual(data['days'], ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN'])
+        self.assertEqual(data['fields'], ['day', 'start', 'end', 'subject_code', 'subject_name', 'section', 'instructor'])
+        self.assertEqual(data['rooms'], {
+            str(self.room.id): {'name': 'R1', 'entries': [[0, 480, 540, 'CS101', 'Intro', 'A', 'Ada']]},
+            str(self.other_room.id): {'name': 'R2', 'entries': []},
+        })
+        by_floor = self.fetch(department=self.department.id, floor=1).json()
+        self.assertEqual(list(by_floor['rooms']), [str(self.room.id), str(self.other_room.id)])
+
+    def test_cached_per_room_until_a_change(self):
+        self.fetch(rooms=self.room.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.fetch(rooms=f'{self.room.id},{self.other_room.id}')
+        schedule_reads = [q['sql'] for q in queries.captured_queries if 'FROM "scheduler_schedule"' in q['sql']]
+        self.assertEqual(len(schedule_reads), 1)
+        self.assertIn(f'IN ({self.other_room.id})', schedule_reads[0])  # only the room not cached yet
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.filter(pk=self.first.pk).update(time_start=T(10), time_end=T(11))
+        entries = self.fetch(rooms=self.room.id).json()['rooms'][str(self.room.id)]['entries']
+        self.assertEqual(entries, [[0, 600, 660, 'CS101', 'Intro', 'A', 'Ada']])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.fetch(rooms='1,x').status_code, 400)
+        self.assertEqual(self.fetch().status_code, 400)
+        self.assertEqual(self.fetch(department='cs').status_code, 400)
+        with mock.patch('scheduler.views.ROOM_TIMETABLES_MAX_ROOMS', 1):
+            self.assertEqual(self.fetch(department=self.department.id).status_code, 400)
+            self.assertEqual(self.fetch(rooms=self.room.id).status_code, 200)
+
+    def test_admins_only(self):
+        self.client.force_login(self.instructor.user)
+        self.assertEqual(self.fetch(rooms=self.room.id).status_code, 403)
+
+
+class OccupancyMigrationTests(SchedulerTestCase):
+    migration = importlib.import_module('scheduler.migrations.0005_schedule_slot_occupancy')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=cls.curriculum)
+        cls.instructor = cls.make_instructor('ada')
+        cls.room = Room.objects.create(room_name='R1', capacity=40, department=cls.department)
+        cls.other_room = Room.objects.create(room_name='R2', capacity=40, department=cls.department)
+        cls.other_section = Section.objects.create(course=cls.course, section_name='B')
+
+    def check(self):
+        self.migration.check_overlaps(apps, SimpleNamespace(connection=connection))
+
+    def insert(self, **fields):
+        # Straight into the table, as rows written before the occupancy grid existed.
+        return models.QuerySet.bulk_create(Schedule.objects.all(), [Schedule(subject=self.subject, **fields)])[0]
+
+    def test_overlapping_schedules_abort_the_migration(self):
+        first = self.insert(section=self.section, instructor=self.instructor, room=self.room,
+                            day='TUE', time_start=T(8), time_end=T(10))
+        second = self.insert(section=self.other_section, instructor=self.instructor, room=self.other_room,
+                             day='TUE', time_start=T(9), time_end=T(11))
+        with self.assertRaises(RuntimeError) as raised:
+            self.check()
+        self.assertIn(f"instructor {self.instructor.id} on TUE: schedule {first.pk} (08:00-10:00) "
+                      f"and schedule {second.pk} (09:00-11:00)", str(raised.exception))
+        self.assertIn("1 pair(s)", str(raised.exception))
+
+    def test_back_to_back_schedules_pass(self):
+        self.insert(section=self.section, instructor=self.instructor, room=self.room,
+                    day='TUE', time_start=T(8), time_end=T(9))
+        self.insert(section=self.section, instructor=self.instructor, room=self.room,
+                    day='TUE', time_start=T(9), time_end=T(10))
+        self.check()
+
+
+class MetricsFileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def exited_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def write(self, name, requests, buckets=None):
+        data = {'scheduler_http_requests_total': [[[['status', '2xx'], ['view', 'home']], requests]]}
+        if buckets is not None:
+            data['scheduler_run_duration_seconds'] = [[[], [buckets, 1.5, buckets[-1]]]]
+        metrics._write(os.path.join(self.directory, name), data)
+
+    def requests_total(self):
+        merged = metrics._merge()
+        return merged['scheduler_http_requests_total'][(('status', '2xx'), ('view', 'home'))]
+
+    def test_exited_workers_are_folded_once(self):
+        dead = self.exited_pid()
+        runs = [0] * len(metrics.RUN_BUCKETS)
+        runs[-1] = 1
+        self.write(f'{dead}-1.json', 5, runs)
+        self.write(f'{dead}-2.json', 7)  # the same pid, reused by a later worker
+        self.write(f'{os.getpid()}-1.json', 1)
+        self.assertEqual(self.requests_total(), 13)
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([metrics.AGGREGATE_FILE, metrics.LOCK_FILE, f'{os.getpid()}-1.json']))
+        self.assertEqual(self.requests_total(), 13)
+        self.assertEqual(metrics._merge()['scheduler_run_duration_seconds'][()][2], 1)
+
+        # A second generation of exited workers adds to the aggregate.
+        self.write(f'{self.exited_pid()}-3.json', 2)
+        self.assertEqual(self.requests_total(), 15)
+
+    def test_file_left_by_an_interrupted_fold_is_not_counted_twice(self):
+        dead = f'{self.exited_pid()}-1.json'
+        self.write(dead, 5)
+        aggregate = {'scheduler_http_requests_total': [[[['status', '2xx'], ['view', 'home']], 5]], 'folded': [dead]}
+        metrics._write(os.path.join(self.directory, metrics.AGGREGATE_FILE), aggregate)
+        self.assertEqual(self.requests_total(), 5)
+        self.assertNotIn(dead, os.listdir(self.directory))
+
+    def test_each_process_writes_its_own_file(self):
+        store = metrics._Store()
+        store.inc('scheduler_http_requests_total', {'view': 'home', 'status': '2xx'})
+        store.flush()
+        name, = os.listdir(self.directory)
+        self.assertRegex(name, rf'^{os.getpid()}-\d+\.json$')
+
+
+class TimetableVersionTests(SchedulerTestCase):
+    def assertBumps(self, change):
+        before = TimetableVersion.current().version
+        change()
+        self.assertGreater(TimetableVersion.current().version, before)
+
+    def test_bulk_subject_writes_bump_the_version(self):
+        self.assertBumps(lambda: Subject.objects.bulk_create([
+            Subject(subject_code='CS101', subject_name='Intro', curriculum=self.curriculum),
+        ]))
+        self.assertBumps(lambda: Subject.objects.filter(subject_code='CS101').update(subject_name='Renamed'))
+
+    def assertKeeps(self, change):
+        before = TimetableVersion.current().version
+        change()
+        self.assertEqual(TimetableVersion.current().version, before)
+
+    def test_user_saves_bump_only_for_shown_fields(self):
+        user = self.make_instructor('ada').user
+
+        def set_password():
+            user.set_password('other')
+            user.save()
+
+        def rename():
+            user.first_name = 'Augusta'
+            user.save()
+
+        self.assertKeeps(set_password)
+        self.assertKeeps(lambda: user.save(update_fields=['last_login']))
+        self.assertKeeps(lambda: user.save(update_fields=['is_active']))
+        self.assertBumps(rename)
+        self.assertBumps(lambda: user.save(update_fields=['last_name']))
+
+
+class SubjectMinuteTests(SchedulerTestCase):
+    def minutes(self, code):
+        return tuple(Subject.objects.filter(subject_code=code).values_list('start_minute', 'end_minute').get())
+
+    def test_bulk_writes_keep_minute_columns(self):
+        Subject.objects.bulk_create([
+            Subject(subject_code='CS101', subject_name='Intro', start_time=T(8), end_time=T(9, 30)),
+            Subject(subject_code='CS102', subject_name='Data'),
+        ])
+        self.assertEqual(self.minutes('CS101'), (480, 570))
+        self.assertEqual(self.minutes('CS102'), (None, None))
+
+        Subject.objects.filter(subject_code='CS101').update(start_time=T(13))
+        self.assertEqual(self.minutes('CS101'), (780, 570))
+        Subject.objects.filter(subject_code='CS102').update(start_time='07:15', end_time=T(8))
+        self.assertEqual(self.minutes('CS102'), (435, 480))
+        Subject.objects.filter(subject_code='CS101').update(end_time=None)
+        self.assertEqual(self.minutes('CS101'), (780, None))
+        Subject.objects.update(end_time=models.F('start_time'))
+        self.assertEqual(self.minutes('CS101'), (780, 780))
+        self.assertEqual(self.minutes('CS102'), (435, 435))
+
+
+class SubjectDayMaskTests(SchedulerTestCase):
+    migration = importlib.import_module('scheduler.migrations.0006_subject_day_mask')
+
+    def test_day_strings_round_trip(self):
+        for mask in range(128):
+            with self.subTest(mask=mask):
+                stored = self.migration._names(mask)
+                self.assertEqual(self.migration._mask(stored), mask)
+                self.assertEqual(day_mask(stored), mask)
+                self.assertEqual(Subject(day=stored).day_mask, mask)
+                self.assertEqual(Subject(day_mask=mask).day, stored)
+                self.assertEqual(day_mask(day_names(mask)), mask)
+
+    def test_legacy_spellings(self):
+        for stored, mask in (('Monday, Wednesday', 0b101), ('mon,WED', 0b101), (' Sunday ', 0b1000000), ('', 0), (None, 0)):
+            with self.subTest(stored=stored):
+                self.assertEqual(self.migration._mask(stored), mask)
+                self.assertEqual(day_mask(stored), mask)
+
+    def test_meeting_on_matches_any_shared_day(self):
+        Subject.objects.bulk_create([
+            Subject(subject_code='MW', subject_name='MW', day='Monday, Wednesday'),
+            Subject(subject_code='TW', subject_name='TW', day='Tuesday, Wednesday'),
+            Subject(subject_code='NONE', subject_name='NONE'),
+        ])
+
+        def codes(days):
+            return sorted(Subject.objects.meeting_on(days).values_list('subject_code', flat=True))
+
+        self.assertEqual(codes(['MON']), ['MW'])
+        self.assertEqual(codes('Wednesday'), ['MW', 'TW'])
+        self.assertEqual(codes(['Monday', 'TUE']), ['MW', 'TW'])
+        self.assertEqual(codes(0b10), ['TW'])
+        self.assertEqual(codes(['SUN']), [])
+        self.assertEqual(codes([]), [])
+
+    def test_form_preselects_stored_days(self):
+        subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', day='Monday, Friday')
+        form = SubjectForm(instance=subject)
+        self.assertEqual(form.initial['day'], ['Monday', 'Friday'])
+        html = str(form['day'])
+        self.assertInHTML('<input type="checkbox" name="day" value="Monday" id="id_day_0" checked>', html)
+        self.assertInHTML('<input type="checkbox" name="day" value="Tuesday" id="id_day_1">', html)
+        self.assertEqual(SubjectForm(instance=subject, initial={'day': ['Sunday']}).initial['day'], ['Sunday'])
+        self.assertNotIn('day', SubjectForm().initial)
+
+
+class SubjectSearchTests(SchedulerTestCase):
+    def codes(self, query):
+        return [subject.subject_code for subject in search_subjects(query)]
+
+    def test_bulk_writes_refresh_documents(self):
+        Subject.objects.bulk_create([
+            Subject(subject_code='CS101', subject_name='Intro', section=self.section),
+            Subject(subject_code='CS102', subject_name='Data'),
+        ])
+        self.assertEqual(self.codes('intro'), ['CS101'])
+        self.assertEqual(self.codes('cs10'), ['CS101', 'CS102'])
+
+        ada = self.make_instructor('ada')
+        Subject.objects.filter(subject_code='CS102').update(subject_name='Algorithms', instructor=ada)
+        self.assertEqual(self.codes('algorithms ada'), ['CS102'])
+        self.assertEqual(self.codes('data'), [])
+
+    def test_import_refreshes_renamed_instructors(self):
+        ada = self.make_instructor('ada')
+        Subject.objects.create(subject_code='CS101', subject_name='Intro', instructor=ada)
+        report = import_file(io.BytesIO(b'username,first_name\nada,Augusta\n'), 'instructors.csv')
+        self.assertEqual(report['updated'], {'User': 1})
+        self.assertEqual(self.codes('augusta'), ['CS101'])
+
+
+class RoomAssignmentTests(SchedulerTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=cls.curriculum)
+        cls.instructor = cls.make_instructor('ada')
+        cls.section.enrolment = 30
+        cls.section.save()
+        cls.small_section = Section.objects.create(course=cls.course, section_name='B', enrolment=10)
+
+    def block(self, section, start=T(8)):
+        return Schedule(
+            section=section, subject=self.subject, instructor=self.instructor,
+            day='MON', time_start=start, time_end=T(start.hour + 1), meeting_type=self.subject.meeting_type,
+        )
+
+    def room(self, name, capacity, **fields):
+        return Room.objects.create(room_name=name, capacity=capacity, department=self.department, **fields)
+
+    def pool(self):
+        return RoomPool(Room.objects.order_by('room_name'), OccupancyMap.load(days=['MON']))
+
+    def test_unknown_capacity_costs_a_fixed_penalty(self):
+        block = self.block(self.section)
+        self.assertEqual(room_cost(block, Room(capacity=0, department=self.department)), UNKNOWN_CAPACITY_PENALTY)
+        self.assertEqual(room_cost(block, Room(capacity=35, department=self.department)), 5)
+
+    def test_sized_room_preferred_over_unknown_capacity(self):
+        self.room('A-unknown', 0)
+        sized = self.room('B-sized', 35)
+        block = self.block(self.section)
+        pool = self.pool()
+        self.assertTrue(pool.reserve(block))
+        pool.assign()
+        self.assertEqual(block.room, sized)
+
+    def test_small_section_leaves_large_room_to_large_section(self):
+        small_room = self.room('A-small', 12)
+        large_room = self.room('B-large', 40)
+        small, large = self.block(self.small_section), self.block(self.section)
+        pool = self.pool()
+        self.assertTrue(pool.reserve(small))
+        self.assertTrue(pool.reserve(large))
+        self.assertEqual(pool.assign(), 2 + 10)
+        self.assertEqual((small.room, large.room), (small_room, large_room))
+
+    def test_slot_refuses_a_block_no_free_room_can_seat(self):
+        self.room('A-small', 12)
+        pool = self.pool()
+        self.assertTrue(pool.reserve(self.block(self.small_section)))
+        self.assertFalse(pool.reserve(self.block(self.section)))
+
+
+@skipUnless(analytics.np, "NumPy is not installed")
+class RoomMatchingTests(SimpleTestCase):
+    rooms = [SimpleNamespace(id=i) for i in range(3001)]
+
+    def test_long_augmenting_path(self):
+        # Block i holds room i and may move to room i + 1; a new block that only
+        # fits room 0 shifts all of them along, deeper than the recursion limit.
+        matching = _Matching()
+        for i in range(3000):
+            self.assertTrue(matching.add(f'block{i}', self.rooms[i:i + 2]))
+        self.assertTrue(matching.add('late', self.rooms[:1]))
+        self.assertEqual(matching.owner[0], 3000)
+        self.assertEqual([matching.owner[i + 1] for i in range(3000)], list(range(3000)))
+
+    def test_block_without_a_path_is_refused(self):
+        matching = _Matching()
+        self.assertTrue(matching.add('a', self.rooms[:2]))
+        self.assertTrue(matching.add('b', self.rooms[:1]))
+        self.assertFalse(matching.add('c', self.rooms[:2]))
+        self.assertEqual((matching.blocks, matching.owner), (['a', 'b'], {0: 1, 1: 0}))
+
+    def test_assignment_is_cheapest(self):
+        inf = float('inf')
+        self.assertEqual(assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]]), [1, 0, 2])
+        self.assertEqual(assignment([[1, inf], [2, 9]]), [0, 1])
+        self.assertEqual(assignment([[5, 1, 7]]), [1])
+
+
+class AnalyticsReportTests(SchedulerTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        subject = Subject.objects.create(subject_code='CS101', subject_name='Intro', curriculum=cls.curriculum)
+        cls.instructor = cls.make_instructor('ada')
+        cls.room = Room.objects.create(room_name='R1', capacity=40, department=cls.department)
+        cls.spare = Room.objects.create(room_name='R2', capacity=20, department=cls.department)
+        # R2 opens Monday 08:00-12:00 only.
+        RoomAvailability.objects.create(room=cls.spare, day='MON', start_time=T(8), end_time=T(12))
+        for day, start, end in (('MON', T(8), T(10)), ('TUE', T(9), T(10, 30))):
+            Schedule.objects.create(
+                section=cls.section, subject=subject, instructor=cls.instructor, room=cls.room,
+                day=day, time_start=start, time_end=end,
+            )
+
+    def test_monday_morning(self):
+        report = analytics.report(day='MON', start=8 * 60, end=12 * 60)
+        rooms = {row['room']: row for row in report['rooms']['least_used']}
+        self.assertEqual(rooms['R1'], {
+            'id': self.room.id, 'room': 'R1', 'department_id': self.department.id,
+            'busy_hours': 2.0, 'available_hours': 4.0, 'utilisation': 0.5,
+        })
+        self.assertEqual((rooms['R2']['busy_hours'], rooms['R2']['available_hours']), (0.0, 4.0))
+        self.assertEqual([row['room'] for row in report['rooms']['least_used']], ['R2', 'R1'])
+        load, = report['instructors']['load']
+        self.assertEqual((load['teaching_hours'], load['available_hours']), (2.0, 4.0))
+
+    def test_heatmaps_and_department_peak(self):
+        report = analytics.report()
+        bins = report['bins']
+        at = bins.index('08:00')
+        monday = report['rooms']['utilisation'][0]
+        # R1 busy, R2 open and idle: half the available rooms are in use.
+        self.assertEqual(monday[at], 0.5)
+        self.assertEqual(monday[bins.index('12:00')], 0.0)
+        self.assertEqual(report['rooms']['free_seats'][0][at], 20.0)
+        self.assertEqual(report['rooms']['seat_utilisation'][0][at], round(40 / 60, 3))
+        tuesday = report['rooms']['utilisation'][1]
+        # R2 is closed on Tuesdays, so R1 alone is all the available rooms.
+        self.assertEqual(tuesday[bins.index('10:00')], 1.0)
+        self.assertEqual(tuesday[bins.index('10:30')], 0.0)
+        department, = report['departments']
+        self.assertEqual((department['rooms'], department['peak_classes'], department['peak_at']), (2, 1.0, 'MON 08:00'))
+        self.assertEqual(department['busy_share'], round(3.5 * 60 / analytics.MINUTES_PER_WEEK, 3))
+
+
+class ImporterTests(SchedulerTestCase):
+    SHEETS = {
+        'departments': [{'name': 'Engineering', 'code': 'ENG', 'description': ''}],
+        'courses': [{'course_code': 'BSCE', 'course_name': 'Civil Engineering', 'department': 'ENG', 'description': ''}],
+        'rooms': [
+            {'room_name': 'E101', 'capacity': '40', 'room_type': 'LECTURE', 'floor': '1', 'department': 'ENG'},
+            {'room_name': 'E-LAB', 'capacity': '25', 'room_type': 'LABORATORY', 'floor': '2', 'department': ''},
+        ],
+        'prospectus': [{
+            'course_code': 'BSCE', 'curriculum': '2024', 'year': '1', 'semester': '1',
+            'subject_code': 'CE101', 'subject_name': 'Statics', 'lecture_units': '3',
+        }],
+        'instructors': [{
+            'username': 'lin', 'first_name': 'Lin', 'last_name': 'Wu', 'email': 'lin@example.com',
+            'instructor_number': 'E-1', 'department': 'ENG', 'subjects': 'CE101',
+        }],
+        'instructor_availability': [{'username': 'lin', 'day': 'Monday', 'start_time': '08:00', 'end_time': '12:00'}],
+        'room_availability': [{'room_name': 'E-LAB', 'day': 'TUE', 'start_time': '1:00 PM', 'end_time': '5:00 PM'}],
+    }
+
+    def run_import(self, sheets, **kwargs):
+        return Importer(json.loads(json.dumps(sheets)), **kwargs).run()
+
+    def test_import_then_reimport_unchanged(self):
+        self.assertEqual(availability_index(ROOM).owners, [])
+        report = self.run_import(self.SHEETS)
+        self.assertTrue(report['written'])
+        self.assertEqual(report['created'], {
+            'Department': 1, 'Course': 1, 'Room': 2, 'Curriculum': 1, 'YearLevel': 1, 'Semester': 1,
+            'Subject': 1, 'CurriculumSubject': 1, 'User': 1, 'Instructor': 1, 'qualifications': 1,
+            'InstructorAvailability': 1, 'RoomAvailability': 1,
+        })
+        self.assertEqual(Room.objects.get(room_name='E101').department.code, 'ENG')
+        self.assertEqual(Instructor.objects.get(user__username='lin').subjects.get().subject_code, 'CE101')
+        self.assertEqual(availability_index(ROOM).owners, [Room.objects.get(room_name='E-LAB').pk])
+
+        report = self.run_import(self.SHEETS)
+        self.assertTrue(report['written'])
+        self.assertEqual((report['created'], report['updated']), ({}, {}))
+
+    def test_reimport_counts_only_changed_rows(self):
+        self.run_import(self.SHEETS)
+        sheets = json.loads(json.dumps(self.SHEETS))
+        sheets['rooms'][1]['capacity'] = '30'
+        sheets['courses'][0]['course_name'] = 'Civil and Environmental Engineering'
+        report = self.run_import(sheets)
+        self.assertEqual(report['updated'], {'Room': 1, 'Course': 1})
+        self.assertEqual(Room.objects.get(room_name='E-LAB').capacity, 30)
+
+    def test_bad_rows_are_reported_and_nothing_is_written(self):
+        sheets = json.loads(json.dumps(self.SHEETS))
+        sheets['rooms'].append({'room_name': 'E102', 'capacity': 'many', 'room_type': 'LECTURE'})
+        sheets['rooms'].append({'room_name': 'E103', 'room_type': 'GYM'})
+        sheets['courses'].append({'course_code': 'BSX', 'course_name': 'X', 'department': 'NOPE'})
+        sheets['instructor_availability'].append({'username': 'ghost', 'day': 'MON', 'start_time': '8:00', 'end_time': '9:00'})
+        sheets['room_availability'].append({'room_name': 'E101', 'day': 'Funday', 'start_time': '8:00', 'end_time': '9:00'})
+        report = self.run_import(sheets)
+        self.assertFalse(report['written'])
+        self.assertEqual(report['errors'], [
+            ('courses', 3, "unknown department 'NOPE'"),
+            ('rooms', 4, "capacity and floor must be numbers"),
+            ('rooms', 5, "room_type must be one of LECTURE, LABORATORY"),
+            ('instructor_availability', 3, "unknown instructor 'ghost'"),
+            ('room_availability', 3, "unknown day 'Funday'"),
+        ])
+        self.assertFalse(Department.objects.filter(code='ENG').exists())
+        self.assertFalse(Room.objects.filter(room_name__startswith='E').exists())
+
+    def test_dry_run_writes_nothing(self):
+        report = self.run_import(self.SHEETS, dry_run=True)
+        self.assertEqual((report['written'], report['errors']), (False, []))
+        self.assertFalse(Room.objects.filter(room_name='E101').exists())
+
+    def test_csv_file(self):
+        report = import_file(io.BytesIO(b"room_name,capacity,room_type\nR9,12,lecture\n"), 'rooms.csv')
+        self.assertEqual(report['created'], {'Room': 1})
+        self.assertEqual(Room.objects.get(room_name='R9').capacity, 12)
+
+
+class GeneratorTestCase(SchedulerTestCase):
+    """A one-semester curriculum, a lecture room and ``generate()`` to run the engine on it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.semester = Semester.objects.create(
+            year_level=YearLevel.objects.create(curriculum=cls.curriculum, year=1), semester_number=1, name='1st',
+        )
+        cls.room = Room.objects.create(room_name='R1', capacity=40, department=cls.department)
+
+    def add_subject(self, code, hours, instructors=(), load_units=3):
+        subject = Subject.objects.create(
+            subject_code=code, subject_name=code, curriculum=self.curriculum,
+            required_hours_per_week=hours, load_units=load_units,
+        )
+        CurriculumSubject.objects.create(
+            curriculum=self.curriculum, year_level=self.semester.year_level, semester=self.semester, subject=subject,
+        )
+        for instructor in instructors:
+            instructor.subjects.add(subject)
+        return subject
+
+    def generate(self):
+        return generate_timetable(curriculum_id=self.curriculum.id)
+
+    def hours(self, instructor, subject=None):
+        qs = Schedule.objects.filter(instructor=instructor)
+        if subject is not None:
+            qs = qs.filter(subject=subject)
+        return sum(s.week_end - s.week_start for s in qs) / 60
+
+
+class InstructorLoadTests(GeneratorTestCase):
+    def test_weekly_hour_caps_are_respected(self):
+        ada = self.make_instructor('ada', max_weekly_hours=2)
+        grace = self.make_instructor('grace', max_weekly_hours=1)
+        self.add_subject('CS101', 4, [ada, grace])
+        result = self.generate()
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['failed'][0]['reason'], 'Only assigned 3/4 hour(s)')
+        self.assertEqual((self.hours(ada), self.hours(grace)), (2, 1))
+        loads = {row['instructor_id']: row for row in result['instructor_loads']}
+        self.assertEqual((loads[ada.id]['hours'], loads[ada.id]['max_hours']), (2.0, 2.0))
+
+    def test_capped_out_instructor_is_skipped(self):
+        ada = self.make_instructor('ada', max_weekly_hours=2)
+        grace = self.make_instructor('grace')
+        # Two hours already taught in another course.
+        other_course = Course.objects.create(department=self.department, course_code='BSIT', course_name='IT')
+        Schedule.objects.create(
+            section=Section.objects.create(course=other_course, section_name='Z'),
+            subject=Subject.objects.create(subject_code='IT100', subject_name='IT100'),
+            instructor=ada, room=self.room, day='FRI', time_start=T(8), time_end=T(10),
+        )
+        subject = self.add_subject('CS101', 2, [ada, grace])
+        self.assertEqual(self.generate()['created'], 2)
+        self.assertEqual((self.hours(ada, subject), self.hours(grace, subject)), (0, 2))
+
+    def test_load_unit_cap_counts_each_subject_and_section_once(self):
+        ada = self.make_instructor('ada', max_load_units=3)
+        grace = self.make_instructor('grace')
+        first = self.add_subject('CS101', 3, [ada])
+        second = self.add_subject('CS102', 1, [ada, grace])
+        self.generate()
+        # Every CS101 hour fits within ada's 3 units; CS102 would make 6.
+        self.assertEqual((self.hours(ada, first), self.hours(ada, second), self.hours(grace, second)), (3, 0, 1))
+
+    @override_settings(SCHEDULER_MAX_WEEKLY_HOURS=1)
+    def test_default_cap_from_settings(self):
+        ada = self.make_instructor('ada')
+        grace = self.make_instructor('grace', max_weekly_hours=5)
+        self.add_subject('CS101', 3, [ada, grace])
+        self.generate()
+        self.assertEqual((self.hours(ada), self.hours(grace)), (1, 2))
+
+    def test_ranking_prefers_current_teacher_then_least_loaded(self):
+        ada, grace, alan = self.make_instructor('ada'), self.make_instructor('grace'), self.make_instructor('alan')
+        subject = self.add_subject('CS101', 3)
+        other = self.add_subject('CS102', 3)
+        loads = InstructorLoads([ada, grace, alan])
+        loads.add(ada.id, other, self.section.id, 120)
+        loads.add(grace.id, other, self.section.id, 60)
+        self.assertEqual(loads.ranked([ada, grace, alan], subject, self.section.id), [alan, grace, ada])
+        loads.add(ada.id, subject, self.section.id, 60)
+        self.assertEqual(loads.ranked([ada, grace, alan], subject, self.section.id), [ada, alan, grace])
+
+
+class GeneratorRoomFitTests(GeneratorTestCase):
+    def test_rooms_fit_sections_and_meeting_types(self):
+        self.section.enrolment = 35
+        self.section.save()
+        small_section = Section.objects.create(course=self.course, section_name='B', enrolment=10)
+        small_room = Room.objects.create(room_name='R0', capacity=12, department=self.department)
+        lab = Room.objects.create(room_name='LAB', capacity=40, room_type=Room.RoomType.LABORATORY, department=self.department)
+        instructors = [self.make_instructor('ada'), self.make_instructor('grace')]
+        lecture = self.add_subject('CS101', 1, instructors)
+        practical = self.add_subject('CS101L', 1, instructors)
+        practical.meeting_type = 'LABORATORY'
+        practical.save()
+
+        result = self.generate()
+        self.assertEqual((result['created'], result['failed']), (4, []))
+        rooms = dict(((s.section_id, s.subject_id), s.room) for s in Schedule.objects.all())
+        self.assertEqual(rooms[self.section.id, lecture.id], self.room)
+        self.assertEqual(rooms[small_section.id, lecture.id], small_room)
+        self.assertEqual({rooms[self.section.id, practical.id], rooms[small_section.id, practical.id]}, {lab})
+
+    def test_section_no_room_can_seat_is_not_placed(self):
+        self.section.enrolment = 41
+        self.section.save()
+        self.add_subject('CS101', 1, [self.make_instructor('ada')])
+        result = self.generate()
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['failed'][0]['reason'], 'Only assigned 0/1 hour(s)')
+
+
+class SchedulerRunTests(GeneratorTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ada = self.make_instructor('ada')
+        self.subject = self.add_subject('CS101', 3, [self.ada])
+
+    def load(self, results):
+        load, = [row for row in results['instructor_loads'] if row['instructor_id'] == self.ada.id]
+        return load['hours'], load['load_units']
+
+    def test_run_is_stored(self):
+        results = self.generate()
+        run = SchedulerRun.objects.get(pk=results['run_id'])
+        self.assertEqual((run.curriculum_id, run.created, run.failed), (self.curriculum.id, 3, 0))
+        self.assertEqual(run.profile, results['profile'])
+        self.assertEqual(run.profile['counters']['saves'], 3)
+        self.assertLessEqual(sum(run.profile['phases_ms'].values()), run.wall_ms + 1)
+        self.assertEqual(run.instructor_loads, results['instructor_loads'])
+        self.assertEqual(self.load(results), (3.0, 3.0))
+        self.assertEqual(run.profiler_report, '')
+
+    def test_profiler_report_is_stored(self):
+        results = generate_timetable(curriculum_id=self.curriculum.id, profiler='cprofile')
+        run = SchedulerRun.objects.get(pk=results['run_id'])
+        self.assertEqual(run.profiler, 'cprofile')
+        self.assertIn('function calls', run.profiler_report)
+
+    def test_failed_saves_are_not_counted_as_load(self):
+        save = Schedule.save
+        calls = []
+
+        def flaky_save(schedule, *args, **kwargs):
+            calls.append(schedule)
+            if len(calls) == 2:
+                raise ScheduleConflict('taken')
+            return save(schedule, *args, **kwargs)
+
+        with mock.patch.object(Schedule, 'save', autospec=True, side_effect=flaky_save):
+            results = self.generate()
+        self.assertEqual(results['created'], 2)
+        self.assertEqual([f['reason'] for f in results['failed']], ['Taken by a concurrent change'])
+        self.assertEqual(self.load(results), (2.0, 3.0))
+        self.assertEqual(SchedulerRun.objects.get(pk=results['run_id']).instructor_loads, results['instructor_loads'])
+
+    def test_no_saved_block_leaves_no_load(self):
+        with mock.patch.object(Schedule, 'save', side_effect=RuntimeError('disk full')):
+            results = self.generate()
+        self.assertEqual((results['created'], len(results['failed'])), (0, 3))
+        self.assertEqual(self.load(results), (0.0, 0.0))
+
+
+class AvailabilityIndexTests(SimpleTestCase):
+    index = AvailabilityIndex([
+        (1, 'MON', T(8), T(10)), (1, 'MON', T(10), T(12)),
+        (2, 'TUE', T(8, 3), T(9)),
+        (3, 'SUN', T(22), datetime.time.max),
+    ])
+
+    def test_windows_cover_whole_cells_only(self):
+        self.assertTrue(self.index.is_available(1, 'MON', T(9), T(11)))  # across two adjacent windows
+        self.assertFalse(self.index.is_available(1, 'MON', T(11), T(13)))
+        self.assertFalse(self.index.is_available(1, 'TUE', T(9), T(10)))
+        self.assertTrue(self.index.is_available(2, 'TUE', T(8, 5), T(9)))
+        self.assertFalse(self.index.is_available(2, 'TUE', T(8), T(9)))  # 08:00-08:05 is only partly open
+        self.assertTrue(self.index.is_available(3, 'SUN', T(23), datetime.time.max))
+
+    def test_entities_without_windows_are_always_available(self):
+        self.assertTrue(self.index.is_available(99, 'WED', T(3), T(4)))
+
+    def test_filter_matches_single_checks(self):
+        ids = [4, 3, 2, 1]
+        for day, start, end in (('MON', T(9), T(11)), ('TUE', T(8, 5), T(8, 30)), ('SUN', T(22), T(23)), ('MON', T(12), T(13))):
+            with self.subTest(day=day, start=start):
+                expected = [pk for pk in ids if self.index.is_available(pk, day, start, end)]
+                self.assertEqual(self.index.available(ids, day, start, end), expected)
+        self.assertEqual(self.index.available(ids, 'MON', T(9), T(11)), [4, 1])
+
+
+class AvailabilityCacheTests(GeneratorTestCase):
+    def test_index_follows_availability_changes(self):
+        # No on-commit callbacks run here, as in a worker that did not handle
+        # the write: the index must still be keyed on the stored stamp.
+        ada = self.make_instructor('ada')
+        self.assertTrue(availability_index(INSTRUCTOR).is_available(ada.id, 'TUE', T(9), T(10)))
+        window = InstructorAvailability.objects.create(instructor=ada, day='MON', start_time=T(8), end_time=T(12))
+        self.assertFalse(availability_index(INSTRUCTOR).is_available(ada.id, 'TUE', T(9), T(10)))
+        self.assertEqual(check_slots(None, ada, None, [('TUE', T(9), T(10))]), [[INSTRUCTOR_UNAVAILABLE]])
+        window.delete()
+        self.assertEqual(check_slots(None, ada, None, [('TUE', T(9), T(10))]), [[]])
+
+        RoomAvailability.objects.create(room=self.room, day='WED', start_time=T(8), end_time=T(9))
+        self.assertEqual(
+            check_slots(None, None, self.room, [('WED', T(8), T(9)), ('WED', T(9), T(10))]),
+            [[], [ROOM_UNAVAILABLE]],
+        )
+        self.assertEqual(availability_index(ROOM).owners, [self.room.id])
+
+    def test_index_is_shared_until_the_stamp_moves(self):
+        availability_index(ROOM)
+        with self.assertNumQueries(1):
+            availability_index(ROOM)
+        Room.objects.filter(pk=self.room.pk).update(capacity=10)
+        with self.assertNumQueries(1):
+            availability_index(ROOM)
+
+    def test_generator_keeps_to_availability(self):
+        ada, grace = self.make_instructor('ada'), self.make_instructor('grace')
+        with self.captureOnCommitCallbacks(execute=True):
+            InstructorAvailability.objects.create(instructor=ada, day='WED', start_time=T(13), end_time=T(15))
+            InstructorAvailability.objects.create(instructor=grace, day='THU', start_time=T(9), end_time=T(10))
+            RoomAvailability.objects.create(room=self.room, day='WED', start_time=T(8), end_time=T(17))
+            RoomAvailability.objects.create(room=self.room, day='THU', start_time=T(8), end_time=T(17))
+        self.add_subject('CS101', 3, [ada, grace])
+        self.assertEqual(self.generate()['created'], 3)
+        self.assertEqual(
+            sorted((s.instructor.user.username, s.day, s.time_start) for s in Schedule.objects.all()),
+            [('ada', 'WED', T(13)), ('ada', 'WED', T(14)), ('grace', 'THU', T(9))],
+        )
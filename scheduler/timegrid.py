@@ -0,0 +1,80 @@
+"""
+Scheduling time grid.
+
+Every Schedule is mapped onto fixed SLOT_MINUTES cells per day so that
+occupancy can be stored and compared as integers instead of time ranges,
+and onto a "minute of week" (Monday 00:00 = 0) for single-range overlap tests.
+"""
+import datetime
+
+SLOT_MINUTES = 5
+MINUTES_PER_DAY = 24 * 60
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+# Weekdays in Schedule.Day order; bit i of a day mask stands for DAY_CODES[i].
+DAY_CODES = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+ALL_DAYS_MASK = (1 << len(DAY_CODES)) - 1
+
+_DAY_BITS = {}
+for _i, (_code, _name) in enumerate(zip(DAY_CODES, DAY_NAMES)):
+    _DAY_BITS[_code.lower()] = _DAY_BITS[_name.lower()] = 1 << _i
+
+
+def minute_of_day(t: datetime.time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def minute_of_week(day: str, t: datetime.time) -> int:
+    return DAY_CODES.index(day) * MINUTES_PER_DAY + minute_of_day(t)
+
+
+def week_range(day: str, start: datetime.time, end: datetime.time):
+    """(start, end) minutes of week for a class held on ``day``."""
+    offset = DAY_CODES.index(day) * MINUTES_PER_DAY
+    return offset + minute_of_day(start), offset + minute_of_day(end)
+
+
+def clock(minutes: int) -> str:
+    """"HH:MM" for a minute of day (or of week)."""
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def is_on_grid(t: datetime.time) -> bool:
+    return t.minute % SLOT_MINUTES == 0 and t.second == 0 and t.microsecond == 0
+
+
+def slot_range(start: datetime.time, end: datetime.time) -> range:
+    """Indexes of every grid cell touched by [start, end)."""
+    first = minute_of_day(start) // SLOT_MINUTES
+    last = -(-minute_of_day(end) // SLOT_MINUTES)  # ceil
+    return range(first, last)
+
+
+def day_mask(days) -> int:
+    """
+    Bit mask for a day list: either the legacy "Monday, Wednesday" string or
+    an iterable of day names / Schedule.Day codes. Unknown entries are ignored.
+    """
+    if not days:
+        return 0
+    if isinstance(days, str):
+        days = days.split(',')
+    mask = 0
+    for day in days:
+        mask |= _DAY_BITS.get(str(day).strip().lower(), 0)
+    return mask
+
+
+def day_names(mask: int):
+    return [name for i, name in enumerate(DAY_NAMES) if mask & (1 << i)]
+
+
+def day_codes(mask: int):
+    return [code for i, code in enumerate(DAY_CODES) if mask & (1 << i)]
+
+
+def masks_overlapping(mask: int):
+    """Every possible mask sharing a day with ``mask``, for indexed IN lookups."""
+    return [m for m in range(1, ALL_DAYS_MASK + 1) if m & mask]
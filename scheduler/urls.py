@@ -32,6 +32,7 @@ urlpatterns = [
     # CURRICULUM MANAGEMENT
     # ==============================
     path('admin/curriculum/', views.manage_curriculum, name='manage_curriculum'),
+    path('admin/import/', views.import_timetable_data, name='import_timetable_data'),
 
     # ==============================
     # SUBJECT MANAGEMENT
@@ -40,6 +41,11 @@ urlpatterns = [
     path("admin/subject/edit/<int:subject_id>/", views.edit_subject, name="edit_subject"),
     path('admin/subject/delete/<int:subject_id>/', views.delete_subject, name='delete_subject'),
     path('admin/api/subject/<int:subject_id>/', views.get_subject_api, name='get_subject_api'),
+    path('admin/api/subjects/search/', views.subject_search_api, name='subject_search_api'),
+    path('admin/api/autocomplete/<str:kind>/', views.autocomplete_api, name='autocomplete_api'),
+    path('admin/api/request-profile/', views.request_profile_api, name='request_profile_api'),
+    path('admin/api/analytics/', views.analytics_api, name='analytics_api'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('admin/subject/edit/<int:subject_id>/', views.edit_manage_subjects, name='edit_manage_subjects'),
     path('delete-subject/', views.delete_subject, name='delete_subject'),
 
@@ -75,9 +81,11 @@ urlpatterns = [
     # SCHEDULING
     # ==============================
     path('admin/schedules/', views.manage_schedules, name='manage_schedules'),
+    path('admin/schedules/export/', views.export_schedules, name='export_schedules'),
     path('admin/curriculum/assign_schedule/<int:cs_id>/', views.assign_schedule, name='assign_schedule'),
     path('admin/generate_timetable/', views.generate_timetable, name='generate_timetable'),
     path('admin/validate_slot/', views.validate_slot, name='validate_slot'),
+    path('admin/validate_slots/', views.validate_slots, name='validate_slots'),
     path('edit_schedule/<int:schedule_id>/', views.edit_schedule, name='edit_schedule'),
     path('delete_schedule/<int:schedule_id>/', views.delete_schedule, name='delete_schedule'),
 
@@ -99,7 +107,10 @@ urlpatterns = [
 
 
     path('public/schedule/', public_schedule_view, name='public_schedule'),
+    path('public/timetables/<path:path>', views.published_timetable, name='published_timetable'),
+    path('ical/<str:token>.ics', views.ical_feed, name='ical_feed'),
     path('api/room-schedule/<int:room_id>/', views.room_schedule_api, name='room_schedule_api'),
+    path('api/room-timetables/', views.room_timetables_api, name='room_timetables_api'),
     path('check-room-availability/', views.check_room_availability, name='check_room_availability'),
     path('google409907f111977f19.html', views.google_verification, name='google_verification'),
     path('sitemap.xml', views.sitemap_view, name='sitemap'),
@@ -17,20 +17,47 @@ from .forms import (
     SubjectForm,
     SchoolYearLevelForm,
 )
-from .models import Section, Schedule, Subject, Room, Announcement, Curriculum, CurriculumRevision, Instructor, User, Course, YearLevel, Semester, CurriculumSubject, Department, SchoolYearLevel, RoomAvailability
+from .models import Section, Schedule, Subject, Room, Announcement, Curriculum, CurriculumRevision, Instructor, User, Course, YearLevel, Semester, CurriculumSubject, Department, SchoolYearLevel, RoomAvailability, TimetableVersion
 import datetime
+import logging
 from django.db import IntegrityError
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .models import User, Section 
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Concat
 from scheduler.models import User, Instructor, Department
 from django.http import JsonResponse
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from urllib.parse import urlencode
+import hashlib
+import os
+from .occupancy import is_busy, ROOM
+from .search import search_subjects, search_terms
+from .autocomplete import SOURCES as AUTOCOMPLETE_SOURCES, suggest
+from .exports import csv_stream, export_rows, xlsx_stream
+from .importers import ImportFileError, import_file
+from .ical import FEEDS as ICAL_FEEDS, calendar_lines, feed_url, read_feed_token
+from .publishing import INDEX_FILE, fresh_index, load_snapshot, publish_timetables, timetable_entry
+from .timegrid import DAY_CODES, MINUTES_PER_DAY, day_mask, day_names, minute_of_day, clock
+from .middleware import profile_summary, recent_requests
+from . import analytics, metrics
+from . import cache as scheduler_cache
+
+logger = logging.getLogger(__name__)
 
 def get_available_times(room):
     """Get available time slots for a room"""
@@ -136,7 +163,7 @@ def auth_view(request):
             messages.success(request, "Instructor registered successfully! Wait for admin approval.")
             return redirect('auth_page')
         else:
-            print("INSTRUCTOR FORM ERRORS:", instructor_form.errors)
+            logger.debug("Instructor registration errors: %s", instructor_form.errors.as_json())
             messages.error(request, f"Error creating Instructor account: {instructor_form.errors}")
 
     # ====================================================
@@ -157,7 +184,7 @@ def auth_view(request):
 @login_required
 def home_redirect(request):
     user = request.user
-    print("DEBUG: Logged in user role:", user.role)  # 👈 Add this
+    logger.debug("Logged in user %s has role %s", user.pk, user.role)
 
     if user.is_superuser or user.is_admin():
         return redirect('admin_dashboard')
@@ -165,7 +192,7 @@ def home_redirect(request):
         return redirect('instructor_dashboard')
     return redirect('admin_dashboard')
 
-from django.db.models import Sum
+from django.db.models import Sum, F
 from collections import defaultdict
 
 @login_required
@@ -178,6 +205,23 @@ def instructor_dashboard(request):
 
     instructor = request.user.instructor_profile
 
+    context = {
+        'instructor': instructor,
+        'calendar_url': request.build_absolute_uri(feed_url('instructor', instructor.id)),
+        **scheduler_cache.get_or_set(
+            'instructor_dashboard', ('schedules',), lambda: _instructor_dashboard_schedules(instructor),
+            scope=('instructor', instructor.id),
+        ),
+        'days_of_week': ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"],
+        # Latest Announcements
+        'announcements': Announcement.objects.all().order_by('-created_at')[:5],
+    }
+
+    return render(request, 'scheduler/instructor/dashboard.html', context)
+
+
+def _instructor_dashboard_schedules(instructor):
+    """Schedule groups and summary cards of instructor_dashboard."""
     # Fetch all schedules for this instructor
     schedules = Schedule.objects.filter(instructor=instructor).select_related(
         'subject', 
@@ -188,14 +232,12 @@ def instructor_dashboard(request):
         'subject__curriculum'
     ).order_by('day', 'time_start')
 
-    print(f"\n{'='*60}")
-    print(f"INSTRUCTOR DASHBOARD DEBUG")
-    print(f"{'='*60}")
-    print(f"Instructor: {instructor.user.get_full_name()}")
-    print(f"Total schedules found: {schedules.count()}")
-    for sched in schedules:
-        print(f"  - {sched.subject.subject_code} | {sched.day} | {sched.time_start}-{sched.time_end} | Section: {sched.section.section_name}")
-    print(f"{'='*60}\n")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Instructor dashboard for %s: %s",
+            instructor.user.get_full_name(),
+            [f"{s.subject.subject_code} {s.day} {s.time_start}-{s.time_end} {s.section.section_name}" for s in schedules],
+        )
 
     # Organize schedules by section, year level, and semester
     section_schedule_groups = []
@@ -228,7 +270,7 @@ def instructor_dashboard(request):
     for (section, year_level, semester_num, semester_name), section_schedules in [(k, schedules_by_section[k]) for k in sorted_keys]:
         # Collect unique time slots
         time_slots = sorted(set(
-            f"{s.time_start.strftime('%H:%M')}-{s.time_end.strftime('%H:%M')}" 
+            f"{clock(s.week_start)}-{clock(s.week_end)}"
             for s in section_schedules
         ))
 
@@ -239,7 +281,7 @@ def instructor_dashboard(request):
         }
         
         for s in section_schedules:
-            slot = f"{s.time_start.strftime('%H:%M')}-{s.time_end.strftime('%H:%M')}"
+            slot = f"{clock(s.week_start)}-{clock(s.week_end)}"
             days_dict[s.day][slot].append(s)
 
         section_schedule_groups.append({
@@ -255,43 +297,41 @@ def instructor_dashboard(request):
     # Summary Cards
     total_subjects = schedules.values('subject').distinct().count()
     total_sections = schedules.values('section').distinct().count()
-    total_seconds = sum(
-        (sched.time_end.hour * 3600 + sched.time_end.minute * 60) -
-        (sched.time_start.hour * 3600 + sched.time_start.minute * 60)
-        for sched in schedules
-    )
-    total_hours = round(total_seconds / 3600, 2)
-
-    # Latest Announcements
-    announcements = Announcement.objects.all().order_by('-created_at')[:5]
+    total_minutes = schedules.aggregate(total=Sum(F('week_end') - F('week_start')))['total'] or 0
+    total_hours = round(total_minutes / 60, 2)
 
-    context = {
-        'instructor': instructor,
+    return {
         'section_schedule_groups': section_schedule_groups,
-        'days_of_week': ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"],
         'total_subjects': total_subjects,
         'total_sections': total_sections,
         'total_hours': total_hours,
-        'announcements': announcements,
     }
 
-    return render(request, 'scheduler/instructor/dashboard.html', context)
-
 
 # ---------------- ADMIN DASHBOARD ----------------
-@login_required
-def admin_dashboard(request):
-    if not request.user.is_admin():
-        messages.error(request, "Access denied.")
-        return redirect('home_redirect')
+# Totals are cached; timetable changes clear them at once, curricula within the timeout.
+DASHBOARD_TOTALS_TIMEOUT = 60
 
-    context = {
+
+def _admin_dashboard_totals():
+    return {
         'total_instructors': User.objects.filter(role=User.Role.INSTRUCTOR).count(),
         'total_schedules': Schedule.objects.count(),
         'total_subjects': Subject.objects.count(),
         'total_rooms': Room.objects.count(),
         'total_sections': Section.objects.count(),
         'total_prospectus': Curriculum.objects.count(),
+    }
+
+
+@login_required
+def admin_dashboard(request):
+    if not request.user.is_admin():
+        messages.error(request, "Access denied.")
+        return redirect('home_redirect')
+
+    context = {
+        **scheduler_cache.get_or_set('dashboard', ('totals',), _admin_dashboard_totals, DASHBOARD_TOTALS_TIMEOUT),
 
         # RECENT DATA
         'recent_instructors': User.objects.filter(role=User.Role.INSTRUCTOR).order_by('-id')[:5],
@@ -613,9 +653,8 @@ def manage_sections(request):
                 paginator_obj = paginated_sections
 
     if request.method == 'POST':
-        print(f"DEBUG: POST request received with data: {dict(request.POST)}")
         action = request.POST.get('action')
-        print(f"DEBUG: Action is: {action}")
+        logger.debug("manage_sections POST action=%s", action)
         
         # CREATE NEW SECTION
         if action == 'create_section':
@@ -624,7 +663,7 @@ def manage_sections(request):
             section_name = request.POST.get('section_name')
             year_level = request.POST.get('year_level')
 
-            print(f"DEBUG: Creating section - dept: {department_id}, course: {course_id}, name: {section_name}, year: {year_level}")
+            logger.debug("Creating section dept=%s course=%s name=%s year=%s", department_id, course_id, section_name, year_level)
 
             if not department_id:
                 messages.error(request, 'Please select a department.')
@@ -641,7 +680,8 @@ def manage_sections(request):
                 Section.objects.create(
                     course=course, 
                     section_name=section_name, 
-                    year_level=int(year_level) if year_level else 1
+                    year_level=int(year_level) if year_level else 1,
+                    enrolment=int(request.POST.get('enrolment') or 0),
                 )
                 messages.success(request, f'Section "{section_name}" created successfully!')
             except Exception as e:
@@ -662,6 +702,8 @@ def manage_sections(request):
                 section.course = course
                 section.section_name = section_name
                 section.year_level = year_level or 1
+                if request.POST.get('enrolment', '').isdigit():
+                    section.enrolment = int(request.POST['enrolment'])
                 section.save()
                 
                 messages.success(request, f'Section "{section_name}" updated successfully!')
@@ -680,7 +722,7 @@ def manage_sections(request):
         
         # FALLBACK - catch any unhandled POST
         else:
-            print(f"DEBUG: Unhandled POST action: {action}")
+            logger.warning("manage_sections: unhandled POST action %r", action)
             messages.warning(request, f'Unknown action received: {action}. Please try again.')
             return redirect('manage_sections')
     
@@ -705,13 +747,185 @@ def get_sections_by_course(request, course_id):
     return JsonResponse(list(sections.values('id', 'section_name')), safe=False)
 
 
+MANAGE_SCHEDULES_PAGE_SIZE = 50
+
+
+def _manage_schedules_filters(request):
+    """Valid filter values only: a day code and room / instructor / department ids."""
+    filters = {}
+    day = request.GET.get('day', '').upper()
+    if day in Schedule.Day.values:
+        filters['day'] = day
+    for name in ('room', 'instructor', 'department'):
+        value = request.GET.get(name, '')
+        if value.isdigit():
+            filters[name] = int(value)
+    return filters
+
+
+def _schedule_cursor(value):
+    """(week_start, id) from a "<week_start>-<id>" cursor, or None."""
+    week_start, _, pk = value.partition('-')
+    if week_start.isdigit() and pk.isdigit():
+        return int(week_start), int(pk)
+    return None
+
+
+def _schedule_row(s):
+    return {
+        'id': s.id,
+        'section': {'id': s.section_id, 'name': s.section.section_name, 'course': s.section.course.course_code},
+        'department': s.section.course.department.name if s.section.course.department else None,
+        'subject': {'id': s.subject_id, 'code': s.subject.subject_code, 'name': s.subject.subject_name},
+        'instructor': {
+            'id': s.instructor_id,
+            'name': s.instructor.user.get_full_name() or s.instructor.user.username,
+        },
+        'room': {'id': s.room_id, 'name': s.room.room_name},
+        'day': s.day,
+        'meeting_type': s.meeting_type,
+        'time_start': s.time_start.strftime('%H:%M'),
+        'time_end': s.time_end.strftime('%H:%M'),
+    }
+
+
 @login_required
 def manage_schedules(request):
+    """
+    Schedules in (week_start, id) order, a page at a time. Pages are keyed by
+    the last row shown (?after=<week_start>-<id>, or ?before= going back), so
+    deep pages cost the same as the first. ?format=json returns the page for
+    the grid UI.
+    """
+    if not request.user.is_admin():
+        if request.GET.get('format') == 'json':
+            return JsonResponse({"error": "Unauthorized"}, status=403)
+        messages.error(request, "Access denied.")
+        return redirect('home_redirect')
+
+    filters = _manage_schedules_filters(request)
+    schedules = Schedule.objects.select_related(
+        'section__course__department', 'subject', 'instructor__user', 'room',
+    )
+    if 'day' in filters:
+        # Same as day=, but as a range on the (…, week_start, week_end) indexes.
+        start = DAY_CODES.index(filters['day']) * MINUTES_PER_DAY
+        schedules = schedules.filter(week_start__gte=start, week_start__lt=start + MINUTES_PER_DAY)
+    if 'room' in filters:
+        schedules = schedules.filter(room_id=filters['room'])
+    if 'instructor' in filters:
+        schedules = schedules.filter(instructor_id=filters['instructor'])
+    if 'department' in filters:
+        schedules = schedules.filter(section__course__department_id=filters['department'])
+
+    after = _schedule_cursor(request.GET.get('after', ''))
+    before = _schedule_cursor(request.GET.get('before', '')) if after is None else None
+    if before is not None:
+        page = schedules.filter(
+            Q(week_start__lt=before[0]) | Q(week_start=before[0], pk__lt=before[1])
+        ).order_by('-week_start', '-pk')[:MANAGE_SCHEDULES_PAGE_SIZE + 1]
+        page = list(page)[::-1]
+        has_previous = len(page) > MANAGE_SCHEDULES_PAGE_SIZE
+        page = page[-MANAGE_SCHEDULES_PAGE_SIZE:] if has_previous else page
+        has_next = True
+    else:
+        if after is not None:
+            schedules = schedules.filter(Q(week_start__gt=after[0]) | Q(week_start=after[0], pk__gt=after[1]))
+        page = list(schedules.order_by('week_start', 'pk')[:MANAGE_SCHEDULES_PAGE_SIZE + 1])
+        has_next = len(page) > MANAGE_SCHEDULES_PAGE_SIZE
+        page = page[:MANAGE_SCHEDULES_PAGE_SIZE]
+        has_previous = after is not None
+
+    next_cursor = f"{page[-1].week_start}-{page[-1].pk}" if page and has_next else None
+    previous_cursor = f"{page[0].week_start}-{page[0].pk}" if page and has_previous else None
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [_schedule_row(s) for s in page],
+            'next': next_cursor,
+            'previous': previous_cursor,
+        })
+
+    filter_query = urlencode(filters)
+    return render(request, 'scheduler/admin/manage_schedules.html', {
+        'schedules': page,
+        'filters': filters,
+        'filter_query': filter_query,
+        'next_cursor': next_cursor,
+        'previous_cursor': previous_cursor,
+        'days': Schedule.Day.choices,
+        'departments': Department.objects.order_by('name'),
+        'rooms': Room.objects.order_by('room_name').only('id', 'room_name'),
+        'instructors': Instructor.objects.select_related('user').order_by('user__first_name', 'user__last_name'),
+    })
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+@login_required
+@require_GET
+def export_schedules(request):
+    """Stream the campus, department (?department=) or curriculum (?curriculum=) timetable."""
     if not request.user.is_admin():
         messages.error(request, "Access denied.")
         return redirect('home_redirect')
-    schedules = Schedule.objects.all()
-    return render(request, 'scheduler/admin/manage_schedules.html', {'schedules': schedules})
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"Unsupported format '{fmt}'"}, status=400)
+    department = request.GET.get('department', '')
+    curriculum = request.GET.get('curriculum', '')
+    department = int(department) if department.isdigit() else None
+    curriculum = int(curriculum) if curriculum.isdigit() else None
+
+    writer, content_type = EXPORT_FORMATS[fmt]
+    rows = export_rows(department=department, curriculum=curriculum)
+    scope = f"department-{department}" if department else f"curriculum-{curriculum}" if curriculum else "campus"
+    response = StreamingHttpResponse(writer(rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="timetable-{scope}.{fmt}"'
+    return response
+
+
+IMPORT_ERRORS_SHOWN = 20
+
+
+@login_required
+@require_POST
+def import_timetable_data(request):
+    """Bulk import an uploaded CSV/XLSX file; see scheduler.importers for the layout."""
+    if not request.user.is_admin():
+        messages.error(request, "Access denied.")
+        return redirect('home_redirect')
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        messages.error(request, "Choose a CSV or XLSX file to import.")
+        return redirect('manage_curriculum')
+    try:
+        report = import_file(upload, upload.name, dry_run=bool(request.POST.get('dry_run')))
+    except ImportFileError as e:
+        messages.error(request, str(e))
+        return redirect('manage_curriculum')
+
+    errors = report['errors']
+    if errors:
+        for kind, line, message in errors[:IMPORT_ERRORS_SHOWN]:
+            messages.error(request, f"{kind}, line {line}: {message}")
+        messages.error(request, f"{len(errors)} row(s) rejected; nothing was imported.")
+        return redirect('manage_curriculum')
+
+    created = sum(report['created'].values())
+    updated = sum(report['updated'].values())
+    if report['written']:
+        publish_timetables()
+        messages.success(request, f"Imported {upload.name}: {created} records created, {updated} updated.")
+    else:
+        messages.success(request, f"{upload.name} is valid: {created} records would be created, {updated} updated.")
+    return redirect('manage_curriculum')
 
 
 @login_required
@@ -725,6 +939,7 @@ def manage_subjects(request):
     subject_query = request.GET.get('subject', '').strip()
     room_query = request.GET.get('room', '').strip()
     subject_code_query = request.GET.get('subject_code', '').strip()
+    search_query = request.GET.get('q', '').strip()
 
     # --- Base queryset ---
     subjects = Subject.objects.select_related(
@@ -787,6 +1002,10 @@ def manage_subjects(request):
     if subject_code_query:
         subjects = subjects.filter(subject_code__icontains=subject_code_query)
 
+    # --- Single search box across code, name, instructor, room, section ---
+    if search_query:
+        subjects = search_subjects(search_query, subjects)
+
     # --- Prepare subjects with year and semester metadata ---
     subjects_with_metadata = []
     for subject in subjects.distinct():
@@ -817,34 +1036,11 @@ def manage_subjects(request):
         x.semester_number
     ))
 
-    # --- Dropdowns data for datalists ---
-    departments = Department.objects.all()
-    
-    # Get school years from sections
-    school_years = Section.objects.values_list('year_level', flat=True).distinct().order_by('year_level')
-    
-    # Get section names
-    if selected_department:
-        sections = Section.objects.filter(
-            course__department=selected_department
-        ).values_list('section_name', flat=True).distinct().order_by('section_name')
-    else:
-        sections = Section.objects.values_list('section_name', flat=True).distinct().order_by('section_name')
-
-    # --- Instructor list (filtered by department if selected) ---
-    if selected_department:
-        instructors = Instructor.objects.filter(department=selected_department).select_related('user')
-    else:
-        instructors = Instructor.objects.all().select_related('user')
-
     # --- Context ---
+    # Datalists are filled on demand from autocomplete_api.
     context = {
         'subjects': subjects_with_metadata,
-        'departments': departments,
         'selected_department': selected_department,
-        'school_years': school_years,
-        'sections': sections,
-        'instructors': instructors,
     }
 
     return render(request, 'scheduler/admin/manage_subjects.html', context)
@@ -976,6 +1172,7 @@ def edit_manage_subjects(request, subject_id):
 
 
 from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
 @login_required
 def get_subject_api(request, subject_id):
@@ -998,6 +1195,110 @@ def get_subject_api(request, subject_id):
     return JsonResponse(data)
 
 
+@login_required
+@require_GET
+def autocomplete_api(request, kind):
+    """Prefix suggestions for the filter form datalists."""
+    if not request.user.is_admin():
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    if kind not in AUTOCOMPLETE_SOURCES:
+        return JsonResponse({"error": f"Unknown source '{kind}'"}, status=404)
+
+    department = request.GET.get('department', '')
+    results = suggest(kind, request.GET.get('q', ''), int(department) if department.isdigit() else None)
+    return JsonResponse({"results": results})
+
+
+@login_required
+@require_GET
+def request_profile_api(request):
+    """
+    Recent sampled requests from this process, newest first, plus per-view
+    totals. ?view= narrows both to one view name; ?limit= caps the list.
+    """
+    if not request.user.is_admin():
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    records = list(recent_requests)
+    view = request.GET.get('view')
+    if view:
+        records = [r for r in records if r['view'] == view]
+    limit = request.GET.get('limit', '')
+    limit = int(limit) if limit.isdigit() else 100
+    return JsonResponse({
+        'sample_rate': settings.REQUEST_PROFILE_SAMPLE_RATE,
+        'buffer_size': recent_requests.maxlen,
+        'sampled': len(records),
+        'views': profile_summary(records),
+        'requests': records[::-1][:limit],
+    })
+
+
+@login_required
+@require_GET
+def analytics_api(request):
+    """
+    Room and instructor utilisation for the admin dashboard; see
+    scheduler.analytics. ?day=TUE&start=13:00&end=17:00 narrows the room and
+    instructor rankings to that window.
+    """
+    if not request.user.is_admin():
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    day = request.GET.get('day', '').upper() or None
+    if day is not None and day not in DAY_CODES:
+        return JsonResponse({'error': f"day must be one of {', '.join(DAY_CODES)}"}, status=400)
+    try:
+        start, end = (
+            minute_of_day(datetime.datetime.strptime(request.GET[name], '%H:%M').time()) if request.GET.get(name) else None
+            for name in ('start', 'end')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be HH:MM'}, status=400)
+    try:
+        return JsonResponse(analytics.report(day, start, end))
+    except analytics.AnalyticsUnavailable as e:
+        return JsonResponse({'error': str(e)}, status=501)
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape target; see scheduler.metrics."""
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not allowed and not (request.user.is_authenticated and request.user.is_admin()):
+        return HttpResponse("Forbidden", status=403, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+SUBJECT_SEARCH_LIMIT = 20
+
+
+@login_required
+@require_GET
+def subject_search_api(request):
+    """Ranked subject matches for one search box, best first."""
+    if not request.user.is_admin():
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    query = request.GET.get('q', '')
+    subjects = search_subjects(query).select_related('instructor__user', 'room', 'section')[:SUBJECT_SEARCH_LIMIT]
+    return JsonResponse({
+        "query": query,
+        "results": [
+            {
+                "id": s.id,
+                "subject_code": s.subject_code,
+                "subject_name": s.subject_name,
+                "section": s.section.section_name if s.section else None,
+                "room": s.room.room_name if s.room else None,
+                "instructor": s.instructor.user.get_full_name() if s.instructor else None,
+                "rank": s.search_rank,
+            }
+            for s in subjects
+        ],
+    })
+
+
 @login_required
 def delete_subject(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id)
@@ -1150,8 +1451,6 @@ def delete_instructor(request, instructor_id):
 # Manage rooms page
 @login_required
 def manage_rooms(request):
-    from scheduler.models import Subject
-    from django.db.models import Count
     from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
     departments = Department.objects.all().order_by("name")
@@ -1208,9 +1507,9 @@ def manage_rooms(request):
     
     if selected_department:
         # Query rooms
-        rooms = Room.objects.select_related("department").annotate(
-            schedule_count=Count('subjects')
-        ).filter(department_id=selected_department).order_by("floor", "room_name")
+        rooms = Room.objects.select_related("department").filter(
+            department_id=selected_department
+        ).order_by("floor", "room_name")
         
         if selected_floor:
             rooms = rooms.filter(floor=selected_floor)
@@ -1219,38 +1518,8 @@ def manage_rooms(request):
         dept = Department.objects.filter(id=selected_department).first()
         dept_name = dept.name if dept else "Unknown Department"
 
-        room_list = []
-        for room in rooms:
-            # Corrected: order_by day + start_time
-            subjects = room.subjects.select_related(
-                "instructor__user", "section"
-            ).all().order_by("day", "start_time")
-
-            room.schedule_count = subjects.count()
-
-            room.subjects_using = [
-                {
-                    "subject_code": s.subject_code,
-                    "subject_name": s.subject_name,
-                    "section": s.section.section_name if s.section else "N/A",
-                    "day": s.get_day_display() if hasattr(s, 'get_day_display') else (s.day or "—"),
-                    "time": (
-                        f"{s.start_time.strftime('%I:%M %p')} - {s.end_time.strftime('%I:%M %p')}"
-                        if s.start_time and s.end_time else "—"
-                    ),
-                    "instructor": (
-                        s.instructor.user.get_full_name()
-                        if s.instructor and s.instructor.user
-                        else "No Instructor"
-                    ),
-                }
-                for s in subjects
-            ]
-
-            room_list.append(room)
-        
         # Apply pagination - 6 rooms per page
-        paginator = Paginator(room_list, 6)
+        paginator = Paginator(rooms, 6)
         
         try:
             paginated_rooms = paginator.page(page_number)
@@ -1258,6 +1527,10 @@ def manage_rooms(request):
             paginated_rooms = paginator.page(1)
         except EmptyPage:
             paginated_rooms = paginator.page(paginator.num_pages)
+
+        timetables = room_timetables([room.id for room in paginated_rooms])
+        for room in paginated_rooms:
+            room.schedule_count = len(timetables[room.id])
         
         rooms_by_department[dept_name] = paginated_rooms
         paginator_obj = paginated_rooms
@@ -1274,36 +1547,109 @@ def manage_rooms(request):
     return render(request, "scheduler/admin/manage_rooms.html", context)
 
 
+# Columns of each room_timetables() entry; day is an index into DAY_CODES and
+# start/end are minutes of that day.
+ROOM_TIMETABLE_FIELDS = ('day', 'start', 'end', 'subject_code', 'subject_name', 'section', 'instructor')
+ROOM_TIMETABLES_MAX_ROOMS = 500
+
+
+def room_timetables(room_ids):
+    """
+    {room id: [entry, ...]} for ``room_ids``, from the per-room cache, with
+    one Schedule query for all the rooms it misses.
+    """
+    room_ids = list(room_ids)
+    found = {scope[1]: entries for scope, entries in scheduler_cache.get_many(
+        'room_schedule', ('timetable',), [('room', room_id) for room_id in room_ids]
+    ).items()}
+    missing = [room_id for room_id in room_ids if room_id not in found]
+    if missing:
+        built = {room_id: [] for room_id in missing}
+        rows = Schedule.objects.filter(room_id__in=missing).order_by('room_id', 'week_start').values_list(
+            'room_id', 'week_start', 'week_end', 'subject__subject_code', 'subject__subject_name',
+            'section__section_name', 'instructor__user__first_name', 'instructor__user__last_name',
+        )
+        for room_id, week_start, week_end, code, name, section, first_name, last_name in rows:
+            day = week_start // MINUTES_PER_DAY
+            offset = day * MINUTES_PER_DAY
+            built[room_id].append([
+                day, week_start - offset, week_end - offset, code, name, section,
+                f"{first_name} {last_name}".strip(),
+            ])
+        scheduler_cache.set_many('room_schedule', ('timetable',), {('room', room_id): entries for room_id, entries in built.items()})
+        found.update(built)
+    return {room_id: found[room_id] for room_id in room_ids}
+
+
+def _int_list(values):
+    try:
+        return [int(v) for value in values for v in value.split(',') if v.strip()]
+    except ValueError:
+        return None
+
+
+# Batch room timetables for the admin room grid: ?rooms=1,2,3 or ?department=&floor=
+@login_required
+@require_GET
+def room_timetables_api(request):
+    if not request.user.is_admin():
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+
+    room_ids = _int_list(request.GET.getlist('rooms'))
+    if room_ids is None:
+        return JsonResponse({'error': 'rooms must be a comma-separated list of ids'}, status=400)
+    department, floor = _int_list(request.GET.getlist('department')), _int_list(request.GET.getlist('floor'))
+    if department is None or floor is None:
+        return JsonResponse({'error': 'department and floor must be numbers'}, status=400)
+    rooms = Room.objects.order_by('floor', 'room_name')
+    if room_ids:
+        rooms = rooms.filter(id__in=room_ids)
+    elif department:
+        rooms = rooms.filter(department_id=department[0])
+        if floor:
+            rooms = rooms.filter(floor=floor[0])
+    else:
+        return JsonResponse({'error': 'Pass rooms, or a department (and floor)'}, status=400)
+    rooms = list(rooms.values_list('id', 'room_name')[:ROOM_TIMETABLES_MAX_ROOMS + 1])
+    if len(rooms) > ROOM_TIMETABLES_MAX_ROOMS:
+        return JsonResponse({'error': f'At most {ROOM_TIMETABLES_MAX_ROOMS} rooms per request'}, status=400)
+
+    timetables = room_timetables([room_id for room_id, _name in rooms])
+    return JsonResponse({
+        'days': DAY_CODES,
+        'fields': ROOM_TIMETABLE_FIELDS,
+        'rooms': {
+            str(room_id): {'name': name, 'entries': timetables[room_id]}
+            for room_id, name in rooms
+        },
+    })
+
+
+def _twelve_hour(minutes):
+    return datetime.time(minutes // 60, minutes % 60).strftime('%I:%M %p')
+
+
 # API endpoint for room schedule modal
 @login_required
 def room_schedule_api(request, room_id):
-    try:
-        room = Room.objects.get(id=room_id)
-        subjects = room.subjects.select_related(
-            'instructor__user', 'section'
-        ).all().order_by('day', 'start_time')
-
-        schedule_data = []
-        for s in subjects:
-            schedule_data.append({
-                'day': s.get_day_display() if hasattr(s, 'get_day_display') else (s.day or 'N/A'),
-                'time': (
-                    f"{s.start_time.strftime('%I:%M %p')} - {s.end_time.strftime('%I:%M %p')}"
-                    if s.start_time and s.end_time else "N/A"
-                ),
-                'subject_code': s.subject_code,
-                'subject_name': s.subject_name,
-                'section': s.section.section_name if s.section else 'N/A',
-                'instructor': s.instructor.user.get_full_name() if s.instructor else 'N/A'
-            })
-
-        return JsonResponse(schedule_data, safe=False)
-
-    except Room.DoesNotExist:
+    if not Room.objects.filter(id=room_id).exists():
         return JsonResponse({'error': 'Room not found'}, status=404)
 
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+    schedule_data = [
+        {
+            'day': str(Schedule.Day(DAY_CODES[day]).label),
+            'time': f"{_twelve_hour(start)} - {_twelve_hour(end)}",
+            'subject_code': code,
+            'subject_name': name,
+            'section': section or 'N/A',
+            'instructor': instructor or 'N/A',
+        }
+        for day, start, end, code, name, section, instructor in room_timetables([room_id])[room_id]
+    ]
+    return JsonResponse(schedule_data, safe=False)
+
+DAY_CODES_BY_NAME = {label: code for code, label in Schedule.Day.choices}
+
 
 # API endpoint for checking room availability
 @login_required
@@ -1328,17 +1674,20 @@ def check_room_availability(request):
         start_time_obj = datetime.strptime(start_time, '%I:%M %p').time()
         end_time_obj = datetime.strptime(end_time, '%I:%M %p').time()
         
-        # Check for conflicts
-        for day in days:
-            conflicts = Subject.objects.filter(
-                room=room,
-                day__icontains=day,
-                start_time__lt=end_time_obj,
-                end_time__gt=start_time_obj
-            )
-            
-            if conflicts.exists():
-                return JsonResponse({'available': False})
+        # Scheduled classes: one lookup on the occupancy table for all days
+        day_codes = [DAY_CODES_BY_NAME.get(day, day) for day in days]
+        if is_busy(ROOM, room.id, day_codes, start_time_obj, end_time_obj):
+            return JsonResponse({'available': False})
+
+        # Subjects that carry a room/day/time but have no Schedule rows yet
+        conflicts = Subject.objects.meeting_on(days).filter(
+            room=room,
+            start_minute__lt=minute_of_day(end_time_obj),
+            end_minute__gt=minute_of_day(start_time_obj)
+        )
+
+        if conflicts.exists():
+            return JsonResponse({'available': False})
         
         return JsonResponse({'available': True})
         
@@ -1426,13 +1775,7 @@ from django.core.exceptions import ValidationError
 def manage_curriculum(request):
 
     if request.method == 'POST':
-        print("\n" + "="*60)
-        print("POST REQUEST RECEIVED")
-        print("Action:", request.POST.get('action'))
-        print("All POST data:")
-        for key, value in request.POST.items():
-            print(f"  {key}: {value}")
-        print("="*60 + "\n")
+        logger.debug("manage_curriculum POST action=%s", request.POST.get('action'))
     # =========================
     # SELECTION HANDLING
     # =========================
@@ -1637,8 +1980,7 @@ def manage_curriculum(request):
                 }
 
                 if subject.day and subject.start_time and subject.end_time and subject.instructor and subject.room:
-                    days_list = [d.strip() for d in subject.day.split(",")]
-                    for day_name in days_list:
+                    for day_name in subject.days:
                         day_code = DAY_MAPPING.get(day_name)
                         if day_code:
                             try:
@@ -1652,7 +1994,7 @@ def manage_curriculum(request):
                                     time_end=subject.end_time,
                                 )
                             except ValidationError as e:
-                                print(f"Could not create schedule for {day_name}: {e}")
+                                logger.info("Could not create schedule for %s on %s: %s", subject.subject_code, day_name, e)
 
                 messages.success(request, f"Subject '{subject.subject_name}' updated successfully!")
                 return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}&year={selected_year}&semester={selected_semester}')
@@ -1695,7 +2037,7 @@ def manage_curriculum(request):
                     messages.error(request, "Day selection is required for schedule conflict checking.")
                     return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}')
 
-                selected_days = [d.strip() for d in day.split(',') if d.strip()]
+                selected_mask = day_mask(day)
 
                 # Year & Semester objects
                 year_obj, _ = YearLevel.objects.get_or_create(curriculum=curriculum, year=selected_year)
@@ -1713,43 +2055,47 @@ def manage_curriculum(request):
 
                 # 2️⃣ Prevent room conflict (across all sections)
                 if room:
-                    room_conflicts = Subject.objects.filter(room=room).exclude(id=subject.id)
-                    for existing_subject in room_conflicts:
-                        existing_days = [d.strip() for d in existing_subject.day.split(',') if d.strip()]
-                        overlapping_days = [d for d in selected_days if d in existing_days]
-                        if overlapping_days:
-                            time_overlap = start_time < existing_subject.end_time and end_time > existing_subject.start_time
-                            if time_overlap:
-                                conflict_section = existing_subject.section.section_name if existing_subject.section else "Unknown Section"
-                                conflict_curriculum = existing_subject.curriculum.name if existing_subject.curriculum else "Unknown Curriculum"
-                                messages.error(
-                                    request,
-                                    f"Room '{room.room_name}' is already occupied by '{existing_subject.subject_name}' "
-                                    f"(Section: {conflict_section}, Curriculum: {conflict_curriculum}) "
-                                    f"on {', '.join(overlapping_days)} "
-                                    f"from {existing_subject.start_time.strftime('%I:%M %p')} to {existing_subject.end_time.strftime('%I:%M %p')}."
-                                )
-                                return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}&year={selected_year}&semester={selected_semester}')
+                    existing_subject = (
+                        Subject.objects.filter(room=room, start_minute__lt=minute_of_day(end_time), end_minute__gt=minute_of_day(start_time))
+                        .meeting_on(selected_mask)
+                        .exclude(id=subject.id)
+                        .select_related('section', 'curriculum')
+                        .first()
+                    )
+                    if existing_subject:
+                        overlapping_days = day_names(existing_subject.day_mask & selected_mask)
+                        conflict_section = existing_subject.section.section_name if existing_subject.section else "Unknown Section"
+                        conflict_curriculum = existing_subject.curriculum.name if existing_subject.curriculum else "Unknown Curriculum"
+                        messages.error(
+                            request,
+                            f"Room '{room.room_name}' is already occupied by '{existing_subject.subject_name}' "
+                            f"(Section: {conflict_section}, Curriculum: {conflict_curriculum}) "
+                            f"on {', '.join(overlapping_days)} "
+                            f"from {existing_subject.start_time.strftime('%I:%M %p')} to {existing_subject.end_time.strftime('%I:%M %p')}."
+                        )
+                        return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}&year={selected_year}&semester={selected_semester}')
                     
                 # 3️⃣ Prevent instructor conflict (across all sections)
                 if instructor:
-                    instructor_conflicts = Subject.objects.filter(instructor=instructor).exclude(id=subject.id)
-                    for existing_subject in instructor_conflicts:
-                        existing_days = [d.strip() for d in existing_subject.day.split(',') if d.strip()]
-                        overlapping_days = [d for d in selected_days if d in existing_days]
-                        if overlapping_days:
-                            time_overlap = start_time < existing_subject.end_time and end_time > existing_subject.start_time
-                            if time_overlap:
-                                conflict_section = existing_subject.section.section_name if existing_subject.section else "Unknown Section"
-                                conflict_curriculum = existing_subject.curriculum.name if existing_subject.curriculum else "Unknown Curriculum"
-                                messages.error(
-                                    request,
-                                    f"Instructor '{instructor.user.get_full_name()}' is already teaching '{existing_subject.subject_name}' "
-                                    f"(Section: {conflict_section}, Curriculum: {conflict_curriculum}) "
-                                    f"on {', '.join(overlapping_days)} "
-                                    f"from {existing_subject.start_time.strftime('%I:%M %p')} to {existing_subject.end_time.strftime('%I:%M %p')}."
-                                )
-                                return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}&year={selected_year}&semester={selected_semester}')
+                    existing_subject = (
+                        Subject.objects.filter(instructor=instructor, start_minute__lt=minute_of_day(end_time), end_minute__gt=minute_of_day(start_time))
+                        .meeting_on(selected_mask)
+                        .exclude(id=subject.id)
+                        .select_related('section', 'curriculum')
+                        .first()
+                    )
+                    if existing_subject:
+                        overlapping_days = day_names(existing_subject.day_mask & selected_mask)
+                        conflict_section = existing_subject.section.section_name if existing_subject.section else "Unknown Section"
+                        conflict_curriculum = existing_subject.curriculum.name if existing_subject.curriculum else "Unknown Curriculum"
+                        messages.error(
+                            request,
+                            f"Instructor '{instructor.user.get_full_name()}' is already teaching '{existing_subject.subject_name}' "
+                            f"(Section: {conflict_section}, Curriculum: {conflict_curriculum}) "
+                            f"on {', '.join(overlapping_days)} "
+                            f"from {existing_subject.start_time.strftime('%I:%M %p')} to {existing_subject.end_time.strftime('%I:%M %p')}."
+                        )
+                        return redirect(f'{request.path}?curriculum={curriculum.id}&section={section.id}&year={selected_year}&semester={selected_semester}')
 
                 # ✅ Save subject
                 subject.section = section 
@@ -1838,7 +2184,7 @@ def manage_curriculum(request):
                     skipped_subjects.append(subject.subject_name)
                     continue
 
-                days_list = [d.strip() for d in subject.day.split(",")]
+                days_list = subject.days
                 subject_skipped = False
 
                 for day_name in days_list:
@@ -1872,7 +2218,7 @@ def manage_curriculum(request):
 
                     except ValidationError as e:
                         subject_skipped = True
-                        print(f"Skipped {subject.subject_code}: {e}")
+                        logger.info("Skipped %s: %s", subject.subject_code, e)
 
                 if subject_skipped:
                     skipped_subjects.append(subject.subject_code)
@@ -2189,7 +2535,8 @@ def bulk_user_action(request):
 
 # ---------------- AUTO-SCHEDULER & VALIDATION ----------------
 from django.views.decorators.http import require_POST
-from .auto_scheduler import generate_timetable as run_scheduler
+from .auto_scheduler import generate_timetable as run_scheduler, DAYS, START_HOUR, END_HOUR
+from .conflicts import check_slots, grid_slots, week_grid
 
 
 @login_required
@@ -2200,11 +2547,17 @@ def generate_timetable(request):
         return redirect('home_redirect')
 
     curriculum_id = request.POST.get('curriculum_id') or None
+    profiler = request.POST.get('profile') or None
     try:
-        result = run_scheduler(curriculum_id=int(curriculum_id) if curriculum_id else None)
+        result = run_scheduler(curriculum_id=int(curriculum_id) if curriculum_id else None, profiler=profiler)
         created = result.get('created', 0)
         failed = len(result.get('failed', []))
-        messages.success(request, f"Generated {created} schedule block(s). {failed} item(s) could not be scheduled.")
+        messages.success(
+            request,
+            f"Generated {created} schedule block(s). {failed} item(s) could not be scheduled. "
+            f"(run #{result['run_id']}, {result['profile']['wall_ms'] / 1000:.1f}s)"
+        )
+        publish_timetables()
     except Exception as e:
         messages.error(request, f"Failed to generate timetable: {str(e)}")
     return redirect('manage_curriculum')
@@ -2232,25 +2585,93 @@ def validate_slot(request):
     except Exception:
         return JsonResponse({"ok": False, "error": "Invalid parameters"}, status=400)
 
-    conflicts = []
-    if Schedule.objects.filter(section=section, day=day).filter(time_start__lt=t_end, time_end__gt=t_start).exists():
-        conflicts.append("Section has a conflicting class")
-    if Schedule.objects.filter(instructor=instructor, day=day).filter(time_start__lt=t_end, time_end__gt=t_start).exists():
-        conflicts.append("Instructor is not available (conflict)")
-    if Schedule.objects.filter(room=room, day=day).filter(time_start__lt=t_end, time_end__gt=t_start).exists():
-        conflicts.append("Room is occupied")
-
-    # availability checks
-    from .models import InstructorAvailability, RoomAvailability
-    instr_av = list(instructor.availabilities.all())
-    if instr_av and not any(a.day == day and a.start_time <= t_start and a.end_time >= t_end for a in instr_av):
-        conflicts.append("Instructor not available in this time window")
-    room_av = list(room.availabilities.all())
-    if room_av and not any(a.day == day and a.start_time <= t_start and a.end_time >= t_end for a in room_av):
-        conflicts.append("Room not available in this time window")
-
+    conflicts = check_slots(section, instructor, room, [(day, t_start, t_end)])[0]
     return JsonResponse({"ok": len(conflicts) == 0, "conflicts": conflicts})
 
+
+def _optional_object(model, object_id):
+    return get_object_or_404(model, id=object_id) if object_id else None
+
+
+@login_required
+def validate_slots(request):
+    """
+    Batch variant of validate_slot.
+
+    GET  ?section=&instructor=&room=[&start_hour=&end_hour=&step=]
+         -> feasibility matrix for the whole week grid.
+    POST {"section": id, "instructor": id, "room": id,
+          "slots": [{"day": "MON", "time_start": "08:00", "time_end": "09:00"}, ...]}
+         -> one result per candidate slot.
+    Any of section/instructor/room may be omitted to check only the others.
+    """
+    if not request.user.is_admin():
+        return JsonResponse({"ok": False, "error": "Unauthorized"}, status=403)
+
+    if request.method == 'GET':
+        params = request.GET
+    elif request.method == 'POST':
+        try:
+            params = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"ok": False, "error": "Invalid JSON body"}, status=400)
+        if not isinstance(params, dict):
+            return JsonResponse({"ok": False, "error": "JSON body must be an object"}, status=400)
+    else:
+        return JsonResponse({"ok": False, "error": "GET or POST method required"}, status=405)
+
+    try:
+        section = _optional_object(Section, params.get('section'))
+        instructor = _optional_object(Instructor, params.get('instructor'))
+        room = _optional_object(Room, params.get('room'))
+    except (ValueError, TypeError):
+        return JsonResponse({"ok": False, "error": "Invalid parameters"}, status=400)
+    if not (section or instructor or room):
+        return JsonResponse({"ok": False, "error": "Provide a section, instructor or room"}, status=400)
+
+    if request.method == 'GET':
+        try:
+            start_hour = int(params.get('start_hour', START_HOUR))
+            end_hour = int(params.get('end_hour', END_HOUR))
+            step = int(params.get('step', 60))
+        except ValueError:
+            return JsonResponse({"ok": False, "error": "Invalid parameters"}, status=400)
+        if not (0 <= start_hour < end_hour <= 24) or step < 30:
+            return JsonResponse({"ok": False, "error": "Invalid grid"}, status=400)
+        days = params.getlist('day') or list(DAYS)
+        if any(d not in Schedule.Day.values for d in days):
+            return JsonResponse({"ok": False, "error": "Invalid day"}, status=400)
+        grid = week_grid(section, instructor, room, days, grid_slots(start_hour, end_hour, step))
+        return JsonResponse({"ok": True, **grid})
+
+    slots = params.get('slots', [])
+    if not isinstance(slots, list) or not all(isinstance(slot, dict) for slot in slots):
+        return JsonResponse({"ok": False, "error": "Invalid slot list"}, status=400)
+    candidates = []
+    try:
+        for slot in slots:
+            candidates.append((
+                slot['day'],
+                datetime.datetime.strptime(slot['time_start'], '%H:%M').time(),
+                datetime.datetime.strptime(slot['time_end'], '%H:%M').time(),
+            ))
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"ok": False, "error": "Invalid slot list"}, status=400)
+    if any(day not in Schedule.Day.values for day, _, _ in candidates):
+        return JsonResponse({"ok": False, "error": "Invalid day"}, status=400)
+
+    results = [
+        {
+            "day": day,
+            "time_start": start.strftime('%H:%M'),
+            "time_end": end.strftime('%H:%M'),
+            "ok": not conflicts,
+            "conflicts": conflicts,
+        }
+        for (day, start, end), conflicts in zip(candidates, check_slots(section, instructor, room, candidates))
+    ]
+    return JsonResponse({"ok": all(r["ok"] for r in results), "results": results})
+
 @login_required
 def edit_schedule(request, schedule_id):
     if not request.user.is_admin():
@@ -2311,20 +2732,138 @@ def logout_view(request):
     messages.info(request, "You have been logged out.")
     return redirect('auth_page')
 
+PUBLIC_SCHEDULE_FILTERS = ('department', 'q', 'school_year_level', 'section', 'instructor', 'subject', 'room', 'subject_code')
+PUBLIC_SCHEDULE_PAGE_SIZE = 50
+PUBLIC_SCHEDULE_ORDER = ('section_id', 'day_mask', 'start_minute', 'subject_code', 'id')
+PUBLIC_SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24  # keys embed TimetableVersion, so entries never go stale
+PUBLIC_SCHEDULE_MAX_AGE = 60
+
+
+def _public_schedule_filters(request):
+    """Filter values with whitespace collapsed and empties dropped, plus the page number."""
+    filters = {}
+    for name in PUBLIC_SCHEDULE_FILTERS:
+        value = ' '.join(request.GET.get(name, '').split())
+        if value:
+            filters[name] = value
+    if not filters.get('department', '').isdigit():
+        filters.pop('department', None)
+    page = request.GET.get('page', '')
+    return filters, int(page) if page.isdigit() else 1
+
+
+def _public_schedule_stamp(request):
+    """
+    (tag, changed_at) of the data behind the page: the published snapshot
+    while it is current, else the live tables.
+    """
+    if not hasattr(request, '_timetable_stamp'):
+        stamp = TimetableVersion.current()
+        request._public_snapshot = fresh_index(stamp)
+        if request._public_snapshot is not None:
+            index = request._public_snapshot
+            request._timetable_stamp = (f"s{index['version']}", parse_datetime(index['published_at']))
+        else:
+            request._timetable_stamp = (f"v{stamp.version}", stamp.changed_at)
+    return request._timetable_stamp
+
+
+def _public_schedule_key(request):
+    filters, page = _public_schedule_filters(request)
+    digest = hashlib.md5(urlencode(sorted(filters.items())).encode()).hexdigest()
+    return f"{digest}:{page}"
+
+
+def _public_schedule_etag(request):
+    return f"{_public_schedule_stamp(request)[0]}-{_public_schedule_key(request)}"
+
+
+def _public_schedule_last_modified(request):
+    return _public_schedule_stamp(request)[1]
+
+
+@cache_control(public=True, max_age=PUBLIC_SCHEDULE_MAX_AGE)
+@condition(etag_func=_public_schedule_etag, last_modified_func=_public_schedule_last_modified)
 def public_schedule_view(request):
-    # GET parameters
-    department_id = request.GET.get('department')
-    school_year_level_text = request.GET.get('school_year_level')  # user types text
-    section_name = request.GET.get('section')
-    instructor_name = request.GET.get('instructor')
-    subject_name = request.GET.get('subject')
-    room = request.GET.get('room')
-    subject_code = request.GET.get('subject_code')
+    tag, _changed_at = _public_schedule_stamp(request)
+    html = scheduler_cache.get_or_set(
+        'public_schedule', (tag, _public_schedule_key(request)),
+        lambda: _render_public_schedule(request), PUBLIC_SCHEDULE_CACHE_TIMEOUT,
+    )
+    return HttpResponse(html)
+
+
+# Public filter -> timetable_entry() field it searches in published snapshots
+SNAPSHOT_FILTER_FIELDS = {
+    'school_year_level': 'school_year',
+    'section': 'section_name',
+    'instructor': 'instructor',
+    'subject': 'subject_name',
+    'room': 'room',
+    'subject_code': 'subject_code',
+}
+
+
+def _snapshot_document(entry):
+    """Snapshot counterpart of search.search_document()."""
+    return ' '.join(
+        entry.get(field) or '' for field in ('subject_code', 'subject_name', 'instructor', 'room', 'section_name', 'school_year')
+    ).casefold()
+
+
+def _render_public_schedule(request):
+    filters, page = _public_schedule_filters(request)
+    _public_schedule_stamp(request)
+    index = request._public_snapshot
+    if index is None:
+        return _render_live_public_schedule(request, filters, page)
+
+    # Published snapshot, current with the timetable: no further database access.
+    departments = index['departments']
+    selected_department = None
+    entries = []
+    if filters.get('department'):
+        selected_department = next((d for d in departments if str(d['id']) == filters['department']), None)
+        if selected_department is None:
+            raise Http404("No Department matches the given query.")
+        terms = search_terms(filters.get('q', ''))
+        entries = [
+            entry for entry in load_snapshot(selected_department['file'])['entries']
+            if all(
+                value.casefold() in (entry.get(SNAPSHOT_FILTER_FIELDS[name]) or '').casefold()
+                for name, value in filters.items() if name in SNAPSHOT_FILTER_FIELDS
+            ) and all(term in _snapshot_document(entry) for term in terms)
+        ]
+    page_obj = Paginator(entries, PUBLIC_SCHEDULE_PAGE_SIZE).get_page(page) if selected_department else None
+    return _public_schedule_html(request, departments, selected_department, page_obj, filters)
+
+
+def _public_schedule_html(request, departments, selected_department, page_obj, filters):
+    context = {
+        'departments': departments,
+        'selected_department': selected_department,
+        'subjects': page_obj,
+        'page_obj': page_obj,
+        'filters': filters,
+        'filter_query': urlencode(filters),
+    }
+    return render_to_string('public/public_schedule_view.html', context, request=request)
+
+
+def _render_live_public_schedule(request, filters, page):
+    department_id = filters.get('department')
+    school_year_level_text = filters.get('school_year_level')  # user types text
+    section_name = filters.get('section')
+    instructor_name = filters.get('instructor')
+    subject_name = filters.get('subject')
+    room = filters.get('room')
+    subject_code = filters.get('subject_code')
 
     # Querysets
     departments = Department.objects.all().order_by('name')
-    instructors = Instructor.objects.select_related('user').all().order_by('user__first_name')
-    subjects = Subject.objects.select_related('instructor__user', 'school_year_level', 'room').all()
+    subjects = Subject.objects.select_related(
+        'instructor__user', 'school_year_level', 'room', 'section__course'
+    ).order_by(*PUBLIC_SCHEDULE_ORDER)
 
     # Filter by department
     selected_department = None
@@ -2340,14 +2879,13 @@ def public_schedule_view(request):
 
     # Filter by section
     if section_name:
-        subjects = subjects.filter(section__icontains=section_name)
+        subjects = subjects.filter(section__section_name__icontains=section_name)
 
-    # Filter by instructor
+    # Filter by instructor: full "First Last" name, as published snapshots store it
     if instructor_name:
-        subjects = subjects.filter(
-            Q(instructor__user__first_name__icontains=instructor_name) |
-            Q(instructor__user__last_name__icontains=instructor_name)
-        )
+        subjects = subjects.annotate(
+            instructor_name=Concat('instructor__user__first_name', Value(' '), 'instructor__user__last_name')
+        ).filter(instructor_name__icontains=instructor_name)
 
     # Filter by subject name
     if subject_name:
@@ -2361,12 +2899,71 @@ def public_schedule_view(request):
     if subject_code:
         subjects = subjects.filter(subject_code__icontains=subject_code)
 
-    context = {
-        'departments': departments,
-        'selected_department': selected_department,
-        'subjects': subjects,
-        'instructors': instructors,
-        'request': request,
-    }
+    # Single search box; keep section order so the page can group by section
+    if filters.get('q'):
+        subjects = search_subjects(filters['q'], subjects).order_by(*PUBLIC_SCHEDULE_ORDER)
+
+    # Results are only listed once a department is picked; paginate them server-side.
+    page_obj = None
+    if selected_department:
+        page_obj = Paginator(subjects, PUBLIC_SCHEDULE_PAGE_SIZE).get_page(page)
+        page_obj.object_list = [timetable_entry(subject) for subject in page_obj.object_list]
+
+    return _public_schedule_html(request, departments, selected_department, page_obj, filters)
 
-    return render(request, 'public/public_schedule_view.html', context)
\ No newline at end of file
+
+SNAPSHOT_MAX_AGE = 60 * 60 * 24 * 365
+
+
+@require_GET
+def published_timetable(request, path):
+    """
+    Serve a file written by publish_timetables(), gzip-compressed when the
+    client accepts it. Versioned files are immutable; index.json is not.
+    """
+    if not path.endswith('.json'):
+        raise Http404
+    try:
+        full_path = safe_join(settings.TIMETABLE_SNAPSHOT_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.exists(full_path + '.gz')
+    try:
+        response = FileResponse(open(full_path + '.gz' if gzipped else full_path, 'rb'), content_type='application/json')
+    except FileNotFoundError:
+        raise Http404
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    if path == INDEX_FILE:
+        patch_cache_control(response, public=True, max_age=PUBLIC_SCHEDULE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, max_age=SNAPSHOT_MAX_AGE, immutable=True)
+    return response
+
+
+def _ical_feed_etag(request, token):
+    feed = read_feed_token(token)
+    if feed is None:
+        return None
+    request._timetable_stamp = TimetableVersion.current()
+    kind, obj_id = feed
+    return f"{kind}-{obj_id}-v{request._timetable_stamp.version}"
+
+
+@require_GET
+@condition(etag_func=_ical_feed_etag)
+def ical_feed(request, token):
+    """Subscribable .ics feed for the instructor, section or room named by ``token``."""
+    feed = read_feed_token(token)
+    if feed is None:
+        raise Http404
+    kind, obj_id = feed
+    obj = get_object_or_404(ICAL_FEEDS[kind].objects.select_related(*(['user'] if kind == 'instructor' else [])), pk=obj_id)
+    response = StreamingHttpResponse(
+        calendar_lines(kind, obj, getattr(request, '_timetable_stamp', None) or TimetableVersion.current()),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'inline; filename="{kind}-{obj_id}.ics"'
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response